@@ -0,0 +1,88 @@
+# ascii_frame.py
+# Glyph palette and grid -> surface drawing, shared by the live window,
+# the offline renderer and the benchmarks.
+import colorsys
+from numba import jit
+import pygame
+
+# UPDATED: Color Palette (Vibrant Orange/Gold)
+DISK_CHARS = ".,-~:;=!*#$@%&"
+
+# Font & Grid (pixels per character cell at font size 14)
+FONT_SIZE = 14
+X_SEPARATOR = 10
+Y_SEPARATOR = 18
+
+def build_char_surfaces(font):
+    """Pre-renders one tinted surface per character of DISK_CHARS."""
+    char_surfaces = []
+    for i, char in enumerate(DISK_CHARS):
+        # Normalized intensity (0.0 to 1.0)
+        norm_i = (i + 1) / len(DISK_CHARS)
+
+        # Logic:
+        # Hue: 0.02 (Red-Orange) -> 0.12 (Yellow-Gold)
+        # Sat: High (0.95) -> Drops slightly for brightest (0.6) to simulate white-hot
+        # Val: Increases linearly
+
+        h = 0.02 + (norm_i * 0.08)
+        s = 1.0 - (norm_i * 0.4)
+        v = 0.5 + (norm_i * 0.5) # Boosted base brightness
+
+        rgb = colorsys.hsv_to_rgb(h, s, v)
+        color = (int(rgb[0]*255), int(rgb[1]*255), int(rgb[2]*255))
+        char_surfaces.append(font.render(char, True, color))
+    return char_surfaces
+
+def draw_full_frame(surface, grid_indices, char_surfaces, x_sep, y_sep):
+    """Clears the surface and blits every non-empty cell."""
+    surface.fill((0, 0, 0))
+    rows, cols = grid_indices.shape
+    for r in range(rows):
+        for c in range(cols):
+            char_idx = grid_indices[r, c]
+            if char_idx != -1:
+                surface.blit(char_surfaces[char_idx], (c * x_sep, r * y_sep))
+
+# -----------------------------
+# INCREMENTAL DISPLAY (DIRTY CELLS)
+# -----------------------------
+@jit(nopython=True, cache=True)
+def collect_dirty_runs(prev_indices, curr_indices, runs_out):
+    """
+    Diffs two glyph grids and writes horizontal runs of changed cells
+    as (row, col_start, col_end) into runs_out.
+    Returns (number of runs, number of dirty cells).
+    """
+    rows, cols = curr_indices.shape
+    n_runs = 0
+    n_dirty = 0
+    for r in range(rows):
+        c = 0
+        while c < cols:
+            if prev_indices[r, c] != curr_indices[r, c]:
+                start = c
+                while c < cols and prev_indices[r, c] != curr_indices[r, c]:
+                    c += 1
+                runs_out[n_runs, 0] = r
+                runs_out[n_runs, 1] = start
+                runs_out[n_runs, 2] = c
+                n_runs += 1
+                n_dirty += c - start
+            else:
+                c += 1
+    return n_runs, n_dirty
+
+def draw_dirty_cells(screen, grid_indices, runs, n_runs, char_surfaces, x_sep, y_sep):
+    """Clears and redraws only the changed runs. Returns the rects to update."""
+    rects = []
+    for i in range(n_runs):
+        r, c_start, c_end = runs[i, 0], runs[i, 1], runs[i, 2]
+        rect = pygame.Rect(c_start * x_sep, r * y_sep, (c_end - c_start) * x_sep, y_sep)
+        screen.fill((0, 0, 0), rect)
+        for c in range(c_start, c_end):
+            char_idx = grid_indices[r, c]
+            if char_idx != -1:
+                screen.blit(char_surfaces[char_idx], (c * x_sep, r * y_sep))
+        rects.append(rect)
+    return rects
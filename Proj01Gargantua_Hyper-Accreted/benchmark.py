@@ -0,0 +1,231 @@
+# benchmark.py
+# Headless per-stage benchmark: point generation, rasterize and glyph draw over a
+# matrix of resolutions x particle densities, with regression checks against a
+# stored baseline and a reference to the live FPS recorded in the session logs.
+#
+# Usage:
+#   python benchmark.py --out bench.json                       (run the matrix)
+#   python benchmark.py --baseline bench_baseline.json --threshold 0.10
+#   python benchmark.py --save-baseline bench_baseline.json    (store this run as the baseline)
+# Exit code 1 when any stage is slower than baseline * (1 + threshold).
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+import warnings
+import numpy as np
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+warnings.filterwarnings("ignore", category=RuntimeWarning, module="importlib._bootstrap")
+
+import pygame
+from numba import cuda
+
+from lod import BASE_PHI, BASE_THETA, BASE_LENSING
+from kernels import compute_points_kernel, compute_points_cpu, rasterize_points
+from ascii_frame import DISK_CHARS, FONT_SIZE, X_SEPARATOR, Y_SEPARATOR, build_char_surfaces, draw_full_frame
+from metrics_log import read_metrics
+
+STAGES = ("point_gen", "rasterize", "glyph_draw")
+DEFAULT_RESOLUTIONS = ((1280, 720), (1920, 1200), (2560, 1440), (3840, 2160))
+DEFAULT_DENSITIES = (0.25, 1.0, 4.0) # x the reference 42,400 points
+
+# -----------------------------
+# 1. STAGE TIMING
+# -----------------------------
+def _stats(samples_s):
+    """Milliseconds: median, mean, p95, stdev of a list of second samples."""
+    ms = sorted(s * 1000.0 for s in samples_s)
+    p95 = ms[min(len(ms) - 1, int(round(0.95 * (len(ms) - 1))))]
+    return {
+        "median_ms": round(statistics.median(ms), 4),
+        "mean_ms": round(statistics.fmean(ms), 4),
+        "p95_ms": round(p95, 4),
+        "stdev_ms": round(statistics.stdev(ms), 4) if len(ms) > 1 else 0.0,
+    }
+
+def counts_for(density):
+    """(phi, theta, lensing) for a multiple of the reference particle count."""
+    k = density ** 0.5
+    return int(BASE_PHI * k), int(BASE_THETA * k), int(BASE_LENSING * k)
+
+def run_case(width, height, density, backend, repeats, char_surfaces):
+    """Times each stage separately for one resolution / particle count."""
+    rows = height // Y_SEPARATOR
+    cols = width // X_SEPARATOR
+    phi, theta, lensing = counts_for(density)
+    total = phi * theta + lensing
+    chars_len = len(DISK_CHARS)
+    surface = pygame.Surface((width, height))
+
+    if backend == "cpu":
+        h_points = np.zeros((total, 3), dtype=np.float32)
+        h_colors = np.zeros((total, 2), dtype=np.float32)
+        def point_gen(A, B):
+            compute_points_cpu(A, B, 3.5, 9.0, h_points, h_colors, phi, theta, lensing)
+            return h_points, h_colors
+    else:
+        d_points = cuda.device_array((total, 3), dtype=np.float32)
+        d_colors = cuda.device_array((total, 2), dtype=np.float32)
+        tpb = 256
+        blocks = (total + tpb - 1) // tpb
+        def point_gen(A, B):
+            # Includes the device -> host copy, as in the live loop
+            compute_points_kernel[blocks, tpb](A, B, 3.5, 9.0, d_points, d_colors, phi, theta, lensing)
+            return d_points.copy_to_host(), d_colors.copy_to_host()
+
+    # Warm-up (JIT / cache load) outside the timed loop
+    pts, colors = point_gen(0.0, 0.3)
+    grid = rasterize_points(pts, colors, rows, cols, cols / 2, rows / 2, chars_len)
+    draw_full_frame(surface, grid, char_surfaces, X_SEPARATOR, Y_SEPARATOR)
+
+    samples = {s: [] for s in STAGES}
+    A, B = 0.0, 0.3
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        pts, colors = point_gen(A, B)
+        t1 = time.perf_counter()
+        grid = rasterize_points(pts, colors, rows, cols, cols / 2, rows / 2, chars_len)
+        t2 = time.perf_counter()
+        draw_full_frame(surface, grid, char_surfaces, X_SEPARATOR, Y_SEPARATOR)
+        t3 = time.perf_counter()
+        samples["point_gen"].append(t1 - t0)
+        samples["rasterize"].append(t2 - t1)
+        samples["glyph_draw"].append(t3 - t2)
+        A += 0.01
+        B += 0.005
+
+    stages = {s: _stats(samples[s]) for s in STAGES}
+    frame_ms = sum(stages[s]["median_ms"] for s in STAGES)
+    return {
+        "key": case_key(width, height, total, backend),
+        "resolution": f"{width}x{height}", "grid": f"{cols}x{rows}",
+        "particles": total, "backend": backend, "repeats": repeats,
+        "stages": stages,
+        "frame_ms": round(frame_ms, 4),
+        "uncapped_fps": round(1000.0 / frame_ms, 2) if frame_ms > 0 else None,
+        "particles_per_sec": round(total / (stages["point_gen"]["median_ms"] / 1000.0), 1),
+    }
+
+def case_key(width, height, particles, backend):
+    return f"{backend}/{width}x{height}/{particles}"
+
+# -----------------------------
+# 2. BASELINE + SESSION LOG COMPARISON
+# -----------------------------
+def compare_to_baseline(results, baseline, threshold):
+    """
+    Returns a list of regressions: stages whose median grew by more than `threshold`
+    (fraction) over the matching baseline case. Cases missing from the baseline are skipped.
+    """
+    base_cases = {c["key"]: c for c in baseline.get("cases", [])}
+    regressions = []
+    for case in results["cases"]:
+        base = base_cases.get(case["key"])
+        if base is None:
+            continue
+        for stage in STAGES:
+            old = base["stages"][stage]["median_ms"]
+            new = case["stages"][stage]["median_ms"]
+            ratio = new / old if old > 0 else 1.0
+            case["stages"][stage]["vs_baseline"] = round(ratio, 3)
+            if ratio > 1.0 + threshold:
+                regressions.append({"key": case["key"], "stage": stage,
+                                    "baseline_ms": old, "current_ms": new, "ratio": round(ratio, 3)})
+    return regressions
+
+def session_reference(log_paths):
+    """Live FPS per (resolution, particles) from session logs (.json or .jsonl)."""
+    groups = {}
+    for path in log_paths:
+        if not os.path.exists(path):
+            continue
+        for entry in read_metrics(path):
+            key = (entry.get("resolution"), entry.get("particles"))
+            if entry.get("actual_fps") is not None:
+                groups.setdefault(key, []).append(entry["actual_fps"])
+    ref = []
+    for (res, particles), fps in sorted(groups.items(), key=lambda kv: str(kv[0])):
+        ref.append({"resolution": res, "particles": particles, "samples": len(fps),
+                    "median_fps": round(statistics.median(fps), 2),
+                    "min_fps": round(min(fps), 2), "max_fps": round(max(fps), 2)})
+    return ref
+
+# -----------------------------
+# 3. CLI
+# -----------------------------
+def _parse_resolutions(text):
+    return tuple(tuple(int(v) for v in item.lower().split("x")) for item in text.split(","))
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Per-stage Gargantua benchmark with baseline comparison.")
+    p.add_argument("--backend", choices=["auto", "cpu", "cuda"], default="auto")
+    p.add_argument("--resolutions", type=_parse_resolutions, default=DEFAULT_RESOLUTIONS,
+                   help="Comma-separated WxH list, e.g. 1920x1200,3840x2160")
+    p.add_argument("--densities", type=lambda t: tuple(float(v) for v in t.split(",")),
+                   default=DEFAULT_DENSITIES, help="Multiples of the 42,400-point reference")
+    p.add_argument("--repeats", type=int, default=30)
+    p.add_argument("--out", type=str, default="bench_results.json")
+    p.add_argument("--baseline", type=str, default="", help="Compare against this results file")
+    p.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown (0.10 = 10%%)")
+    p.add_argument("--save-baseline", type=str, default="", help="Also write this run as a baseline")
+    p.add_argument("--session-logs", type=str, default="session_log.json,session_log.jsonl")
+    args = p.parse_args(argv)
+
+    backend = args.backend
+    if backend == "auto":
+        backend = "cuda" if cuda.is_available() else "cpu"
+
+    pygame.font.init()
+    font = pygame.font.SysFont('Courier New', FONT_SIZE, bold=True)
+    char_surfaces = build_char_surfaces(font)
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {"platform": platform.platform(), "processor": platform.processor(),
+                    "python": platform.python_version(), "backend": backend},
+        "cases": [],
+    }
+    for width, height in args.resolutions:
+        for density in args.densities:
+            case = run_case(width, height, density, backend, args.repeats, char_surfaces)
+            results["cases"].append(case)
+            s = case["stages"]
+            print(f"[BENCH] {case['resolution']:>9} {case['particles']:>9,} pts | "
+                  f"gen {s['point_gen']['median_ms']:7.3f} ms | raster {s['rasterize']['median_ms']:7.3f} ms | "
+                  f"draw {s['glyph_draw']['median_ms']:7.3f} ms | ~{case['uncapped_fps']} FPS uncapped")
+
+    # Live FPS includes present, events and the frame cap, so it is context, not a gate
+    results["session_reference"] = session_reference(args.session_logs.split(","))
+    live = {(r["resolution"], r["particles"]): r["median_fps"] for r in results["session_reference"]}
+    for case in results["cases"]:
+        case["live_median_fps"] = live.get((case["resolution"], case["particles"]))
+    for ref in results["session_reference"]:
+        print(f"[BENCH] Live session {ref['resolution']} {ref['particles']:,} pts: "
+              f"median {ref['median_fps']} FPS over {ref['samples']} samples")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        results["baseline"] = {"path": args.baseline, "threshold": args.threshold, "regressions": regressions}
+        for r in regressions:
+            print(f"[REGRESSION] {r['key']} {r['stage']}: {r['baseline_ms']} -> {r['current_ms']} ms (x{r['ratio']})")
+        if not regressions:
+            print(f"[BENCH] No regressions beyond {args.threshold:.0%} vs {args.baseline}")
+
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=4)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=4)
+    print(f"[BENCH] Results saved to {args.out}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
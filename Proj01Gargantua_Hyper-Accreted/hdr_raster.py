@@ -0,0 +1,366 @@
+# hdr_raster.py
+# HDR density-accumulation rasterizer: an alternative to rasterize_points.
+# The z-buffer keeps the nearest point per cell and drops every other one, so
+# the picture depends on how many points happen to land in each cell and
+# aliases unless the disk is heavily oversampled. Here every point splats its
+# luminance into a float buffer instead, spread bilinearly over the 4 nearest
+# cells:
+#   acc[0] += w * lum * f      depth-weighted luminance
+#   acc[1] += w * f            depth weights
+#   acc[2] += f                point density
+# with f the bilinear footprint and w = (D / D_REF)^DEPTH_POWER, so nearer
+# points dominate the blend (the near side of the disk still covers the far
+# side). The resolve pass turns each cell into
+#   L = (acc[0] / acc[1]) * (1 - exp(-acc[2] / (OPACITY * n_ref)))
+# where n_ref follows the mean density of covered cells. Doubling the particle
+# count then leaves the image alone and only lowers the noise. L is tone-mapped
+# (extended Reinhard) onto the DISK_CHARS ramp.
+#
+# CPU: each worker slot owns a partial buffer for a contiguous range of points,
+# and a reduction pass sums the slots. CUDA: the points never leave the device;
+# float atomics accumulate into one buffer and only the glyph grid is copied back.
+#
+# Usage (quality vs cost against the z-buffer at equal frame time):
+#   python hdr_raster.py [--backend cpu|cuda] [--cols 192 --rows 66] [--json hdr.json]
+import sys
+import json
+import time
+import math
+import argparse
+import numpy as np
+import numba
+from numba import cuda, jit, prange
+
+from kernels import compute_points_kernel, compute_points_cpu, rasterize_points
+
+CAMERA_DISTANCE = 8.0 # Same projection as rasterize_points
+D_REF = 1.0 / CAMERA_DISTANCE
+DEPTH_POWER = 4.0 # Near-side weight ~16x the disk centre, far side ~0.2x
+OPACITY = 0.25 # A cell at a quarter of the mean density is ~63% opaque
+EXPOSURE = 1.2
+WHITE = 1.4 # Brightest Doppler-boosted luminance maps to the top glyph
+MIN_DENSITY = 0.08 # Cells below this share of n_ref stay empty (no faint halo)
+REF_SMOOTHING = 0.2 # EMA on n_ref, so exposure doesn't pump between frames
+
+# -----------------------------
+# 1. SHARED SPLAT + TONE MAP
+# -----------------------------
+def _footprint(x, y, z, x_off, y_off, scale_x, scale_y):
+    """Returns (c0, r0, tx, ty, w) for the bilinear splat, or w = 0 behind the camera."""
+    dist = z + CAMERA_DISTANCE
+    if dist <= 0:
+        return 0, 0, 0.0, 0.0, 0.0
+    D = 1.0 / dist
+    # rasterize_points truncates, so cell c spans [c, c + 1); centre the tent on it
+    fx = x_off + scale_x * D * x - 0.5
+    fy = y_off + scale_y * D * y - 0.5
+    c0 = int(math.floor(fx))
+    r0 = int(math.floor(fy))
+    w = (D / D_REF) ** DEPTH_POWER
+    return c0, r0, fx - c0, fy - r0, w
+
+def _tone_map(sum_wl, sum_w, density, n_ref, chars_len):
+    """Glyph index for one accumulated cell (-1 = empty)."""
+    if density < MIN_DENSITY * n_ref or sum_w <= 0.0:
+        return -1
+    L = (sum_wl / sum_w) * (1.0 - math.exp(-density / (OPACITY * n_ref))) * EXPOSURE
+    v = L * (1.0 + L / (WHITE * WHITE)) / (1.0 + L)
+    c_idx = int(v * chars_len)
+    if c_idx >= chars_len: c_idx = chars_len - 1
+    if c_idx < 0: c_idx = 0
+    return c_idx
+
+footprint_device = cuda.jit(device=True)(_footprint)
+footprint_cpu = jit(nopython=True, cache=True)(_footprint)
+tone_map_device = cuda.jit(device=True)(_tone_map)
+tone_map_cpu = jit(nopython=True, cache=True)(_tone_map)
+
+# -----------------------------
+# 2. CPU PATH (PARTIAL BUFFERS + REDUCTION)
+# -----------------------------
+@jit(nopython=True, parallel=True, nogil=True, cache=True)
+def splat_points_cpu(points, colors, x_off, y_off, scale_x, scale_y, partial):
+    """partial: (n_slots, rows, cols, 3). Slot t accumulates the t-th contiguous range of points."""
+    n_slots, rows, cols, _ = partial.shape
+    n = points.shape[0]
+    per_slot = (n + n_slots - 1) // n_slots
+    for t in prange(n_slots):
+        acc = partial[t]
+        acc[:, :, :] = 0.0
+        for i in range(t * per_slot, min(n, (t + 1) * per_slot)):
+            c0, r0, tx, ty, w = footprint_cpu(points[i, 0], points[i, 1], points[i, 2],
+                                              x_off, y_off, scale_x, scale_y)
+            if w == 0.0:
+                continue
+            lum = colors[i, 1]
+            for dr in range(2):
+                r = r0 + dr
+                if r < 0 or r >= rows:
+                    continue
+                fr = ty if dr else 1.0 - ty
+                for dc in range(2):
+                    c = c0 + dc
+                    if c < 0 or c >= cols:
+                        continue
+                    f = fr * (tx if dc else 1.0 - tx)
+                    acc[r, c, 0] += w * lum * f
+                    acc[r, c, 1] += w * f
+                    acc[r, c, 2] += f
+
+@jit(nopython=True, parallel=True, nogil=True, cache=True)
+def reduce_partials_cpu(partial, acc, row_stats):
+    """Sums the slots into acc; row_stats[r] = (covered cells, density) for n_ref."""
+    n_slots, rows, cols, _ = partial.shape
+    for r in prange(rows):
+        covered = 0.0
+        total = 0.0
+        for c in range(cols):
+            s0 = 0.0
+            s1 = 0.0
+            s2 = 0.0
+            for t in range(n_slots):
+                s0 += partial[t, r, c, 0]
+                s1 += partial[t, r, c, 1]
+                s2 += partial[t, r, c, 2]
+            acc[r, c, 0] = s0
+            acc[r, c, 1] = s1
+            acc[r, c, 2] = s2
+            if s2 > 0.0:
+                covered += 1.0
+                total += s2
+        row_stats[r, 0] = covered
+        row_stats[r, 1] = total
+
+@jit(nopython=True, parallel=True, nogil=True, cache=True)
+def resolve_cpu(acc, n_ref, chars_len, out):
+    rows, cols = out.shape
+    for r in prange(rows):
+        for c in range(cols):
+            out[r, c] = tone_map_cpu(acc[r, c, 0], acc[r, c, 1], acc[r, c, 2], n_ref, chars_len)
+
+# -----------------------------
+# 3. CUDA PATH (ATOMICS)
+# -----------------------------
+@cuda.jit(cache=True)
+def splat_points_kernel(points, colors, n, x_off, y_off, scale_x, scale_y, acc):
+    i = cuda.grid(1)
+    if i >= n:
+        return
+    c0, r0, tx, ty, w = footprint_device(points[i, 0], points[i, 1], points[i, 2],
+                                         x_off, y_off, scale_x, scale_y)
+    if w == 0.0:
+        return
+    rows, cols = acc.shape[0], acc.shape[1]
+    lum = colors[i, 1]
+    for dr in range(2):
+        r = r0 + dr
+        if r < 0 or r >= rows:
+            continue
+        fr = ty if dr else 1.0 - ty
+        for dc in range(2):
+            c = c0 + dc
+            if c < 0 or c >= cols:
+                continue
+            f = fr * (tx if dc else 1.0 - tx)
+            cuda.atomic.add(acc, (r, c, 0), w * lum * f)
+            cuda.atomic.add(acc, (r, c, 1), w * f)
+            cuda.atomic.add(acc, (r, c, 2), f)
+
+@cuda.jit(cache=True)
+def density_stats_kernel(acc, stats):
+    c, r = cuda.grid(2)
+    if r < acc.shape[0] and c < acc.shape[1]:
+        d = acc[r, c, 2]
+        if d > 0.0:
+            cuda.atomic.add(stats, 0, 1.0)
+            cuda.atomic.add(stats, 1, d)
+
+@cuda.jit(cache=True)
+def resolve_kernel(acc, n_ref, chars_len, out):
+    """Tone-maps into out and clears acc for the next frame."""
+    c, r = cuda.grid(2)
+    if r < out.shape[0] and c < out.shape[1]:
+        out[r, c] = tone_map_device(acc[r, c, 0], acc[r, c, 1], acc[r, c, 2], n_ref, chars_len)
+        acc[r, c, 0] = 0.0
+        acc[r, c, 1] = 0.0
+        acc[r, c, 2] = 0.0
+
+class HDRRasterizer:
+    """
+    Persistent accumulation buffers. render(points, colors) -> glyph grid, like rasterize_points.
+    On "cuda" points/colors are the device arrays from compute_points_kernel.
+    """
+    def __init__(self, rows, cols, chars_len, backend="cpu", threads_per_block=256):
+        self.rows = rows
+        self.cols = cols
+        self.chars_len = chars_len
+        self.backend = backend
+        self.threads_per_block = threads_per_block
+        self.n_ref = None
+        if backend == "cpu":
+            n_slots = numba.get_num_threads()
+            self.partial = np.zeros((n_slots, rows, cols, 3), dtype=np.float32)
+            self.acc = np.zeros((rows, cols, 3), dtype=np.float32)
+            self.row_stats = np.zeros((rows, 2), dtype=np.float64)
+        else:
+            self.d_acc = cuda.to_device(np.zeros((rows, cols, 3), dtype=np.float32))
+            self.d_stats = cuda.device_array(2, dtype=np.float32)
+            self.d_out = cuda.device_array((rows, cols), dtype=np.int32)
+            tpb = 16
+            self.cell_threads = (tpb, tpb)
+            self.cell_blocks = ((cols + tpb - 1) // tpb, (rows + tpb - 1) // tpb)
+
+    def buffer_bytes(self):
+        if self.backend == "cpu":
+            return self.partial.nbytes + self.acc.nbytes
+        return self.d_acc.nbytes + self.d_out.nbytes
+
+    def _update_ref(self, covered, total):
+        """Mean density of covered cells, smoothed over frames."""
+        mean = total / covered if covered > 0 else 1.0
+        if self.n_ref is None:
+            self.n_ref = mean
+        else:
+            self.n_ref += REF_SMOOTHING * (mean - self.n_ref)
+        return max(self.n_ref, 1e-6)
+
+    def render(self, points, colors, scale_x=30.0, scale_y=20.0):
+        rows, cols = self.rows, self.cols
+        out = np.empty((rows, cols), dtype=np.int32) # Fresh grid: callers keep the previous one
+        if self.backend == "cpu":
+            splat_points_cpu(points, colors, cols / 2, rows / 2, scale_x, scale_y, self.partial)
+            reduce_partials_cpu(self.partial, self.acc, self.row_stats)
+            covered, total = self.row_stats.sum(axis=0)
+            resolve_cpu(self.acc, self._update_ref(covered, total), self.chars_len, out)
+            return out
+
+        n = points.shape[0]
+        blocks = (n + self.threads_per_block - 1) // self.threads_per_block
+        splat_points_kernel[blocks, self.threads_per_block](points, colors, n, cols / 2, rows / 2,
+                                                            scale_x, scale_y, self.d_acc)
+        self.d_stats.copy_to_device(np.zeros(2, dtype=np.float32))
+        density_stats_kernel[self.cell_blocks, self.cell_threads](self.d_acc, self.d_stats)
+        covered, total = self.d_stats.copy_to_host()
+        resolve_kernel[self.cell_blocks, self.cell_threads](self.d_acc, self._update_ref(covered, total),
+                                                           self.chars_len, self.d_out)
+        self.d_out.copy_to_host(out)
+        return out
+
+# -----------------------------
+# 4. QUALITY VS COST BENCHMARK
+# -----------------------------
+def _grid_error(grid, ref):
+    """Mean |glyph difference| over cells covered by either grid (empty counts as -1)."""
+    mask = (grid >= 0) | (ref >= 0)
+    if not mask.any():
+        return 0.0
+    return float(np.abs(grid[mask] - ref[mask]).mean())
+
+def benchmark(backend="cpu", rows=66, cols=192, scales=(0.0625, 0.125, 0.25, 0.5, 1.0, 2.0, 4.0),
+              ref_scale=64.0, frames=10, chars_len=14):
+    """
+    For each particle count and both modes: ms/frame (point generation + rasterize)
+    and two quality numbers against the same mode at ref_scale x the count:
+    error = mean |glyph difference|, flicker = mean |glyph change| between two
+    frames 0.01 rad apart minus the reference's change (aliasing shows up as flicker).
+    Then pairs each z-buffer run with the densest HDR run that is no slower.
+    Own-mode error only measures sampling noise: the two modes converge to different
+    pictures. cross_error compares each run with the other mode's reference, and
+    ref_gap (the two references against each other) is the floor it can reach.
+    """
+    from lod import BASE_PHI, BASE_THETA, BASE_LENSING
+
+    def counts_for(scale):
+        k = scale ** 0.5
+        return max(1, int(BASE_PHI * k)), max(1, int(BASE_THETA * k)), max(1, int(BASE_LENSING * k))
+
+    hdr = HDRRasterizer(rows, cols, chars_len, backend=backend)
+
+    def make_renderer(counts, mode):
+        phi, theta, lensing = counts
+        total = phi * theta + lensing
+        if backend == "cpu":
+            pts = np.zeros((total, 3), dtype=np.float32)
+            cols_ = np.zeros((total, 2), dtype=np.float32)
+        else:
+            pts = cuda.device_array((total, 3), dtype=np.float32)
+            cols_ = cuda.device_array((total, 2), dtype=np.float32)
+        blocks = (total + 255) // 256
+
+        def render(A, B):
+            if backend == "cpu":
+                compute_points_cpu(A, B, 3.5, 9.0, pts, cols_, phi, theta, lensing)
+                h_pts, h_cols = pts, cols_
+            else:
+                compute_points_kernel[blocks, 256](A, B, 3.5, 9.0, pts, cols_, phi, theta, lensing)
+                if mode == "hdr":
+                    return hdr.render(pts, cols_)
+                h_pts, h_cols = pts.copy_to_host(), cols_.copy_to_host()
+            if mode == "hdr":
+                return hdr.render(h_pts, h_cols)
+            return rasterize_points(h_pts, h_cols, rows, cols, cols / 2, rows / 2, chars_len)
+        return render, total
+
+    A0, B0, dA = 0.4, 0.35, 0.01
+    results = {"backend": backend, "grid": f"{cols}x{rows}", "ref_scale": ref_scale, "runs": []}
+    refs = {}
+    for mode in ("zbuffer", "hdr"):
+        render, _ = make_renderer(counts_for(ref_scale), mode)
+        hdr.n_ref = None
+        refs[mode] = (render(A0, B0), render(A0 + dA, B0))
+    results["ref_gap"] = round(_grid_error(refs["hdr"][0], refs["zbuffer"][0]), 3)
+    print(f"[HDR] Reference gap (HDR vs z-buffer at {ref_scale:g}x): {results['ref_gap']:.3f} glyph steps")
+
+    for scale in scales:
+        counts = counts_for(scale)
+        for mode in ("zbuffer", "hdr"):
+            render, total = make_renderer(counts, mode)
+            render(0.0, 0.3) # JIT warm-up
+            hdr.n_ref = None
+            g0 = render(A0, B0)
+            g1 = render(A0 + dA, B0)
+            ref0, ref1 = refs[mode]
+            other0 = refs["hdr" if mode == "zbuffer" else "zbuffer"][0]
+            if backend != "cpu":
+                cuda.synchronize()
+            t0 = time.perf_counter()
+            for f in range(frames):
+                render(0.01 * f, 0.3 + 0.005 * f)
+            if backend != "cpu":
+                cuda.synchronize()
+            ms = 1000.0 * (time.perf_counter() - t0) / frames
+            run = {"mode": mode, "scale": scale, "particles": total, "ms_per_frame": round(ms, 3),
+                   "error": round(_grid_error(g0, ref0), 3),
+                   "flicker": round(_grid_error(g1, g0) - _grid_error(ref1, ref0), 3),
+                   "cross_error": round(_grid_error(g0, other0), 3),
+                   "holes": round(float(((g0 < 0) & (ref0 >= 0)).mean()), 4)}
+            results["runs"].append(run)
+            print(f"[HDR] {mode:<7} {total:>9,} pts | {ms:7.2f} ms | error {run['error']:.3f} | "
+                  f"cross {run['cross_error']:.3f} | flicker {run['flicker']:+.3f} | holes {run['holes'] * 100:5.2f}%")
+
+    pairs = []
+    hdr_runs = [r for r in results["runs"] if r["mode"] == "hdr"]
+    for z in (r for r in results["runs"] if r["mode"] == "zbuffer"):
+        fits = [h for h in hdr_runs if h["ms_per_frame"] <= z["ms_per_frame"]]
+        if not fits:
+            continue
+        h = max(fits, key=lambda r: r["particles"])
+        pairs.append({"ms_budget": z["ms_per_frame"], "zbuffer": z, "hdr": h})
+        print(f"[HDR] <= {z['ms_per_frame']:6.2f} ms: z-buffer {z['particles']:>9,} pts error {z['error']:.3f} "
+              f"| HDR {h['particles']:>9,} pts error {h['error']:.3f} | cross {z['cross_error']:.3f} / "
+              f"{h['cross_error']:.3f}")
+    results["equal_time"] = pairs
+    return results
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="HDR accumulation vs z-buffer: quality at equal frame time.")
+    p.add_argument("--backend", choices=["cpu", "cuda"], default="cuda" if cuda.is_available() else "cpu")
+    p.add_argument("--cols", type=int, default=192)
+    p.add_argument("--rows", type=int, default=66)
+    p.add_argument("--frames", type=int, default=10)
+    p.add_argument("--json", type=str, default="")
+    args = p.parse_args(sys.argv[1:])
+    res = benchmark(args.backend, args.rows, args.cols, frames=args.frames)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(res, f, indent=4)
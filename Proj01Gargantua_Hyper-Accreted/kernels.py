@@ -0,0 +1,153 @@
+# kernels.py
+# Point generation (GPU + CPU) and the JIT rasterizer.
+# The per-particle physics lives in one plain function that is compiled twice:
+# as a CUDA device function for the live kernel and as a CPU function for the
+# headless/offline paths, so both backends always produce the same geometry.
+# cache=True keeps compiled code in __pycache__, so only the first run pays JIT time.
+import math
+import numpy as np
+from numba import cuda, jit, prange
+
+# -----------------------------
+# 1. PARTICLE PHYSICS (SHARED)
+# -----------------------------
+def _compute_point(idx, A, B, disk_inner, disk_outer, phi_steps, theta_steps, lensing_steps):
+    """Returns (x, y, z, hue, lum) for one particle index."""
+    total_disk_points = phi_steps * theta_steps
+
+    # Larger Black Hole
+    schwarzschild_radius = 3.5
+
+    x, y, z = 0.0, 0.0, 0.0
+    lum = 0.0
+    hue = 0.0
+
+    # --- DISK PARTICLES ---
+    if idx < total_disk_points:
+        phi_idx = idx // theta_steps
+        theta_idx = idx % theta_steps
+
+        phi_raw = phi_idx * (6.28318 / phi_steps)
+        theta_raw = theta_idx * (6.28318 / theta_steps)
+
+        # Geometry
+        radius = disk_inner + (disk_outer - disk_inner) * (phi_idx / phi_steps)
+        x = radius * math.cos(theta_raw)
+        y = 0.2 * math.sin(theta_raw * 3) * math.sin(phi_raw * 2)
+        z = radius * math.sin(theta_raw)
+
+        velocity = math.sin(theta_raw) * math.cos(A)
+        dist_center = radius
+
+        # Rotate
+        cos_A, sin_A = math.cos(A), math.sin(A)
+        x_new = x * cos_A - z * sin_A
+        z_new = x * sin_A + z * cos_A
+        x, z = x_new, z_new
+
+        cos_B, sin_B = math.cos(B), math.sin(B)
+        y_new = y * cos_B - z * sin_B
+        z_new = y * sin_B + z * cos_B
+        y, z = y_new, z_new
+
+        if dist_center < schwarzschild_radius * 1.1:
+            lum = 0.0
+        else:
+            base_lum = 1.0 - (dist_center - disk_inner) / (disk_outer - disk_inner)
+            if base_lum < 0: base_lum = 0
+
+            doppler = 1.0 + velocity * 0.4
+            lum = base_lum * doppler
+
+            # COLOR LOGIC
+            # We just pass base luminance, we will handle color mapping in Python pre-render
+            # But we can shift hue slightly here to separate "hot" inner from "cold" outer
+            hue = 0.05 + (1.0 - base_lum) * 0.1 # 0.05 (Orange) -> 0.15 (Yellowish)
+
+    # --- LENSING RING ---
+    else:
+        l_idx = idx - total_disk_points
+        angle = l_idx * (6.28318 / lensing_steps)
+
+        ring_r = schwarzschild_radius * 1.6
+        x = ring_r * math.cos(angle)
+        y = schwarzschild_radius * 0.25 * math.sin(angle * 2)
+        z = ring_r * math.sin(angle)
+
+        cos_A, sin_A = math.cos(A), math.sin(A)
+        x_new = x * cos_A - z * sin_A
+        z_new = x * sin_A + z * cos_A
+        x, z = x_new, z_new
+
+        lum = 1.0
+        hue = 0.0 # Red/White ring
+
+    return x, y, z, hue, lum
+
+compute_point_device = cuda.jit(device=True)(_compute_point)
+compute_point_cpu = jit(nopython=True, cache=True)(_compute_point)
+
+# -----------------------------
+# 2. CUDA KERNEL (UPDATED PHYSICS)
+# -----------------------------
+@cuda.jit(cache=True)
+def compute_points_kernel(A, B, disk_inner, disk_outer, points_out, colors_out,
+                          phi_steps, theta_steps, lensing_steps):
+    idx = cuda.grid(1)
+    total_points = phi_steps * theta_steps + lensing_steps
+    if idx >= total_points:
+        return
+
+    x, y, z, hue, lum = compute_point_device(idx, A, B, disk_inner, disk_outer,
+                                             phi_steps, theta_steps, lensing_steps)
+    points_out[idx, 0] = x
+    points_out[idx, 1] = y
+    points_out[idx, 2] = z
+    colors_out[idx, 0] = hue
+    colors_out[idx, 1] = lum
+
+# -----------------------------
+# 3. CPU POINT GENERATION
+# -----------------------------
+@jit(nopython=True, parallel=True, nogil=True, cache=True)
+def compute_points_cpu(A, B, disk_inner, disk_outer, points_out, colors_out,
+                       phi_steps, theta_steps, lensing_steps):
+    """Same output as compute_points_kernel, for machines without a CUDA device."""
+    total_points = phi_steps * theta_steps + lensing_steps
+    for idx in prange(total_points):
+        x, y, z, hue, lum = compute_point_cpu(idx, A, B, disk_inner, disk_outer,
+                                              phi_steps, theta_steps, lensing_steps)
+        points_out[idx, 0] = x
+        points_out[idx, 1] = y
+        points_out[idx, 2] = z
+        colors_out[idx, 0] = hue
+        colors_out[idx, 1] = lum
+
+# -----------------------------
+# 4. CPU RASTERIZER
+# -----------------------------
+# nogil: lets the pipelined producer thread rasterize while the main thread blits
+@jit(nopython=True, nogil=True, cache=True)
+def rasterize_points(points, colors, rows, cols, x_off, y_off, chars_len, scale_x=30.0, scale_y=20.0):
+    screen_indices = np.full((rows, cols), -1, dtype=np.int32)
+    z_buffer = np.zeros((rows, cols), dtype=np.float32)
+    num_points = points.shape[0]
+
+    for i in range(num_points):
+        x = points[i, 0]
+        y = points[i, 1]
+        z = points[i, 2]
+        dist = z + 8.0 # Increased camera distance slightly for bigger BH fit
+        if dist > 0:
+            D = 1.0 / dist
+            sx = int(x_off + scale_x * D * x)
+            sy = int(y_off + scale_y * D * y)
+            if 0 <= sx < cols and 0 <= sy < rows:
+                if D > z_buffer[sy, sx]:
+                    z_buffer[sy, sx] = D
+                    lum = colors[i, 1]
+                    c_idx = int(lum * chars_len)
+                    if c_idx >= chars_len: c_idx = chars_len - 1
+                    if c_idx < 0: c_idx = 0
+                    screen_indices[sy, sx] = c_idx
+    return screen_indices
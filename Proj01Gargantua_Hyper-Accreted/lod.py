@@ -0,0 +1,85 @@
+# lod.py
+# Adaptive level-of-detail particle budget.
+# The reference config (350 x 120 disk + 400 ring = 42,400 points) was tuned on a
+# 192 x 66 character grid (1920x1200), i.e. ~3.3 points per cell. Fewer points per
+# cell leaves holes; many more just lands in the same cells and is thrown away by
+# the z-buffer. The controller starts from that density and then follows the
+# measured frame time.
+import math
+
+BASE_PHI = 350
+BASE_THETA = 120
+BASE_LENSING = 400
+BASE_CELLS = 192 * 66
+BASE_POINTS = BASE_PHI * BASE_THETA + BASE_LENSING
+
+class LODController:
+    """
+    Picks (phi_points, theta_points, lensing_points) for the current grid and frame budget.
+    Call update(work_ms) once per frame; it returns the new counts when the density
+    changed, otherwise None.
+    """
+    def __init__(self, rows, cols, target_fps,
+                 min_scale=0.25, max_scale=4.0,
+                 window=30, step_down=0.85, step_up=1.1,
+                 miss_ratio=1.0, headroom_ratio=0.7):
+        self.budget_ms = 1000.0 / target_fps
+        self.window = window
+        self.step_down = step_down
+        self.step_up = step_up
+        self.miss_ratio = miss_ratio
+        self.headroom_ratio = headroom_ratio
+
+        # Scale is relative to the reference 42,400 points
+        self.grid_scale = (rows * cols) / BASE_CELLS
+        self.min_scale = self.grid_scale * min_scale
+        self.max_scale = self.grid_scale * max_scale
+        self.scale = self.grid_scale
+
+        self._work_sum = 0.0
+        self._frames = 0
+
+    def counts(self):
+        """Particle counts for the current scale. Both disk axes and the ring grow with sqrt(scale)."""
+        k = math.sqrt(self.scale)
+        phi = max(8, int(round(BASE_PHI * k)))
+        theta = max(8, int(round(BASE_THETA * k)))
+        lensing = max(16, int(round(BASE_LENSING * k)))
+        return phi, theta, lensing
+
+    def update(self, work_ms):
+        """
+        work_ms: time the frame actually spent working (excluding the frame-cap sleep).
+        Averages over `window` frames, then steps the scale down on a missed budget
+        or up when there is clear headroom.
+        """
+        self._work_sum += work_ms
+        self._frames += 1
+        if self._frames < self.window:
+            return None
+
+        avg_ms = self._work_sum / self._frames
+        self._work_sum = 0.0
+        self._frames = 0
+
+        new_scale = self.scale
+        if avg_ms > self.budget_ms * self.miss_ratio:
+            new_scale = max(self.min_scale, self.scale * self.step_down)
+        elif avg_ms < self.budget_ms * self.headroom_ratio:
+            new_scale = min(self.max_scale, self.scale * self.step_up)
+
+        if new_scale == self.scale:
+            return None
+        old_counts = self.counts()
+        self.scale = new_scale
+        new_counts = self.counts()
+        return new_counts if new_counts != old_counts else None
+
+    def set_counts(self, counts):
+        """Pins the scale to explicit (phi, theta, lensing) counts, e.g. from the command line."""
+        phi, theta, _ = counts
+        self.scale = (phi * theta) / (BASE_PHI * BASE_THETA)
+
+    def relative_density(self):
+        """Current density relative to the grid-derived starting point."""
+        return self.scale / self.grid_scale
@@ -1,21 +1,32 @@
+import time
+_PROCESS_T0 = time.perf_counter() # Startup timer: imports + JIT + first frame
 import os
 import sys
-import math
+import argparse
 import platform
 import subprocess
-import time
-import json
 import datetime
 import warnings
 import ctypes
-import colorsys
 import numpy as np
-from numba import cuda, jit
 
 # 1. SUPPRESS AVX2 WARNING
 # This warning is harmless on your system; suppressing to keep CLI clean.
 warnings.filterwarnings("ignore", category=RuntimeWarning, module="importlib._bootstrap")
 import pygame
+from numba import cuda
+
+from pipeline import GridProducer, PipelinedRenderer
+from raytrace import SchwarzschildTracer
+from ascii_frame import (DISK_CHARS, FONT_SIZE, X_SEPARATOR, Y_SEPARATOR, build_char_surfaces,
+                         draw_full_frame, collect_dirty_runs, draw_dirty_cells)
+from metrics_log import MetricsSink
+from lod import LODController
+from streaming import DEFAULT_CHUNK
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "shared")) # frame_profiler.py, frame_stream.py, telemetry.py
+from frame_profiler import FrameProfiler, format_overlay_lines
+from frame_stream import FrameStreamer
+from telemetry import Registry, MetricsServer, JsonlExporter, FRAME_BUCKETS
 
 # -----------------------------
 # 2. HARDWARE & RESOLUTION DETECTION
@@ -48,10 +59,31 @@ def get_system_refresh_rate():
                 result = subprocess.run(['powershell', '-Command', cmd], capture_output=True, text=True)
                 if result.returncode == 0 and result.stdout.strip().isdigit():
                     refresh_rate = int(result.stdout.strip())
+        elif system == "Linux":
+            # xrandr marks the active mode with '*', e.g. "1920x1080  165.00*+  60.00"
+            result = subprocess.run(['xrandr', '--current'], capture_output=True, text=True, timeout=2)
+            for line in result.stdout.splitlines():
+                for token in line.split():
+                    if '*' in token:
+                        refresh_rate = int(round(float(token.rstrip('*+'))))
+                        break
     except:
         pass
     return max(30, min(refresh_rate, 240))
 
+def get_desktop_resolution():
+    """Desktop size of the primary display (pygame 2), falling back to 1920x1080."""
+    if platform.system() == "Windows":
+        return get_screen_resolution_windows()
+    try:
+        pygame.display.init()
+        sizes = pygame.display.get_desktop_sizes()
+        if sizes and sizes[0][0] > 0:
+            return sizes[0]
+    except Exception:
+        pass
+    return 1920, 1080
+
 # -----------------------------
 # 3. USER INPUTS
 # -----------------------------
@@ -97,173 +129,85 @@ def ask_fps():
         if c in options: return options[c]
         print("Invalid choice.")
 
-def get_configuration():
-    mode = ask_user_mode()
-    if mode == '2':
-        width, height = ask_resolution()
-        target_fps = ask_fps()
-    else:
-        # Default Mode: Smart Auto-detect
-        target_fps = get_system_refresh_rate()
-        if platform.system() == "Windows":
-            width, height = get_screen_resolution_windows()
-        else:
-            width, height = 1920, 1080
-            
-        print(f"\n[INFO] Auto-detected: {width}x{height} @ {target_fps}Hz")
-        
-    return width, height, target_fps
+def _env(name, cast=str):
+    value = os.environ.get(name)
+    return cast(value) if value not in (None, "") else None
 
-# -----------------------------
-# 4. MONITORING & LOGGING
-# -----------------------------
-def log_performance(json_path, log_buffer):
-    """Appends buffered logs to the JSON file."""
-    try:
-        # Load existing or create new
-        if os.path.exists(json_path):
-            with open(json_path, 'r') as f:
-                try:
-                    data = json.load(f)
-                except json.JSONDecodeError:
-                    data = []
-        else:
-            data = []
-            
-        data.extend(log_buffer)
-        
-        with open(json_path, 'w') as f:
-            json.dump(data, f, indent=4)
-            
-    except Exception as e:
-        print(f"[LOG ERROR] Could not write to JSON: {e}")
+def parse_args(argv=None):
+    """
+    Command line / environment configuration (GARGANTUA_<NAME> for each flag).
+    Any of --width/--height/--fps or --auto skips the boot menu; missing values are auto-detected.
+    """
+    p = argparse.ArgumentParser(description="Gargantua: CUDA V2")
+    p.add_argument("--width", type=int, default=_env("GARGANTUA_WIDTH", int))
+    p.add_argument("--height", type=int, default=_env("GARGANTUA_HEIGHT", int))
+    p.add_argument("--fps", type=int, default=_env("GARGANTUA_FPS", int))
+    p.add_argument("--auto", action="store_true", default=os.environ.get("GARGANTUA_AUTO", "0") not in ("", "0"),
+                   help="Auto-detect everything not given, no prompts")
+    p.add_argument("--phi", type=int, default=_env("GARGANTUA_PHI", int))
+    p.add_argument("--theta", type=int, default=_env("GARGANTUA_THETA", int))
+    p.add_argument("--lensing", type=int, default=_env("GARGANTUA_LENSING", int))
+    p.add_argument("--backend", choices=["auto", "cuda", "cpu"], default=_env("GARGANTUA_BACKEND") or "auto")
+    p.add_argument("--duration", type=float, default=_env("GARGANTUA_DURATION", float),
+                   help="Exit after this many seconds")
+    p.add_argument("--incremental", action="store_true", help="Start with incremental redraw on")
+    p.add_argument("--pipelined", action="store_true", help="Start with the producer thread on")
+    p.add_argument("--raytraced", action="store_true", help="Start in the ray-traced view")
+    p.add_argument("--streaming", action="store_true",
+                   help="Chunked point generation into screen buffers (multi-million particles)")
+    p.add_argument("--chunk", type=int, default=_env("GARGANTUA_CHUNK", int) or DEFAULT_CHUNK,
+                   help="Points per chunk in --streaming mode")
+    p.add_argument("--hdr", action="store_true", default=os.environ.get("GARGANTUA_HDR", "0") not in ("", "0"),
+                   help="Start with HDR density accumulation instead of the nearest-point z-buffer")
+    p.add_argument("--serve", type=int, default=_env("GARGANTUA_SERVE", int), metavar="PORT",
+                   help="Live browser viewer on http://127.0.0.1:PORT/ (tile-diff stream)")
+    p.add_argument("--metrics-port", type=int, default=_env("GARGANTUA_METRICS_PORT", int), metavar="PORT",
+                   help="Prometheus endpoint on http://127.0.0.1:PORT/metrics (shared/telemetry.py)")
+    p.add_argument("--metrics-jsonl", type=str, default=_env("GARGANTUA_METRICS_JSONL"), metavar="PATH",
+                   help="Append a metrics snapshot to PATH every --metrics-interval seconds")
+    p.add_argument("--metrics-interval", type=float, default=_env("GARGANTUA_METRICS_INTERVAL", float) or 5.0)
+    p.add_argument("--no-profile", action="store_true", help="Disable the stage timers")
+    p.add_argument("--log", type=str, default=_env("GARGANTUA_LOG") or "session_log.jsonl")
+    return p.parse_args(argv)
 
-# -----------------------------
-# 5. CUDA KERNEL (UPDATED PHYSICS)
-# -----------------------------
-@cuda.jit
-def compute_points_kernel(A, B, disk_inner, disk_outer, points_out, colors_out, 
-                          phi_steps, theta_steps, lensing_steps):
-    idx = cuda.grid(1)
-    total_disk_points = phi_steps * theta_steps
-    total_lensing_points = lensing_steps
-    total_points = total_disk_points + total_lensing_points
-
-    if idx >= total_points:
-        return
-
-    # Larger Black Hole
-    schwarzschild_radius = 3.5 
-    
-    x, y, z = 0.0, 0.0, 0.0
-    lum = 0.0
-    hue = 0.0
-    
-    # --- DISK PARTICLES ---
-    if idx < total_disk_points:
-        phi_idx = idx // theta_steps
-        theta_idx = idx % theta_steps
-        
-        phi_raw = phi_idx * (6.28318 / phi_steps)
-        theta_raw = theta_idx * (6.28318 / theta_steps)
-
-        # Geometry
-        radius = disk_inner + (disk_outer - disk_inner) * (phi_idx / phi_steps)
-        x = radius * math.cos(theta_raw)
-        y = 0.2 * math.sin(theta_raw * 3) * math.sin(phi_raw * 2)
-        z = radius * math.sin(theta_raw)
-        
-        velocity = math.sin(theta_raw) * math.cos(A)
-        dist_center = radius
-        
-        # Rotate
-        cos_A, sin_A = math.cos(A), math.sin(A)
-        x_new = x * cos_A - z * sin_A
-        z_new = x * sin_A + z * cos_A
-        x, z = x_new, z_new
-        
-        cos_B, sin_B = math.cos(B), math.sin(B)
-        y_new = y * cos_B - z * sin_B
-        z_new = y * sin_B + z * cos_B
-        y, z = y_new, z_new
-        
-        if dist_center < schwarzschild_radius * 1.1:
-            lum = 0.0
-        else:
-            base_lum = 1.0 - (dist_center - disk_inner) / (disk_outer - disk_inner)
-            if base_lum < 0: base_lum = 0
-            
-            doppler = 1.0 + velocity * 0.4
-            lum = base_lum * doppler
-            
-            # COLOR LOGIC 
-            # We just pass base luminance, we will handle color mapping in Python pre-render
-            # But we can shift hue slightly here to separate "hot" inner from "cold" outer
-            hue = 0.05 + (1.0 - base_lum) * 0.1 # 0.05 (Orange) -> 0.15 (Yellowish)
-
-    # --- LENSING RING ---
-    else:
-        l_idx = idx - total_disk_points
-        angle = l_idx * (6.28318 / lensing_steps)
-        
-        ring_r = schwarzschild_radius * 1.6
-        x = ring_r * math.cos(angle)
-        y = schwarzschild_radius * 0.25 * math.sin(angle * 2)
-        z = ring_r * math.sin(angle)
-        
-        cos_A, sin_A = math.cos(A), math.sin(A)
-        x_new = x * cos_A - z * sin_A
-        z_new = x * sin_A + z * cos_A
-        x, z = x_new, z_new
-        
-        lum = 1.0
-        hue = 0.0 # Red/White ring
+def get_configuration(args):
+    scripted = args.auto or any(v is not None for v in (args.width, args.height, args.fps))
+    if not scripted:
+        mode = ask_user_mode()
+        if mode == '2':
+            width, height = ask_resolution()
+            target_fps = ask_fps()
+            return width, height, target_fps
 
-    points_out[idx, 0] = x
-    points_out[idx, 1] = y
-    points_out[idx, 2] = z
-    colors_out[idx, 0] = hue
-    colors_out[idx, 1] = lum 
+    # Default Mode: Smart Auto-detect (only for values not given)
+    width, height = args.width, args.height
+    if width is None or height is None:
+        width, height = get_desktop_resolution()
+    target_fps = args.fps if args.fps is not None else get_system_refresh_rate()
+    print(f"\n[INFO] {'Configured' if scripted else 'Auto-detected'}: {width}x{height} @ {target_fps}Hz")
+    return width, height, target_fps
 
 # -----------------------------
-# 6. CPU RASTERIZER
+# 4. MONITORING & LOGGING
 # -----------------------------
-@jit(nopython=True)
-def rasterize_points(points, colors, rows, cols, x_off, y_off, chars_len):
-    screen_indices = np.full((rows, cols), -1, dtype=np.int32)
-    z_buffer = np.zeros((rows, cols), dtype=np.float32)
-    num_points = points.shape[0]
-    
-    for i in range(num_points):
-        x = points[i, 0]
-        y = points[i, 1]
-        z = points[i, 2]
-        dist = z + 8.0 # Increased camera distance slightly for bigger BH fit
-        if dist > 0:
-            D = 1.0 / dist
-            sx = int(x_off + 30 * D * x)
-            sy = int(y_off + 20 * D * y)
-            if 0 <= sx < cols and 0 <= sy < rows:
-                if D > z_buffer[sy, sx]:
-                    z_buffer[sy, sx] = D
-                    lum = colors[i, 1]
-                    c_idx = int(lum * chars_len)
-                    if c_idx >= chars_len: c_idx = chars_len - 1
-                    if c_idx < 0: c_idx = 0
-                    screen_indices[sy, sx] = c_idx
-    return screen_indices
+# Metrics go to an append-only JSON Lines file (see metrics_log.py).
+# Writing happens on a background thread and the file rotates by size,
+# so logging cost stays constant over long sessions.
 
 # -----------------------------
 # MAIN LOOP
 # -----------------------------
-def main():
-    WIDTH, HEIGHT, TARGET_FPS = get_configuration()
+def main(argv=None):
+    args = parse_args(argv)
+    config_start = time.perf_counter()
+    WIDTH, HEIGHT, TARGET_FPS = get_configuration(args)
+    config_done = time.perf_counter()
     pygame.init()
     
     # Font & Grid
-    font_size = 14
-    x_separator = 10 
-    y_separator = 18 
+    font_size = FONT_SIZE
+    x_separator = X_SEPARATOR
+    y_separator = Y_SEPARATOR
     rows = HEIGHT // y_separator
     columns = WIDTH // x_separator
     
@@ -271,37 +215,33 @@ def main():
     pygame.display.set_caption(f'Gargantua CUDA v2 - {WIDTH}x{HEIGHT}')
     font = pygame.font.SysFont('Courier New', font_size, bold=True)
     
-    # UPDATED: Color Palette (Vibrant Orange/Gold)
-    disk_chars = ".,-~:;=!*#$@%&"
-    char_surfaces = []
-    for i, char in enumerate(disk_chars):
-        # Normalized intensity (0.0 to 1.0)
-        norm_i = (i + 1) / len(disk_chars)
-        
-        # Logic: 
-        # Hue: 0.02 (Red-Orange) -> 0.12 (Yellow-Gold)
-        # Sat: High (0.95) -> Drops slightly for brightest (0.6) to simulate white-hot
-        # Val: Increases linearly
-        
-        h = 0.02 + (norm_i * 0.08) 
-        s = 1.0 - (norm_i * 0.4)
-        v = 0.5 + (norm_i * 0.5) # Boosted base brightness
-        
-        rgb = colorsys.hsv_to_rgb(h, s, v)
-        color = (int(rgb[0]*255), int(rgb[1]*255), int(rgb[2]*255))
-        char_surfaces.append(font.render(char, True, color))
+    disk_chars = DISK_CHARS
+    char_surfaces = build_char_surfaces(font)
 
     # CUDA Setup
-    phi_points = 350   
-    theta_points = 120 
-    lensing_points = 400
+    backend = args.backend
+    if backend == "auto":
+        backend = "cuda" if cuda.is_available() else "cpu"
+
+    # Particle density follows the character grid and the frame budget ('L' locks it).
+    # Explicit counts from the command line start locked.
+    # Streaming memory doesn't grow with the count, so let the budget climb much higher
+    lod = LODController(rows, columns, TARGET_FPS, max_scale=256.0 if args.streaming else 4.0)
+    adaptive_lod = args.phi is None and args.theta is None and args.lensing is None
+    counts = lod.counts()
+    if not adaptive_lod:
+        counts = (args.phi or counts[0], args.theta or counts[1], args.lensing or counts[2])
+        lod.set_counts(counts)
+    phi_points, theta_points, lensing_points = counts
     total_points = (phi_points * theta_points) + lensing_points
+    print(f"[LOD] Start: {total_points:,} particles (phi {phi_points}, theta {theta_points}, lensing {lensing_points}) for {columns}x{rows} cells")
     
-    d_points = cuda.device_array((total_points, 3), dtype=np.float32)
-    d_colors = cuda.device_array((total_points, 2), dtype=np.float32)
-    
-    threads_per_block = 256
-    blocks = (total_points + (threads_per_block - 1)) // threads_per_block
+    producer = GridProducer(rows, columns, len(disk_chars), counts, threads_per_block=256, backend=backend,
+                            streaming=args.streaming, chunk=args.chunk, hdr=args.hdr)
+    hdr_mode = producer.hdr is not None
+    if args.streaming:
+        print(f"[STREAM] Chunked generation: {args.chunk:,} points/chunk, "
+              f"{producer.streamer.buffer_bytes() / 1e6:.2f} MB screen buffers")
 
     # State variables
     A, B = 0.0, 0.0
@@ -309,72 +249,263 @@ def main():
     h_speed = 0.01 * fps_factor
     v_speed = 0.005 * fps_factor
 
+    # Pipelined mode (toggle with 'O'): frame N+1 is computed and rasterized on a
+    # worker thread while frame N is drawn. At most one finished frame is queued.
+    pipeline = None
+
+    # Ray-traced view (toggle with 'G'): one Schwarzschild geodesic per cell from a
+    # precomputed table, instead of particles + the fixed lensing ring
+    tracer = None
+    raytraced = args.raytraced
+
     clock = pygame.time.Clock()
     running = True
 
+    # Incremental redraw (toggle with 'I'): only cells whose glyph changed are redrawn
+    incremental_redraw = args.incremental
+    prev_indices = None
+    dirty_runs = np.zeros((rows * columns, 3), dtype=np.int32)
+    dirty_fraction_sum = 0.0
+    dirty_frames = 0
+
+    # Stage timers (ring buffer). 'P' toggles the on-screen overlay.
+    # With profiling off every timer call is a no-op.
+    profile_stages = not args.no_profile
+    show_overlay = False
+    stage_names = ["kernel", "copy", "raster", "draw", "flip", "tick"]
+    STAGE_KERNEL, STAGE_COPY, STAGE_RASTER, STAGE_DRAW, STAGE_FLIP, STAGE_TICK = range(6)
+    profiler = FrameProfiler(stage_names, capacity=1024, enabled=profile_stages)
+    overlay_font = pygame.font.SysFont('Courier New', 12)
+    overlay_surf = None
+    last_overlay_time = 0.0
+
     # Logging setup
-    json_filename = "session_log.json"
-    log_buffer = []
+    log_filename = args.log
+    metrics_log = MetricsSink(log_filename)
     last_report_time = time.time()
     report_interval = 4.0 # Seconds
 
+    # Explicit warm-up: compile (or load cached) kernels before the first frame
+    warmup_t0 = time.perf_counter()
+    producer.warm_up()
+    collect_dirty_runs(np.zeros((1, 1), dtype=np.int32), np.zeros((1, 1), dtype=np.int32), dirty_runs)
+    if raytraced:
+        tracer = SchwarzschildTracer(rows, columns, len(disk_chars))
+        tracer.render(0.0, 0.0)
+    warmup_s = time.perf_counter() - warmup_t0
+    print(f"[JIT] Warm-up ({backend}): {warmup_s:.2f}s")
+    if args.pipelined and not raytraced:
+        pipeline = PipelinedRenderer(producer, A, B, h_speed, v_speed).start()
+
+    # Live viewer: publish() only copies the frame; encoding and sockets run on other threads
+    viewer = FrameStreamer(args.serve) if args.serve else None
+
+    # Shared metrics (shared/telemetry.py): same names as Gray-Scott, told apart by the sim label.
+    # Recording is lock-free; the exporters read on their own threads.
+    registry = Registry({"sim": "gargantua", "backend": backend})
+    m_frames = registry.counter("sim_frames_total", "Frames presented")
+    m_frame_s = registry.histogram("sim_frame_seconds", "Wall time per frame", FRAME_BUCKETS)
+    m_steps = registry.counter("sim_steps_total", "Simulation steps (one orbit step per frame)")
+    m_points = registry.counter("sim_points_total", "Particles generated")
+    m_copy = registry.counter("sim_copy_bytes_total", "Device to host bytes")
+    m_fps = registry.gauge("sim_fps", "Frames per second (pygame clock)")
+    m_steps_s = registry.gauge("sim_steps_per_second", "Simulation steps per second")
+    m_particles = registry.gauge("sim_particles", "Particles per frame")
+    registry.gauge("sim_target_fps", "Frame rate target").set(TARGET_FPS)
+    registry.gauge("sim_warmup_seconds", "JIT warm-up").set(round(warmup_s, 3))
+    m_first_frame = registry.gauge("sim_time_to_first_frame_seconds", "Process start to first frame")
+    metrics_server = MetricsServer(registry, args.metrics_port) if args.metrics_port else None
+    metrics_jsonl = JsonlExporter(registry, args.metrics_jsonl, args.metrics_interval) if args.metrics_jsonl else None
+
     print(f"\n[GPU] Simulation started. Monitoring active (every {report_interval}s).")
-    print(f"[LOG] Writing metrics to {json_filename}")
+    print(f"[LOG] Writing metrics to {log_filename}")
 
+    first_frame = True
+    loop_start = time.perf_counter()
+    last_frame_t = loop_start
     while running:
         for event in pygame.event.get():
             if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
                 running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_i:
+                incremental_redraw = not incremental_redraw
+                prev_indices = None # Force one full redraw to resync the screen
+                print(f"[DISPLAY] Incremental redraw: {'ON' if incremental_redraw else 'OFF'}")
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_p and profiler.enabled:
+                show_overlay = not show_overlay
+                prev_indices = None # Full redraw clears the old overlay box
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_l:
+                adaptive_lod = not adaptive_lod
+                print(f"[LOD] Adaptive density: {'ON' if adaptive_lod else 'LOCKED'} at {total_points:,} particles")
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_o and not raytraced:
+                if pipeline is None:
+                    pipeline = PipelinedRenderer(producer, A, B, h_speed, v_speed).start()
+                else:
+                    pipeline.stop()
+                    pipeline = None
+                print(f"[PIPELINE] Producer thread: {'ON' if pipeline is not None else 'OFF'}")
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_h and not args.streaming:
+                # Applied by the producer at its next frame (also from the pipeline thread)
+                hdr_mode = not hdr_mode
+                producer.set_hdr(hdr_mode)
+                print(f"[HDR] Density accumulation: {'ON' if hdr_mode else 'OFF (nearest point)'}")
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_g:
+                raytraced = not raytraced
+                if raytraced and tracer is None:
+                    print("[RAYTRACE] Building geodesic table...")
+                    tracer = SchwarzschildTracer(rows, columns, len(disk_chars))
+                if pipeline is not None:
+                    pipeline.stop() # The tracer runs on the main thread
+                    pipeline = None
+                print(f"[RAYTRACE] Geodesic view: {'ON' if raytraced else 'OFF'}")
 
-        # 1. Compute
-        compute_points_kernel[blocks, threads_per_block](
-            A, B, 3.5, 9.0, d_points, d_colors, phi_points, theta_points, lensing_points
-        )
-        h_points = d_points.copy_to_host()
-        h_colors = d_colors.copy_to_host()
+        profiler.begin_frame()
 
-        # 2. Rasterize
-        grid_indices = rasterize_points(
-            h_points, h_colors, rows, columns, 
-            columns/2, rows/2, len(disk_chars)
-        )
+        # 1. Compute + 2. Rasterize
+        if raytraced:
+            grid_indices = tracer.render(A, B)
+            profiler.mark(STAGE_KERNEL)
+            profiler.mark(STAGE_COPY)
+            profiler.mark(STAGE_RASTER)
+        elif pipeline is not None:
+            # The 'kernel' slot becomes the time spent waiting on the producer thread
+            A, B, grid_indices = pipeline.get()
+            profiler.mark(STAGE_KERNEL)
+            profiler.mark(STAGE_COPY)
+            profiler.mark(STAGE_RASTER)
+        else:
+            grid_indices = producer.render(A, B, profiler, (STAGE_KERNEL, STAGE_COPY, STAGE_RASTER))
 
         # 3. Draw
-        screen.fill((0, 0, 0))
-        for r in range(rows):
-            for c in range(columns):
-                char_idx = grid_indices[r, c]
-                if char_idx != -1:
-                    screen.blit(char_surfaces[char_idx], (c * x_separator, r * y_separator))
-
-        pygame.display.flip()
+        if incremental_redraw and prev_indices is not None:
+            n_runs, n_dirty = collect_dirty_runs(prev_indices, grid_indices, dirty_runs)
+            rects = draw_dirty_cells(screen, grid_indices, dirty_runs, n_runs,
+                                     char_surfaces, x_separator, y_separator)
+        else:
+            draw_full_frame(screen, grid_indices, char_surfaces, x_separator, y_separator)
+            rects = None
+            n_dirty = rows * columns
+        prev_indices = grid_indices
+        dirty_fraction_sum += n_dirty / (rows * columns)
+        dirty_frames += 1
+
+        if show_overlay:
+            # Re-render the text twice a second; blitting the cached surface is cheap
+            now = time.perf_counter()
+            if overlay_surf is None or now - last_overlay_time >= 0.5:
+                lines = format_overlay_lines(profiler.percentiles())
+                line_h = overlay_font.get_linesize()
+                overlay_surf = pygame.Surface((300, line_h * len(lines) + 8))
+                for i, line in enumerate(lines):
+                    overlay_surf.blit(overlay_font.render(line, True, (200, 255, 200)), (4, 4 + i * line_h))
+                last_overlay_time = now
+            overlay_rect = screen.blit(overlay_surf, (0, 0))
+            if rects is not None:
+                rects.append(overlay_rect)
+        profiler.mark(STAGE_DRAW)
+
+        if viewer is not None and viewer.due():
+            viewer.publish(pygame.surfarray.pixels3d(screen).swapaxes(0, 1))
+        if rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+        profiler.mark(STAGE_FLIP)
+
+        if first_frame:
+            first_frame = False
+            now = time.perf_counter()
+            startup = {
+                "event": "startup",
+                "timestamp": datetime.datetime.now().isoformat(),
+                "backend": backend,
+                "resolution": f"{WIDTH}x{HEIGHT}",
+                "imports_s": round(config_start - _PROCESS_T0, 3),
+                "warmup_s": round(warmup_s, 3),
+                "time_to_first_frame_s": round(now - _PROCESS_T0 - (config_done - config_start), 3),
+            }
+            metrics_log.write(startup)
+            m_first_frame.set(startup["time_to_first_frame_s"])
+            print(f"[STARTUP] First frame after {startup['time_to_first_frame_s']:.2f}s "
+                  f"(imports {startup['imports_s']:.2f}s, warm-up {startup['warmup_s']:.2f}s, prompts excluded)")
         
         # 4. Updates & Monitoring
         A += h_speed
         B += v_speed
         clock.tick(TARGET_FPS)
+        profiler.mark(STAGE_TICK)
+        profiler.end_frame()
+
+        now = time.perf_counter()
+        m_frame_s.observe(now - last_frame_t)
+        last_frame_t = now
+        m_frames.inc()
+        m_steps.inc()
+        if not raytraced:
+            m_points.inc(total_points)
+            m_copy.inc(producer.copy_bytes)
+        fps_now = clock.get_fps()
+        m_fps.set(fps_now)
+        m_steps_s.set(fps_now)
+        m_particles.set(0 if raytraced else total_points)
+
+        # Level of detail: get_rawtime() is the frame's work time without the cap sleep
+        if adaptive_lod and not raytraced:
+            new_counts = lod.update(clock.get_rawtime())
+            if new_counts is not None:
+                phi_points, theta_points, lensing_points = new_counts
+                total_points = (phi_points * theta_points) + lensing_points
+                producer.set_counts(new_counts)
+                print(f"[LOD] Density x{lod.relative_density():.2f}: {total_points:,} particles "
+                      f"(phi {phi_points}, theta {theta_points}, lensing {lensing_points})")
         
+        if args.duration is not None and time.perf_counter() - loop_start >= args.duration:
+            running = False
+
         # Periodic Reporting
         current_time = time.time()
         if current_time - last_report_time >= report_interval:
             actual_fps = clock.get_fps()
+            dirty_fraction = dirty_fraction_sum / max(1, dirty_frames)
             # Log Data
             entry = {
                 "timestamp": datetime.datetime.now().isoformat(),
                 "target_fps": TARGET_FPS,
                 "actual_fps": round(actual_fps, 2),
                 "resolution": f"{WIDTH}x{HEIGHT}",
-                "particles": total_points
+                "particles": total_points,
+                "lod": {"adaptive": adaptive_lod, "phi": phi_points, "theta": theta_points,
+                        "lensing": lensing_points, "density": round(lod.relative_density(), 3)},
+                "incremental_redraw": incremental_redraw,
+                "pipelined": pipeline is not None,
+                "streaming": args.streaming,
+                "hdr": hdr_mode,
+                "raytraced": raytraced,
+                "dirty_fraction": round(dirty_fraction, 4)
             }
-            log_buffer.append(entry)
-            log_performance(json_filename, log_buffer)
-            log_buffer = [] # Clear buffer after write
+            if profiler.enabled:
+                entry["timings_ms"] = profiler.percentiles()
+            metrics_log.write(entry)
             
             # Console Output
-            print(f"[MONITOR] FPS: {actual_fps:.1f} / {TARGET_FPS} | Res: {WIDTH}x{HEIGHT}")
+            print(f"[MONITOR] FPS: {actual_fps:.1f} / {TARGET_FPS} | Res: {WIDTH}x{HEIGHT} | Dirty: {dirty_fraction * 100:.1f}%")
+            if profiler.enabled and "frame" in entry["timings_ms"]:
+                ft = entry["timings_ms"]["frame"]
+                print(f"[MONITOR] Frame ms p50/p95/p99: {ft['p50']:.2f} / {ft['p95']:.2f} / {ft['p99']:.2f}")
             last_report_time = current_time
+            dirty_fraction_sum = 0.0
+            dirty_frames = 0
 
+    if pipeline is not None:
+        pipeline.stop()
+    if viewer is not None:
+        viewer.close()
+    if metrics_server is not None:
+        metrics_server.close()
+    if metrics_jsonl is not None:
+        metrics_jsonl.close()
+    metrics_log.close()
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(sys.argv[1:])
\ No newline at end of file
@@ -0,0 +1,140 @@
+# metrics_log.py
+# Append-only session metrics (JSON Lines) with size-based rotation.
+# Each record is one line, so writing costs the same whether the log
+# holds ten entries or ten million.
+import os
+import sys
+import json
+import queue
+import threading
+
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024 # Rotate after ~5 MB
+DEFAULT_BACKUPS = 3                 # session_log.jsonl.1 ... .3
+
+class MetricsSink:
+    """
+    Background JSON Lines writer.
+    write() only enqueues; a daemon thread appends the lines and rotates
+    the file once it grows past max_bytes.
+    """
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="metrics-sink", daemon=True)
+        self._thread.start()
+
+    def write(self, entry):
+        """Queue one record (a JSON-serializable dict). Never blocks the caller."""
+        self._queue.put(entry)
+
+    def close(self):
+        """Flush pending records and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _rotate(self):
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def _run(self):
+        f = open(self.path, 'a')
+        try:
+            while True:
+                entry = self._queue.get()
+                if entry is None:
+                    break
+                # Drain whatever else is waiting so a burst costs one flush
+                batch = [entry]
+                stop = False
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+
+                try:
+                    for item in batch:
+                        f.write(json.dumps(item, separators=(',', ':')) + "\n")
+                    f.flush()
+                    if f.tell() >= self.max_bytes:
+                        f.close()
+                        self._rotate()
+                        f = open(self.path, 'a')
+                except Exception as e:
+                    print(f"[LOG ERROR] Could not write metrics: {e}")
+
+                if stop:
+                    break
+        finally:
+            f.close()
+
+# -----------------------------
+# READERS
+# -----------------------------
+def read_metrics(path, include_rotated=True):
+    """
+    Yields records oldest-first from a .jsonl log (plus its rotated backups)
+    or from a legacy session_log.json array.
+    """
+    if path.endswith(".json"):
+        with open(path, 'r') as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError:
+                data = []
+        for entry in data:
+            yield entry
+        return
+
+    files = []
+    if include_rotated:
+        i = 1
+        while os.path.exists(f"{path}.{i}"):
+            files.append(f"{path}.{i}")
+            i += 1
+        files.reverse() # Highest suffix is the oldest
+    if os.path.exists(path):
+        files.append(path)
+
+    for name in files:
+        with open(name, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn last line from a killed session; skip it
+                    continue
+
+def convert_legacy_log(json_path, jsonl_path):
+    """Appends every record of an old session_log.json to a .jsonl log. Returns the count."""
+    count = 0
+    with open(jsonl_path, 'a') as out:
+        for entry in read_metrics(json_path):
+            out.write(json.dumps(entry, separators=(',', ':')) + "\n")
+            count += 1
+    return count
+
+if __name__ == "__main__":
+    # Usage: python metrics_log.py session_log.json [session_log.jsonl]
+    if len(sys.argv) < 2:
+        print("Usage: python metrics_log.py <session_log.json> [output.jsonl]")
+        sys.exit(1)
+    src = sys.argv[1]
+    dst = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(src)[0] + ".jsonl"
+    n = convert_legacy_log(src, dst)
+    print(f"[LOG] Converted {n} records: {src} -> {dst}")
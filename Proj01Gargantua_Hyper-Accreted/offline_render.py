@@ -0,0 +1,183 @@
+# offline_render.py
+# Headless renderer: writes a fixed A/B orbit path to an image sequence.
+# Each frame depends only on its (A, B), so frames are spread over a process
+# pool and every worker writes its own files straight to disk.
+# Runs on CPU only (no display, no CUDA device needed).
+#
+# Usage:
+#   python offline_render.py --width 7680 --height 4320 --frames 600 --workers 8
+#   python offline_render.py --frames 120 --scaling 1,2,4,8   (frames/sec per worker count)
+import os
+import sys
+import json
+import time
+import argparse
+import warnings
+import threading
+import multiprocessing
+import numpy as np
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+warnings.filterwarnings("ignore", category=RuntimeWarning, module="importlib._bootstrap")
+
+from lod import BASE_PHI, BASE_THETA, BASE_LENSING
+
+WARMUP_TIMEOUT = 600.0 # Seconds for every worker to import, load fonts and compile
+
+# Per-process state, filled by _init_worker
+_worker = {}
+
+def orbit_angles(frame, a0, b0, h_speed, v_speed):
+    """Camera angles for one frame of the orbit (same increments as the live loop at 60 FPS)."""
+    return a0 + frame * h_speed, b0 + frame * v_speed
+
+def cell_size(font_size):
+    """Character cell in pixels, scaled from the 14pt / 10x18 reference."""
+    from ascii_frame import FONT_SIZE, X_SEPARATOR, Y_SEPARATOR
+    x_sep = max(1, round(X_SEPARATOR * font_size / FONT_SIZE))
+    y_sep = max(1, round(Y_SEPARATOR * font_size / FONT_SIZE))
+    return x_sep, y_sep
+
+def _init_worker(settings, ready):
+    """
+    Pool initializer: one font, glyph set and point buffer per process, plus JIT warm-up.
+    Then waits on `ready`, a barrier shared with every worker and the parent.
+    """
+    import pygame
+    import numba
+    from kernels import compute_points_cpu, rasterize_points
+    from ascii_frame import DISK_CHARS, build_char_surfaces, draw_full_frame
+
+    # Parallelism comes from the pool; keep Numba single-threaded inside each worker
+    numba.set_num_threads(settings["threads_per_worker"])
+
+    pygame.font.init()
+    font = pygame.font.SysFont('Courier New', settings["font_size"], bold=True)
+    total = settings["phi"] * settings["theta"] + settings["lensing"]
+    x_sep, y_sep = cell_size(settings["font_size"])
+
+    _worker.update(settings)
+    _worker["pygame"] = pygame
+    _worker["compute"] = compute_points_cpu
+    _worker["rasterize"] = rasterize_points
+    _worker["draw"] = draw_full_frame
+    _worker["chars_len"] = len(DISK_CHARS)
+    _worker["char_surfaces"] = build_char_surfaces(font)
+    _worker["surface"] = pygame.Surface((settings["width"], settings["height"]))
+    _worker["points"] = np.zeros((total, 3), dtype=np.float32)
+    _worker["colors"] = np.zeros((total, 2), dtype=np.float32)
+    _worker["x_sep"], _worker["y_sep"] = x_sep, y_sep
+    _worker["rows"] = settings["height"] // y_sep
+    _worker["cols"] = settings["width"] // x_sep
+
+    # Compile outside the timed region
+    _render_grid(0.0, 0.0)
+    ready.wait()
+
+def _render_grid(A, B):
+    w = _worker
+    w["compute"](A, B, 3.5, 9.0, w["points"], w["colors"], w["phi"], w["theta"], w["lensing"])
+    rows, cols = w["rows"], w["cols"]
+    # Projection scale grows with the grid so the disk keeps its framing at any size
+    zoom = w["zoom"] * min(cols / 192.0, rows / 66.0)
+    return w["rasterize"](w["points"], w["colors"], rows, cols, cols / 2, rows / 2,
+                          w["chars_len"], 30.0 * zoom, 20.0 * zoom)
+
+def render_frame(frame):
+    """Renders and saves one frame. Returns (frame, seconds)."""
+    w = _worker
+    t0 = time.perf_counter()
+    A, B = orbit_angles(frame, w["a0"], w["b0"], w["h_speed"], w["v_speed"])
+    grid = _render_grid(A, B)
+    w["draw"](w["surface"], grid, w["char_surfaces"], w["x_sep"], w["y_sep"])
+    path = os.path.join(w["out_dir"], f"frame_{frame:05d}.{w['format']}")
+    w["pygame"].image.save(w["surface"], path)
+    return frame, time.perf_counter() - t0
+
+def render_sequence(settings, workers):
+    """Renders settings["frames"] frames with `workers` processes. Returns a result dict."""
+    os.makedirs(settings["out_dir"], exist_ok=True)
+    ctx = multiprocessing.get_context("spawn")
+    ready = ctx.Barrier(workers + 1)
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(settings, ready)) as pool:
+        # Timing starts only once every worker has finished its warm-up
+        try:
+            ready.wait(timeout=WARMUP_TIMEOUT)
+        except threading.BrokenBarrierError:
+            raise RuntimeError(f"workers did not finish warming up within {WARMUP_TIMEOUT:.0f}s") from None
+
+        t0 = time.perf_counter()
+        frame_times = []
+        done = 0
+        for frame, seconds in pool.imap_unordered(render_frame, range(settings["frames"]), chunksize=1):
+            frame_times.append(seconds)
+            done += 1
+            if done % 50 == 0:
+                print(f"[OFFLINE] {done}/{settings['frames']} frames")
+        wall = time.perf_counter() - t0
+
+    fps = settings["frames"] / wall if wall > 0 else 0.0
+    return {
+        "workers": workers,
+        "frames": settings["frames"],
+        "seconds": round(wall, 3),
+        "fps": round(fps, 2),
+        "fps_per_worker": round(fps / workers, 2),
+        "mean_frame_ms": round(1000.0 * float(np.mean(frame_times)), 2),
+        "resolution": f"{settings['width']}x{settings['height']}",
+        "particles": settings["phi"] * settings["theta"] + settings["lensing"],
+    }
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Headless Gargantua image-sequence renderer (CPU).")
+    p.add_argument("--width", type=int, default=3840)
+    p.add_argument("--height", type=int, default=2160)
+    p.add_argument("--frames", type=int, default=240)
+    p.add_argument("--phi", type=int, default=BASE_PHI)
+    p.add_argument("--theta", type=int, default=BASE_THETA)
+    p.add_argument("--lensing", type=int, default=BASE_LENSING)
+    p.add_argument("--font-size", type=int, default=14)
+    p.add_argument("--zoom", type=float, default=1.0, help="Extra projection scale on top of grid fitting")
+    p.add_argument("--a0", type=float, default=0.0)
+    p.add_argument("--b0", type=float, default=0.0)
+    p.add_argument("--h-speed", type=float, default=0.01, help="A increment per frame")
+    p.add_argument("--v-speed", type=float, default=0.005, help="B increment per frame")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--threads-per-worker", type=int, default=1)
+    p.add_argument("--scaling", type=str, default="",
+                   help="Comma-separated worker counts to benchmark, e.g. 1,2,4,8")
+    p.add_argument("--format", choices=["png", "bmp", "tga"], default="png")
+    p.add_argument("--out", type=str, default="offline_frames")
+    return p.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    settings = {
+        "width": args.width, "height": args.height, "frames": args.frames,
+        "phi": args.phi, "theta": args.theta, "lensing": args.lensing,
+        "font_size": args.font_size, "zoom": args.zoom,
+        "a0": args.a0, "b0": args.b0, "h_speed": args.h_speed, "v_speed": args.v_speed,
+        "threads_per_worker": args.threads_per_worker,
+        "format": args.format, "out_dir": args.out,
+    }
+    worker_counts = [int(x) for x in args.scaling.split(",") if x.strip()] or [args.workers]
+
+    particles = args.phi * args.theta + args.lensing
+    print(f"[OFFLINE] {args.frames} frames @ {args.width}x{args.height}, {particles:,} particles -> {args.out}/")
+
+    results = []
+    for workers in worker_counts:
+        res = render_sequence(settings, workers)
+        results.append(res)
+        print(f"[OFFLINE] workers={workers:<3} {res['fps']:8.2f} frames/s "
+              f"({res['fps_per_worker']:.2f} per worker, {res['mean_frame_ms']:.1f} ms/frame)")
+
+    report_path = os.path.join(args.out, "render_report.json")
+    with open(report_path, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"[OFFLINE] Report written to {report_path}")
+    return results
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
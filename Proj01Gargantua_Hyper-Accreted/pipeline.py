@@ -0,0 +1,207 @@
+# pipeline.py
+# Frame production (kernel -> copy -> rasterize) and an optional pipelined
+# producer thread. Frame N+1's geometry depends only on the next (A, B), so a
+# worker thread can build it while the main thread blits frame N.
+# rasterize_points is compiled with nogil=True, so the two threads really overlap.
+import time
+import queue
+import threading
+import numpy as np
+from numba import cuda
+
+from kernels import compute_points_kernel, compute_points_cpu, rasterize_points
+from streaming import StreamingRasterizer, DEFAULT_CHUNK
+from hdr_raster import HDRRasterizer
+
+class GridProducer:
+    """
+    Owns the point buffers and turns (A, B) into a glyph-index grid.
+    backend: "cuda" (device kernel + copies) or "cpu" (compute_points_cpu, no copies).
+    streaming: generate + depth-test in chunks into screen-sized buffers (streaming.py)
+    instead of holding every point; memory no longer grows with the particle count.
+    hdr: splat every point into an HDR buffer and tone-map it (hdr_raster.py) instead
+    of keeping the nearest point per cell. Ignored while streaming.
+    """
+    def __init__(self, rows, cols, chars_len, counts, threads_per_block=256, backend="cuda",
+                 streaming=False, chunk=DEFAULT_CHUNK, hdr=False):
+        self.rows = rows
+        self.cols = cols
+        self.chars_len = chars_len
+        self.threads_per_block = threads_per_block
+        self.backend = backend
+        self.streaming = streaming
+        self.streamer = None
+        if streaming:
+            self.streamer = StreamingRasterizer(rows, cols, chars_len, backend=backend,
+                                                chunk=chunk, threads_per_block=threads_per_block)
+        self.hdr = None
+        self.copy_bytes = 0 # Device -> host bytes of the last render (0 on cpu)
+        self._pending_counts = None
+        self._pending_hdr = None
+        self._lock = threading.Lock()
+        self._allocate(counts)
+        self._set_hdr(hdr)
+
+    def _set_hdr(self, enabled):
+        if enabled and self.hdr is None and not self.streaming:
+            self.hdr = HDRRasterizer(self.rows, self.cols, self.chars_len, backend=self.backend,
+                                     threads_per_block=self.threads_per_block)
+        elif not enabled:
+            self.hdr = None
+
+    def _allocate(self, counts):
+        self.phi, self.theta, self.lensing = counts
+        self.total_points = self.phi * self.theta + self.lensing
+        if self.streaming:
+            return # Screen buffers are persistent; nothing scales with the count
+        if self.backend == "cpu":
+            self.h_points = np.zeros((self.total_points, 3), dtype=np.float32)
+            self.h_colors = np.zeros((self.total_points, 2), dtype=np.float32)
+        else:
+            self.d_points = cuda.device_array((self.total_points, 3), dtype=np.float32)
+            self.d_colors = cuda.device_array((self.total_points, 2), dtype=np.float32)
+        self.blocks = (self.total_points + (self.threads_per_block - 1)) // self.threads_per_block
+
+    def set_counts(self, counts):
+        """Requests new particle counts; applied at the start of the next render()."""
+        with self._lock:
+            self._pending_counts = counts
+
+    def set_hdr(self, enabled):
+        """Switches HDR accumulation on/off at the start of the next render()."""
+        with self._lock:
+            self._pending_hdr = enabled
+
+    def render(self, A, B, profiler=None, stages=(0, 1, 2)):
+        """
+        Computes, copies and rasterizes one frame.
+        With a profiler, stages = (kernel, copy, raster) indices to mark.
+        """
+        with self._lock:
+            counts, self._pending_counts = self._pending_counts, None
+            hdr, self._pending_hdr = self._pending_hdr, None
+        if counts is not None:
+            self._allocate(counts)
+        if hdr is not None:
+            self._set_hdr(hdr)
+
+        grid_bytes = self.rows * self.cols * 4
+        if self.streaming:
+            grid_indices = self.streamer.render(A, B, (self.phi, self.theta, self.lensing))
+            self.copy_bytes = 0 if self.backend == "cpu" else grid_bytes
+            if profiler is not None:
+                # Generation, projection and depth test are one fused pass
+                profiler.mark(stages[0])
+                profiler.mark(stages[1])
+                profiler.mark(stages[2])
+            return grid_indices
+
+        if self.backend == "cpu":
+            compute_points_cpu(A, B, 3.5, 9.0, self.h_points, self.h_colors,
+                               self.phi, self.theta, self.lensing)
+            if profiler is not None:
+                profiler.mark(stages[0])
+            h_points, h_colors = self.h_points, self.h_colors
+            self.copy_bytes = 0
+        elif self.hdr is not None:
+            # Points stay on the device: splat there and copy back only the glyph grid
+            compute_points_kernel[self.blocks, self.threads_per_block](
+                A, B, 3.5, 9.0, self.d_points, self.d_colors, self.phi, self.theta, self.lensing
+            )
+            if profiler is not None and profiler.enabled:
+                cuda.synchronize()
+                profiler.mark(stages[0])
+                profiler.mark(stages[1])
+            grid_indices = self.hdr.render(self.d_points, self.d_colors)
+            self.copy_bytes = grid_bytes + 8 # Glyph grid + the two density stats
+            if profiler is not None:
+                profiler.mark(stages[2])
+            return grid_indices
+        else:
+            compute_points_kernel[self.blocks, self.threads_per_block](
+                A, B, 3.5, 9.0, self.d_points, self.d_colors, self.phi, self.theta, self.lensing
+            )
+            if profiler is not None and profiler.enabled:
+                cuda.synchronize() # Otherwise the kernel time hides inside the first copy
+                profiler.mark(stages[0])
+            h_points = self.d_points.copy_to_host()
+            h_colors = self.d_colors.copy_to_host()
+            self.copy_bytes = self.d_points.nbytes + self.d_colors.nbytes
+        if profiler is not None:
+            profiler.mark(stages[1])
+
+        if self.hdr is not None:
+            grid_indices = self.hdr.render(h_points, h_colors)
+        else:
+            grid_indices = rasterize_points(
+                h_points, h_colors, self.rows, self.cols,
+                self.cols/2, self.rows/2, self.chars_len
+            )
+        if profiler is not None:
+            profiler.mark(stages[2])
+        return grid_indices
+
+    def warm_up(self):
+        """Compiles (or loads from cache) every kernel on the frame path. Returns seconds."""
+        t0 = time.perf_counter()
+        self.render(0.0, 0.0)
+        if self.backend != "cpu":
+            cuda.synchronize()
+        return time.perf_counter() - t0
+
+class PipelinedRenderer:
+    """
+    Runs GridProducer.render on a worker thread, one frame ahead of the display.
+    The queue holds at most `depth` finished frames (default 1), which bounds the
+    added latency to one frame.
+    """
+    def __init__(self, producer, A, B, h_speed, v_speed, depth=1):
+        self.producer = producer
+        self.A, self.B = A, B
+        self.h_speed = h_speed
+        self.v_speed = v_speed
+        self._queue = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="frame-producer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        A, B = self.A, self.B
+        try:
+            while not self._stop.is_set():
+                grid = self.producer.render(A, B)
+                item = (A, B, grid)
+                # Re-check the stop flag while the display is behind
+                while not self._stop.is_set():
+                    try:
+                        self._queue.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                A += self.h_speed
+                B += self.v_speed
+        except Exception as e:
+            self._error = e
+            self._stop.set()
+
+    def get(self):
+        """Blocks until the next frame is ready. Returns (A, B, grid_indices)."""
+        while True:
+            if self._error is not None:
+                raise self._error
+            try:
+                return self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if not self._thread.is_alive() and self._error is None:
+                    raise RuntimeError("frame producer stopped")
+
+    def stop(self):
+        """Stops the worker and drops any frame it had queued."""
+        self._stop.set()
+        self._thread.join()
+        while not self._queue.empty():
+            self._queue.get_nowait()
@@ -0,0 +1,276 @@
+# streaming.py
+# Chunked streaming point generation for multi-million-particle disks.
+# Instead of materializing every particle in d_points/d_colors, copying them to
+# the host and rasterizing, points are generated, projected and depth-tested in
+# fixed-size chunks straight into persistent screen-sized buffers. Memory then
+# depends on the character grid, not on the particle count, and only the final
+# rows x cols glyph grid crosses the bus.
+#
+# Usage (particles/sec as the count scales):
+#   python streaming.py [--backend cpu|cuda] [--cols 192 --rows 66] [--json results.json]
+import os
+import gc
+import sys
+import time
+import json
+import ctypes
+import argparse
+import numpy as np
+import numba
+from numba import cuda, jit, prange
+
+from kernels import compute_point_device, compute_point_cpu
+
+DEFAULT_CHUNK = 1 << 16 # 65,536 points per launch / work item
+
+# Depth keys: inverse depth is quantized to 32 bits and packed above the glyph index,
+# so one 64-bit atomic max keeps the nearest point per cell.
+DEPTH_SCALE = float(1 << 24)
+DEPTH_MAX = float((1 << 32) - 1)
+
+# -----------------------------
+# 1. CUDA PATH
+# -----------------------------
+@cuda.jit(cache=True)
+def stream_points_kernel(A, B, disk_inner, disk_outer, phi_steps, theta_steps, lensing_steps,
+                         offset, count, rows, cols, x_off, y_off, scale_x, scale_y, chars_len, depth_keys):
+    i = cuda.grid(1)
+    if i >= count:
+        return
+    idx = offset + i
+    x, y, z, hue, lum = compute_point_device(idx, A, B, disk_inner, disk_outer,
+                                             phi_steps, theta_steps, lensing_steps)
+    dist = z + 8.0
+    if dist > 0:
+        D = 1.0 / dist
+        sx = int(x_off + scale_x * D * x)
+        sy = int(y_off + scale_y * D * y)
+        if 0 <= sx < cols and 0 <= sy < rows:
+            c_idx = int(lum * chars_len)
+            if c_idx >= chars_len: c_idx = chars_len - 1
+            if c_idx < 0: c_idx = 0
+            q = D * DEPTH_SCALE
+            if q > DEPTH_MAX: q = DEPTH_MAX
+            key = (numba.uint64(q) << numba.uint64(32)) | numba.uint64(c_idx + 1)
+            cuda.atomic.max(depth_keys, (sy, sx), key)
+
+@cuda.jit(cache=True)
+def decode_depth_keys(depth_keys, out):
+    """Unpacks glyph indices (-1 = empty) and clears the keys for the next frame."""
+    c, r = cuda.grid(2)
+    if r < out.shape[0] and c < out.shape[1]:
+        key = depth_keys[r, c]
+        out[r, c] = numba.int32(key & numba.uint64(0xFFFFFFFF)) - 1
+        depth_keys[r, c] = numba.uint64(0)
+
+# -----------------------------
+# 2. CPU PATH
+# -----------------------------
+@jit(nopython=True, parallel=True, nogil=True, cache=True)
+def stream_points_cpu(A, B, disk_inner, disk_outer, phi_steps, theta_steps, lensing_steps,
+                      chunk, rows, cols, x_off, y_off, scale_x, scale_y, chars_len,
+                      z_bufs, idx_bufs, out):
+    """
+    Each worker slot owns one z-buffer and takes every n_slots-th chunk; the slots
+    are merged by depth at the end. Memory: n_slots x rows x cols.
+    """
+    n_slots = z_bufs.shape[0]
+    total = phi_steps * theta_steps + lensing_steps
+    n_chunks = (total + chunk - 1) // chunk
+
+    for t in prange(n_slots):
+        z_buf = z_bufs[t]
+        i_buf = idx_bufs[t]
+        z_buf[:, :] = 0.0
+        i_buf[:, :] = -1
+        for ch in range(t, n_chunks, n_slots):
+            start = ch * chunk
+            end = min(total, start + chunk)
+            for idx in range(start, end):
+                x, y, z, hue, lum = compute_point_cpu(idx, A, B, disk_inner, disk_outer,
+                                                      phi_steps, theta_steps, lensing_steps)
+                dist = z + 8.0
+                if dist > 0:
+                    D = 1.0 / dist
+                    sx = int(x_off + scale_x * D * x)
+                    sy = int(y_off + scale_y * D * y)
+                    if 0 <= sx < cols and 0 <= sy < rows:
+                        if D > z_buf[sy, sx]:
+                            z_buf[sy, sx] = D
+                            c_idx = int(lum * chars_len)
+                            if c_idx >= chars_len: c_idx = chars_len - 1
+                            if c_idx < 0: c_idx = 0
+                            i_buf[sy, sx] = c_idx
+
+    for r in prange(rows):
+        for c in range(cols):
+            best = 0.0
+            best_idx = -1
+            for t in range(n_slots):
+                if z_bufs[t, r, c] > best:
+                    best = z_bufs[t, r, c]
+                    best_idx = idx_bufs[t, r, c]
+            out[r, c] = best_idx
+
+class StreamingRasterizer:
+    """Persistent screen buffers + chunked generation. render(A, B, counts) -> glyph grid."""
+    def __init__(self, rows, cols, chars_len, backend="cuda", chunk=DEFAULT_CHUNK, threads_per_block=256):
+        self.rows = rows
+        self.cols = cols
+        self.chars_len = chars_len
+        self.backend = backend
+        self.chunk = chunk
+        self.threads_per_block = threads_per_block
+        if backend == "cpu":
+            n_slots = numba.get_num_threads()
+            self.z_bufs = np.zeros((n_slots, rows, cols), dtype=np.float32)
+            self.idx_bufs = np.full((n_slots, rows, cols), -1, dtype=np.int32)
+        else:
+            self.d_keys = cuda.to_device(np.zeros((rows, cols), dtype=np.uint64))
+            self.d_out = cuda.device_array((rows, cols), dtype=np.int32)
+            tpb = 16
+            self.decode_threads = (tpb, tpb)
+            self.decode_blocks = ((cols + tpb - 1) // tpb, (rows + tpb - 1) // tpb)
+
+    def buffer_bytes(self):
+        """Bytes held by the persistent buffers (independent of particle count)."""
+        if self.backend == "cpu":
+            return self.z_bufs.nbytes + self.idx_bufs.nbytes
+        return self.d_keys.nbytes + self.d_out.nbytes
+
+    def render(self, A, B, counts, scale_x=30.0, scale_y=20.0):
+        phi, theta, lensing = counts
+        rows, cols = self.rows, self.cols
+        out = np.empty((rows, cols), dtype=np.int32) # Fresh grid: callers keep the previous one
+        if self.backend == "cpu":
+            stream_points_cpu(A, B, 3.5, 9.0, phi, theta, lensing, self.chunk,
+                              rows, cols, cols / 2, rows / 2, scale_x, scale_y, self.chars_len,
+                              self.z_bufs, self.idx_bufs, out)
+            return out
+
+        total = phi * theta + lensing
+        blocks = (self.chunk + self.threads_per_block - 1) // self.threads_per_block
+        for offset in range(0, total, self.chunk):
+            count = min(self.chunk, total - offset)
+            stream_points_kernel[blocks, self.threads_per_block](
+                A, B, 3.5, 9.0, phi, theta, lensing, offset, count,
+                rows, cols, cols / 2, rows / 2, scale_x, scale_y, self.chars_len, self.d_keys
+            )
+        decode_depth_keys[self.decode_blocks, self.decode_threads](self.d_keys, self.d_out)
+        self.d_out.copy_to_host(out)
+        return out
+
+# -----------------------------
+# 3. SCALING BENCHMARK
+# -----------------------------
+def _rss_bytes():
+    """Resident set size of this process (0 if the platform doesn't expose it)."""
+    if sys.platform == "win32":
+        class Counters(ctypes.Structure):
+            _fields_ = [("cb", ctypes.c_ulong), ("PageFaultCount", ctypes.c_ulong)] + \
+                       [(n, ctypes.c_size_t) for n in ("PeakWorkingSetSize", "WorkingSetSize",
+                        "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage", "QuotaPeakNonPagedPoolUsage",
+                        "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+        c = Counters()
+        c.cb = ctypes.sizeof(c)
+        ok = ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                      ctypes.byref(c), c.cb)
+        return c.WorkingSetSize if ok else 0
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+def _device_used_bytes(backend):
+    if backend == "cpu":
+        return 0
+    free, total = cuda.current_context().get_memory_info()
+    return total - free
+
+def benchmark(backend="cpu", rows=66, cols=192, scales=(1, 4, 16, 64, 256), frames=10, chunk=DEFAULT_CHUNK):
+    """
+    Particles/sec and memory footprint of streaming vs buffered as the particle
+    count grows (scale 1 = 350 x 120 + 400 = 42,400 points). The footprint is
+    measured, not modeled: the largest resident-set growth (plus device memory on
+    CUDA) from before the renderer is built until its last frame, so it covers the
+    persistent buffers, per-frame copies and anything Numba allocates.
+    """
+    from pipeline import GridProducer
+    from lod import BASE_PHI, BASE_THETA, BASE_LENSING
+
+    def make(mode, counts):
+        if mode == "buffered":
+            producer = GridProducer(rows, cols, 14, counts, backend=backend)
+            return producer, lambda A, B: producer.render(A, B)
+        streamer = StreamingRasterizer(rows, cols, 14, backend=backend, chunk=chunk)
+        return streamer, lambda A, B: streamer.render(A, B, counts)
+
+    # Compile both paths first so JIT memory doesn't land in the first measurement
+    for mode in ("streaming", "buffered"):
+        _, render = make(mode, (BASE_PHI, BASE_THETA, BASE_LENSING))
+        render(0.0, 0.3)
+    if backend != "cpu":
+        cuda.synchronize()
+
+    results = []
+    for scale in scales:
+        k = scale ** 0.5
+        counts = (int(BASE_PHI * k), int(BASE_THETA * k), int(BASE_LENSING * k))
+        total = counts[0] * counts[1] + counts[2]
+        run = {"particles": total, "counts": list(counts)}
+
+        for mode in ("streaming", "buffered"):
+            gc.collect()
+            rss0, dev0 = _rss_bytes(), _device_used_bytes(backend)
+            owner, render = make(mode, counts)
+            render(0.0, 0.3)
+            if backend != "cpu":
+                cuda.synchronize()
+            rss_peak, dev_peak = _rss_bytes(), _device_used_bytes(backend)
+
+            t0 = time.perf_counter()
+            for f in range(frames):
+                render(0.01 * f, 0.3 + 0.005 * f)
+                rss_peak = max(rss_peak, _rss_bytes())
+            if backend != "cpu":
+                cuda.synchronize()
+            elapsed = time.perf_counter() - t0
+            dev_peak = max(dev_peak, _device_used_bytes(backend))
+
+            host = max(0, rss_peak - rss0)
+            device = max(0, dev_peak - dev0)
+            run[mode] = {
+                "particles_per_sec": round(total * frames / elapsed, 1),
+                "ms_per_frame": round(1000.0 * elapsed / frames, 3),
+                "host_bytes": host,
+                "device_bytes": device,
+                "footprint_bytes": host + device,
+            }
+            if mode == "buffered":
+                run[mode]["point_buffer_bytes"] = total * (3 + 2) * 4
+            else:
+                run[mode]["screen_buffer_bytes"] = owner.buffer_bytes()
+            del owner, render
+
+        results.append(run)
+        print(f"[STREAM] {total:>11,} pts | streaming {run['streaming']['particles_per_sec'] / 1e6:8.2f} M/s "
+              f"({run['streaming']['footprint_bytes'] / 1e6:7.2f} MB, buffers "
+              f"{run['streaming']['screen_buffer_bytes'] / 1e6:.2f} MB) | buffered "
+              f"{run['buffered']['particles_per_sec'] / 1e6:8.2f} M/s "
+              f"({run['buffered']['footprint_bytes'] / 1e6:7.2f} MB, points {run['buffered']['point_buffer_bytes'] / 1e6:.1f} MB)")
+    return results
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Streaming vs buffered point generation scaling.")
+    p.add_argument("--backend", choices=["cpu", "cuda"], default="cuda" if cuda.is_available() else "cpu")
+    p.add_argument("--cols", type=int, default=192)
+    p.add_argument("--rows", type=int, default=66)
+    p.add_argument("--frames", type=int, default=10)
+    p.add_argument("--chunk", type=int, default=DEFAULT_CHUNK)
+    p.add_argument("--json", type=str, default="")
+    args = p.parse_args(sys.argv[1:])
+    res = benchmark(args.backend, args.rows, args.cols, frames=args.frames, chunk=args.chunk)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(res, f, indent=4)
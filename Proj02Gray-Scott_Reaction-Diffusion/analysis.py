@@ -0,0 +1,406 @@
+# analysis.py
+# Pattern statistics computed where the grids live, so a long run can be watched
+# (and stopped once the pattern settles) without reading back full frames.
+#
+# Per call, from the current U / V grids:
+#   coverage      fraction of cells with v > threshold
+#   mean / var    of u and v
+#   blobs         connected components of the v > threshold mask (4-neighbour, toroidal)
+#   wavelength    dominant pattern wavelength in cells, from the radial power spectrum
+# CUDA: block reductions + atomics, label propagation with pointer jumping, and a
+# box-filtered fft_size x fft_size copy of v for the FFT (Numba has no device FFT).
+# Only a handful of scalars and that small field are copied to the host.
+#
+# Headless run with early stop:
+#   python analysis.py --frames 20000 --interval 50 --log pattern_stats.jsonl --early-stop
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+import numpy as np
+import numba
+from numba import cuda, njit, prange
+import config
+
+STATS_TPB = 16 # Reduction kernel assumes 16 x 16 = 256 threads per block
+N_SUMS = 5 # sum u, sum u^2, sum v, sum v^2, count(v > threshold)
+LABEL_CHECK_EVERY = 8 # Propagation passes between host checks of the 'changed' flag
+
+# -----------------------------
+# 1. CUDA KERNELS
+# -----------------------------
+@cuda.jit
+def reduce_stats_kernel(u, v, threshold, sums):
+    x, y = cuda.grid(2)
+    h, w = u.shape
+    sm = cuda.shared.array((N_SUMS, 256), dtype=numba.float64)
+    tid = cuda.threadIdx.y * STATS_TPB + cuda.threadIdx.x
+
+    uu = 0.0
+    vv = 0.0
+    hit = 0.0
+    if x < w and y < h:
+        uu = u[y, x]
+        vv = v[y, x]
+        if vv > threshold:
+            hit = 1.0
+    sm[0, tid] = uu
+    sm[1, tid] = uu * uu
+    sm[2, tid] = vv
+    sm[3, tid] = vv * vv
+    sm[4, tid] = hit
+    cuda.syncthreads()
+
+    s = 128
+    while s > 0:
+        if tid < s:
+            for k in range(N_SUMS):
+                sm[k, tid] += sm[k, tid + s]
+        cuda.syncthreads()
+        s //= 2
+
+    if tid == 0:
+        for k in range(N_SUMS):
+            cuda.atomic.add(sums, k, sm[k, 0])
+
+@cuda.jit
+def init_labels_kernel(v, threshold, labels):
+    """Masked cells start with their own flat index + 1; background is 0."""
+    x, y = cuda.grid(2)
+    h, w = v.shape
+    if x < w and y < h:
+        labels[y, x] = y * w + x + 1 if v[y, x] > threshold else 0
+
+@cuda.jit
+def propagate_labels_kernel(labels, changed):
+    """Each masked cell takes the smallest label among itself and its neighbours."""
+    x, y = cuda.grid(2)
+    h, w = labels.shape
+    if x < w and y < h:
+        own = labels[y, x]
+        if own > 0:
+            m = own
+            l = labels[y, (x - 1) % w]
+            if 0 < l < m: m = l
+            l = labels[y, (x + 1) % w]
+            if 0 < l < m: m = l
+            l = labels[(y - 1) % h, x]
+            if 0 < l < m: m = l
+            l = labels[(y + 1) % h, x]
+            if 0 < l < m: m = l
+            if m < own:
+                labels[y, x] = m
+                changed[0] = 1
+
+@cuda.jit
+def jump_labels_kernel(labels):
+    """Pointer jumping: adopt the label of the cell our label points at."""
+    x, y = cuda.grid(2)
+    h, w = labels.shape
+    if x < w and y < h:
+        l = labels[y, x]
+        if l > 0:
+            idx = l - 1
+            parent = labels[idx // w, idx % w]
+            if 0 < parent < l:
+                labels[y, x] = parent
+
+@cuda.jit
+def count_roots_kernel(labels, count):
+    x, y = cuda.grid(2)
+    h, w = labels.shape
+    if x < w and y < h:
+        if labels[y, x] == y * w + x + 1:
+            cuda.atomic.add(count, 0, 1)
+
+@cuda.jit
+def downsample_kernel(v, out):
+    """Box-filters v into out (n_r x n_c)."""
+    j, i = cuda.grid(2)
+    n_r, n_c = out.shape
+    h, w = v.shape
+    if i < n_r and j < n_c:
+        r0 = i * h // n_r
+        r1 = (i + 1) * h // n_r
+        c0 = j * w // n_c
+        c1 = (j + 1) * w // n_c
+        s = 0.0
+        for r in range(r0, r1):
+            for c in range(c0, c1):
+                s += v[r, c]
+        out[i, j] = s / ((r1 - r0) * (c1 - c0))
+
+# -----------------------------
+# 2. CPU VERSIONS
+# -----------------------------
+@njit(parallel=True, cache=True)
+def reduce_stats_cpu(u, v, threshold):
+    h, w = u.shape
+    su = 0.0
+    su2 = 0.0
+    sv = 0.0
+    sv2 = 0.0
+    hits = 0.0
+    for r in prange(h):
+        for c in range(w):
+            uu = u[r, c]
+            vv = v[r, c]
+            su += uu
+            su2 += uu * uu
+            sv += vv
+            sv2 += vv * vv
+            if vv > threshold:
+                hits += 1.0
+    return su, su2, sv, sv2, hits
+
+@njit(cache=True)
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+@njit(cache=True)
+def count_blobs_cpu(v, threshold):
+    """Union-find over the toroidal 4-neighbour mask."""
+    h, w = v.shape
+    parent = np.arange(h * w, dtype=np.int32)
+    for r in range(h):
+        for c in range(w):
+            if v[r, c] <= threshold:
+                continue
+            i = r * w + c
+            # Right and down neighbours cover every edge once
+            for nr, nc in (((r + 1) % h, c), (r, (c + 1) % w)):
+                if v[nr, nc] > threshold:
+                    a = _find(parent, i)
+                    b = _find(parent, nr * w + nc)
+                    if a != b:
+                        parent[max(a, b)] = min(a, b)
+    count = 0
+    for r in range(h):
+        for c in range(w):
+            i = r * w + c
+            if v[r, c] > threshold and _find(parent, i) == i:
+                count += 1
+    return count
+
+@njit(parallel=True, cache=True)
+def downsample_cpu(v, out):
+    n_r, n_c = out.shape
+    h, w = v.shape
+    for i in prange(n_r):
+        r0 = i * h // n_r
+        r1 = (i + 1) * h // n_r
+        for j in range(n_c):
+            c0 = j * w // n_c
+            c1 = (j + 1) * w // n_c
+            s = 0.0
+            for r in range(r0, r1):
+                for c in range(c0, c1):
+                    s += v[r, c]
+            out[i, j] = s / ((r1 - r0) * (c1 - c0))
+
+# -----------------------------
+# 3. ANALYZER
+# -----------------------------
+def dominant_wavelength(field, height, width):
+    """
+    Wavelength (in grid cells) with the most power in the radially binned
+    spectrum of a (possibly downsampled) field covering a height x width grid.
+    """
+    n_r, n_c = field.shape
+    power = np.abs(np.fft.rfft2(field - field.mean())) ** 2
+    # Frequencies in cycles per original grid cell
+    fy = np.fft.fftfreq(n_r)[:, None] * n_r / height
+    fx = np.fft.rfftfreq(n_c)[None, :] * n_c / width
+    size = max(height, width)
+    k = np.rint(np.sqrt(fx * fx + fy * fy) * size).astype(np.int64)
+    spectrum = np.bincount(k.ravel(), weights=power.ravel())
+    if spectrum.size < 2 or spectrum[1:].max() <= 0.0:
+        return None
+    k_peak = int(np.argmax(spectrum[1:])) + 1
+    return size / k_peak
+
+class PatternAnalyzer:
+    """analyze(u, v) -> dict of scalars. u / v are device arrays on 'cuda', numpy on 'cpu'."""
+    def __init__(self, width=config.WIDTH, height=config.HEIGHT, backend="cuda",
+                 threshold=config.STATS_THRESHOLD, fft_size=256, max_label_iters=4096):
+        self.width, self.height = width, height
+        self.backend = backend
+        self.threshold = threshold
+        self.max_label_iters = max_label_iters
+        fft_rows = min(fft_size, height)
+        fft_cols = min(fft_size, width)
+        self.h_small = np.zeros((fft_rows, fft_cols), dtype=np.float32)
+        if backend == "cuda":
+            self.threads = (STATS_TPB, STATS_TPB)
+            self.blocks = ((width + STATS_TPB - 1) // STATS_TPB, (height + STATS_TPB - 1) // STATS_TPB)
+            self.small_blocks = ((fft_cols + STATS_TPB - 1) // STATS_TPB, (fft_rows + STATS_TPB - 1) // STATS_TPB)
+            self.d_sums = cuda.device_array(N_SUMS, dtype=np.float64)
+            self.d_labels = cuda.device_array((height, width), dtype=np.int32)
+            self.d_flag = cuda.device_array(1, dtype=np.int32)
+            self.d_small = cuda.device_array((fft_rows, fft_cols), dtype=np.float32)
+
+    def _cuda_stats(self, u, v):
+        zeros = np.zeros(N_SUMS, dtype=np.float64)
+        self.d_sums.copy_to_device(zeros)
+        reduce_stats_kernel[self.blocks, self.threads](u, v, self.threshold, self.d_sums)
+        sums = self.d_sums.copy_to_host()
+
+        labels = self.d_labels
+        init_labels_kernel[self.blocks, self.threads](v, self.threshold, labels)
+        converged = False
+        iters = 0
+        flag = np.zeros(1, dtype=np.int32)
+        while iters < self.max_label_iters:
+            self.d_flag.copy_to_device(flag)
+            for _ in range(LABEL_CHECK_EVERY):
+                propagate_labels_kernel[self.blocks, self.threads](labels, self.d_flag)
+                jump_labels_kernel[self.blocks, self.threads](labels)
+            iters += LABEL_CHECK_EVERY
+            if self.d_flag.copy_to_host()[0] == 0:
+                converged = True
+                break
+        self.d_flag.copy_to_device(flag)
+        count_roots_kernel[self.blocks, self.threads](labels, self.d_flag)
+        blobs = int(self.d_flag.copy_to_host()[0])
+
+        downsample_kernel[self.small_blocks, self.threads](v, self.d_small)
+        self.d_small.copy_to_host(self.h_small)
+        return sums, blobs, converged, iters
+
+    def _cpu_stats(self, u, v):
+        sums = np.array(reduce_stats_cpu(u, v, self.threshold))
+        blobs = count_blobs_cpu(v, self.threshold)
+        downsample_cpu(v, self.h_small)
+        return sums, blobs, True, 0
+
+    def coverage(self, u, v):
+        """Share of cells with v above the threshold. Reduction pass only (no labelling, no FFT)."""
+        if self.backend == "cuda":
+            self.d_sums.copy_to_device(np.zeros(N_SUMS, dtype=np.float64))
+            reduce_stats_kernel[self.blocks, self.threads](u, v, self.threshold, self.d_sums)
+            hits = self.d_sums.copy_to_host()[4]
+        else:
+            hits = reduce_stats_cpu(u, v, self.threshold)[4]
+        return hits / float(self.width * self.height)
+
+    def analyze(self, u, v):
+        t0 = time.perf_counter()
+        if self.backend == "cuda":
+            sums, blobs, labels_converged, label_iters = self._cuda_stats(u, v)
+        else:
+            sums, blobs, labels_converged, label_iters = self._cpu_stats(u, v)
+
+        n = float(self.width * self.height)
+        mean_u, mean_v = sums[0] / n, sums[2] / n
+        stats = {
+            "coverage": round(sums[4] / n, 6),
+            "mean_u": round(mean_u, 6),
+            "var_u": round(max(0.0, sums[1] / n - mean_u * mean_u), 8),
+            "mean_v": round(mean_v, 6),
+            "var_v": round(max(0.0, sums[3] / n - mean_v * mean_v), 8),
+            "blobs": blobs,
+            "wavelength": dominant_wavelength(self.h_small.astype(np.float64), self.height, self.width),
+        }
+        if stats["wavelength"] is not None:
+            stats["wavelength"] = round(stats["wavelength"], 3)
+        if not labels_converged:
+            stats["blobs_partial"] = True # Hit max_label_iters; count is an upper bound
+        stats["analysis_ms"] = round((time.perf_counter() - t0) * 1000.0, 3)
+        return stats
+
+# -----------------------------
+# 4. CONVERGENCE + LOG
+# -----------------------------
+class ConvergenceDetector:
+    """
+    Converged once every tracked statistic has changed by less than rel_tol
+    (relative) for `patience` consecutive intervals.
+    """
+    def __init__(self, keys=("coverage", "mean_v", "var_v", "blobs"), rel_tol=0.002, patience=5):
+        self.keys = keys
+        self.rel_tol = rel_tol
+        self.patience = patience
+        self._prev = None
+        self._stable = 0
+
+    def update(self, stats):
+        if self._prev is not None:
+            stable = True
+            for k in self.keys:
+                old, new = self._prev[k], stats[k]
+                if abs(new - old) > self.rel_tol * max(abs(old), 1e-9):
+                    stable = False
+                    break
+            self._stable = self._stable + 1 if stable else 0
+        self._prev = stats
+        return self._stable >= self.patience
+
+class StatsLog:
+    """Time-series of pattern statistics, one JSON line per sample."""
+    def __init__(self, path):
+        self._f = open(path, 'a')
+
+    def write(self, frame, stats, **extra):
+        entry = {"timestamp": datetime.now().isoformat(), "frame": frame}
+        entry.update(extra)
+        entry.update(stats)
+        self._f.write(json.dumps(entry) + "\n")
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+# -----------------------------
+# 5. HEADLESS RUN
+# -----------------------------
+def run(backend="auto", width=config.WIDTH, height=config.HEIGHT, frames=20000, interval=50,
+        steps=config.STEPS_PER_FRAME, log_path="pattern_stats.jsonl", early_stop=True,
+        rel_tol=0.002, patience=5):
+    """Simulates from the default seed, sampling stats every `interval` frames. Returns the last stats."""
+    from backends import create_backend
+    sim = create_backend(backend, width, height)
+    analyzer = PatternAnalyzer(width, height, backend=sim.name)
+    detector = ConvergenceDetector(rel_tol=rel_tol, patience=patience)
+    log = StatsLog(log_path)
+
+    sim.init_grid()
+    t0 = time.perf_counter()
+    stats = {}
+    frame = 0
+    try:
+        while frame < frames:
+            sim.step(steps)
+            frame += 1
+            if frame % interval == 0:
+                stats = analyzer.analyze(sim.curr["u"], sim.curr["v"])
+                converged = detector.update(stats)
+                log.write(frame, stats, backend=sim.name, resolution=f"{width}x{height}", converged=converged)
+                print(f"[STATS] frame {frame:>6} | coverage {stats['coverage']:.4f} | mean v {stats['mean_v']:.4f} "
+                      f"| blobs {stats['blobs']:>5} | wavelength {stats['wavelength']} | {stats['analysis_ms']:.1f} ms")
+                if converged and early_stop:
+                    print(f"[STATS] Pattern converged at frame {frame} "
+                          f"({time.perf_counter() - t0:.1f}s, {frames - frame} frames saved)")
+                    break
+    finally:
+        log.close()
+    return stats
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Headless Gray-Scott run with pattern statistics and early stop.")
+    p.add_argument("--backend", choices=["auto", "cuda", "cpu"], default="auto")
+    p.add_argument("--width", type=int, default=config.WIDTH)
+    p.add_argument("--height", type=int, default=config.HEIGHT)
+    p.add_argument("--frames", type=int, default=20000, help="Upper bound on simulated frames")
+    p.add_argument("--interval", type=int, default=50, help="Frames between samples")
+    p.add_argument("--steps", type=int, default=config.STEPS_PER_FRAME)
+    p.add_argument("--log", type=str, default="pattern_stats.jsonl")
+    p.add_argument("--early-stop", action="store_true", help="Stop once the statistics converge")
+    p.add_argument("--rel-tol", type=float, default=0.002)
+    p.add_argument("--patience", type=int, default=5)
+    args = p.parse_args(sys.argv[1:])
+    run(args.backend, args.width, args.height, args.frames, args.interval, args.steps,
+        args.log, args.early_stop, args.rel_tol, args.patience)
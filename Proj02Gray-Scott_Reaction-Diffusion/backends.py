@@ -0,0 +1,123 @@
+# backends.py
+# One interface over the CUDA kernels (kernelsV3) and their CPU twins (kernels_cpu).
+# A backend owns the double-buffered U, V, R, G, B grids and the output image:
+#   init_grid(), step(n), paint(...), render(zoom, pan_x, pan_y) -> host RGB image
+# synchronize() blocks until queued work is done (a no-op on the CPU).
+# "strips" (domain.py) splits the CPU solve across worker processes.
+# "cuda-palette" / "cpu-palette" (palette_color.py) swap R, G, B for a compact palette field.
+import numpy as np
+from numba import cuda
+import config
+
+FIELDS = ("u", "v", "r", "g", "b")
+
+class CudaBackend:
+    """Grids live in VRAM; only the rendered image is copied back."""
+    name = "cuda"
+
+    def __init__(self, width=config.WIDTH, height=config.HEIGHT, tpb=config.TPB):
+        import kernelsV3 as kernels
+        self.kernels = kernels
+        self.width, self.height = width, height
+        self.curr = {f: cuda.device_array((height, width), dtype=np.float32) for f in FIELDS}
+        self.next = {f: cuda.device_array((height, width), dtype=np.float32) for f in FIELDS}
+        self.gpu_image = cuda.device_array((height, width, 3), dtype=np.uint8)
+        self.host_image = np.zeros((height, width, 3), dtype=np.uint8)
+        self.threads = (tpb, tpb)
+        self.blocks = (int(np.ceil(width / tpb)), int(np.ceil(height / tpb)))
+
+    def init_grid(self):
+        c = self.curr
+        self.kernels.init_grid[self.blocks, self.threads](c["u"], c["v"], c["r"], c["g"], c["b"])
+
+    def step(self, n=config.STEPS_PER_FRAME):
+        for _ in range(n):
+            c, nx = self.curr, self.next
+            self.kernels.update_step[self.blocks, self.threads](
+                c["u"], c["v"], nx["u"], nx["v"],
+                c["r"], c["g"], c["b"], nx["r"], nx["g"], nx["b"]
+            )
+            # Swap buffers
+            self.curr, self.next = self.next, self.curr
+
+    def paint(self, x, y, radius, r_val, g_val, b_val, intensity):
+        c = self.curr
+        self.kernels.paint[self.blocks, self.threads](
+            c["v"], c["r"], c["g"], c["b"], x, y, radius, r_val, g_val, b_val, intensity
+        )
+
+    def render(self, zoom, pan_x, pan_y):
+        c = self.curr
+        self.kernels.render_camera_view[self.blocks, self.threads](
+            c["v"], c["r"], c["g"], c["b"], self.gpu_image, zoom, pan_x, pan_y
+        )
+        self.gpu_image.copy_to_host(self.host_image)
+        return self.host_image
+
+    def synchronize(self):
+        cuda.synchronize()
+
+class CpuBackend:
+    """Same grids as host arrays, updated by the Numba prange kernels."""
+    name = "cpu"
+
+    def __init__(self, width=config.WIDTH, height=config.HEIGHT, tpb=config.TPB):
+        import kernels_cpu as kernels
+        self.kernels = kernels
+        self.width, self.height = width, height
+        self.curr = {f: np.zeros((height, width), dtype=np.float32) for f in FIELDS}
+        self.next = {f: np.zeros((height, width), dtype=np.float32) for f in FIELDS}
+        self.host_image = np.zeros((height, width, 3), dtype=np.uint8)
+
+    def init_grid(self):
+        c = self.curr
+        self.kernels.init_grid(c["u"], c["v"], c["r"], c["g"], c["b"])
+
+    def step(self, n=config.STEPS_PER_FRAME):
+        for _ in range(n):
+            c, nx = self.curr, self.next
+            self.kernels.update_step(
+                c["u"], c["v"], nx["u"], nx["v"],
+                c["r"], c["g"], c["b"], nx["r"], nx["g"], nx["b"]
+            )
+            self.curr, self.next = self.next, self.curr
+
+    def paint(self, x, y, radius, r_val, g_val, b_val, intensity):
+        c = self.curr
+        self.kernels.paint(c["v"], c["r"], c["g"], c["b"], x, y, radius, r_val, g_val, b_val, intensity)
+
+    def render(self, zoom, pan_x, pan_y):
+        c = self.curr
+        self.kernels.render_camera_view(c["v"], c["r"], c["g"], c["b"], self.host_image, zoom, pan_x, pan_y)
+        return self.host_image
+
+    def synchronize(self):
+        pass
+
+def _strip_backend(width=config.WIDTH, height=config.HEIGHT, tpb=config.TPB):
+    """Multi-process strips (domain.py), one worker per core. Call close() when done."""
+    from domain import StripBackend
+    return StripBackend(width, height, tpb)
+
+def _palette_backend(width=config.WIDTH, height=config.HEIGHT, tpb=config.TPB, device="cpu"):
+    """Compact palette-index color model (palette_color.py)."""
+    import palette_color
+    cls = palette_color.CudaPaletteBackend if device == "cuda" else palette_color.CpuPaletteBackend
+    return cls(width, height, tpb)
+
+BACKENDS = {"cuda": CudaBackend, "cpu": CpuBackend, "strips": _strip_backend,
+            "cuda-palette": lambda w, h, t: _palette_backend(w, h, t, "cuda"),
+            "cpu-palette": lambda w, h, t: _palette_backend(w, h, t, "cpu")}
+
+def available_backends():
+    """Backend names usable on this machine (CUDA also covers NUMBA_ENABLE_CUDASIM=1)."""
+    names = ["cpu"]
+    if cuda.is_available():
+        names.insert(0, "cuda")
+    return names
+
+def create_backend(name="auto", width=config.WIDTH, height=config.HEIGHT, tpb=config.TPB):
+    """'auto' picks CUDA when a device (or the simulator) is present, else the CPU."""
+    if name == "auto":
+        name = available_backends()[0]
+    return BACKENDS[name](width, height, tpb)
@@ -0,0 +1,169 @@
+# benchmark.py
+# Times init_grid, update_step, paint and render_camera_view separately for every
+# available backend, across resolutions and STEPS_PER_FRAME values.
+# Reports cell-updates/sec, effective memory bandwidth and run-to-run variance,
+# saves JSON and flags regressions against a stored baseline.
+#
+# Usage:
+#   python benchmark.py --out bench.json
+#   python benchmark.py --backends cpu --resolutions 1280x720 --steps 10,30
+#   python benchmark.py --baseline bench_baseline.json --threshold 0.10
+#   NUMBA_ENABLE_CUDASIM=1 python benchmark.py --backends cuda --resolutions 64x64 --steps 1 --repeats 2
+# Exit code 1 when any case is slower than baseline * (1 + threshold).
+import sys
+import json
+import math
+import time
+import platform
+import argparse
+import statistics
+import config
+from backends import create_backend, available_backends
+
+DEFAULT_RESOLUTIONS = ((1280, 720), (1920, 1080), (2560, 1440), (3840, 2160))
+DEFAULT_STEPS = (10, 30, 60)
+
+# Bytes moved per cell, assuming the stencil neighbours come from cache:
+# update_step reads and writes 5 float32 fields; init_grid writes 5;
+# render reads V, R, G, B and writes 3 bytes; paint reads + writes V, R, G, B.
+# Backends with a different layout (palette_color) report their own step_bytes_per_cell.
+BYTES_UPDATE = 5 * 4 * 2
+BYTES_INIT = 5 * 4
+BYTES_RENDER = 4 * 4 + 3
+BYTES_PAINT = 4 * 4 * 2
+
+# -----------------------------
+# 1. TIMING
+# -----------------------------
+def _time(fn, sim, repeats):
+    """Runs fn once to warm up, then `repeats` times with a sync after each. Returns seconds."""
+    fn()
+    sim.synchronize()
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        sim.synchronize()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+def _summary(samples, work_cells, bytes_per_cell):
+    """Stats in ms plus throughput from the median sample."""
+    ms = [s * 1000.0 for s in samples]
+    median_s = statistics.median(samples)
+    mean = statistics.fmean(ms)
+    stdev = statistics.stdev(ms) if len(ms) > 1 else 0.0
+    return {
+        "median_ms": round(statistics.median(ms), 4),
+        "mean_ms": round(mean, 4),
+        "min_ms": round(min(ms), 4),
+        "stdev_ms": round(stdev, 4),
+        "cv": round(stdev / mean, 4) if mean > 0 else 0.0,
+        "cell_updates_per_sec": round(work_cells / median_s, 1) if median_s > 0 else None,
+        "bandwidth_gb_s": round(work_cells * bytes_per_cell / median_s / 1e9, 3) if median_s > 0 else None,
+    }
+
+def bench_resolution(backend, width, height, steps_list, repeats):
+    """All four kernels for one backend / resolution. Returns a list of cases."""
+    sim = create_backend(backend, width, height)
+    cells = width * height
+    cases = []
+
+    def add(kernel, samples, work_cells, bytes_per_cell, steps=None):
+        key = f"{backend}/{width}x{height}/{kernel}" + (f"/steps{steps}" if steps else "")
+        case = {"key": key, "backend": backend, "resolution": f"{width}x{height}",
+                "kernel": kernel, "steps": steps, "repeats": repeats}
+        case.update(_summary(samples, work_cells, bytes_per_cell))
+        cases.append(case)
+        print(f"[BENCH] {key:<40} {case['median_ms']:9.3f} ms (cv {case['cv']:.3f}) | "
+              f"{case['cell_updates_per_sec'] / 1e9:7.3f} G cells/s | {case['bandwidth_gb_s']:7.2f} GB/s")
+
+    add("init_grid", _time(sim.init_grid, sim, repeats), cells, BYTES_INIT)
+
+    for steps in steps_list:
+        add("update_step", _time(lambda: sim.step(steps), sim, repeats), cells * steps,
+            getattr(sim, "step_bytes_per_cell", BYTES_UPDATE), steps)
+
+    radius = config.BRUSH_RADIUS
+    brush_cells = math.pi * radius * radius
+    paint = lambda: sim.paint(width / 2.0, height / 2.0, radius, 0.0, 1.0, 1.0, 1.0)
+    add("paint", _time(paint, sim, repeats), brush_cells, BYTES_PAINT)
+
+    # Includes the copy of the image back to the host, as in the live loop
+    render = lambda: sim.render(1.0, width / 2.0, height / 2.0)
+    add("render_camera_view", _time(render, sim, repeats), cells, BYTES_RENDER)
+    if hasattr(sim, "close"):
+        sim.close()
+    return cases
+
+# -----------------------------
+# 2. BASELINE COMPARISON
+# -----------------------------
+def compare_to_baseline(results, baseline, threshold):
+    """Cases whose median time grew by more than `threshold` over the matching baseline case."""
+    base_cases = {c["key"]: c for c in baseline.get("cases", [])}
+    regressions = []
+    for case in results["cases"]:
+        base = base_cases.get(case["key"])
+        if base is None:
+            continue
+        ratio = case["median_ms"] / base["median_ms"] if base["median_ms"] > 0 else 1.0
+        case["vs_baseline"] = round(ratio, 3)
+        if ratio > 1.0 + threshold:
+            regressions.append({"key": case["key"], "baseline_ms": base["median_ms"],
+                                "current_ms": case["median_ms"], "ratio": round(ratio, 3)})
+    return regressions
+
+# -----------------------------
+# 3. CLI
+# -----------------------------
+def _parse_resolutions(text):
+    return tuple(tuple(int(v) for v in item.lower().split("x")) for item in text.split(","))
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Gray-Scott kernel benchmark (cell-updates/sec matrix).")
+    p.add_argument("--backends", type=str, default=",".join(available_backends()),
+                   help="Comma-separated: cuda, cpu, strips, cuda-palette, cpu-palette")
+    p.add_argument("--resolutions", type=_parse_resolutions, default=DEFAULT_RESOLUTIONS)
+    p.add_argument("--steps", type=lambda t: tuple(int(v) for v in t.split(",")), default=DEFAULT_STEPS,
+                   help="STEPS_PER_FRAME values for update_step")
+    p.add_argument("--repeats", type=int, default=10)
+    p.add_argument("--out", type=str, default="bench_results.json")
+    p.add_argument("--baseline", type=str, default="")
+    p.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown (0.10 = 10%%)")
+    p.add_argument("--save-baseline", type=str, default="")
+    args = p.parse_args(argv)
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {"platform": platform.platform(), "processor": platform.processor(),
+                    "python": platform.python_version()},
+        "bytes_per_cell": {"init_grid": BYTES_INIT, "update_step": BYTES_UPDATE,
+                           "paint": BYTES_PAINT, "render_camera_view": BYTES_RENDER},
+        "cases": [],
+    }
+    for backend in args.backends.split(","):
+        for width, height in args.resolutions:
+            results["cases"].extend(bench_resolution(backend, width, height, args.steps, args.repeats))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        results["baseline"] = {"path": args.baseline, "threshold": args.threshold, "regressions": regressions}
+        for r in regressions:
+            print(f"[REGRESSION] {r['key']}: {r['baseline_ms']} -> {r['current_ms']} ms (x{r['ratio']})")
+        if not regressions:
+            print(f"[BENCH] No regressions beyond {args.threshold:.0%} vs {args.baseline}")
+
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=4)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=4)
+    print(f"[BENCH] Results saved to {args.out}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
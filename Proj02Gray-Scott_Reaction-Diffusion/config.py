@@ -63,4 +63,54 @@ COLOR_PALETTE = [
     (1.0, 1.0, 0.0), # 4: Lemon Yellow
     (1.0, 1.0, 1.0), # 5: Pure White
     (1.0, 0.0, 0.5), # 6: Hot Pink
-]
\ No newline at end of file
+]
+
+# --- PROFILING (mainV3) ---
+# Phase timers. They sync the GPU between phases, so they only run while the 'P' overlay
+# is up, unless this is True (profile and log the whole run).
+PROFILE_ENABLED = False
+PROFILE_LOG = "profile_log.jsonl"  # Percentiles appended every PROFILE_INTERVAL seconds
+PROFILE_INTERVAL = 4.0
+
+# --- PATTERN STATISTICS (mainV3 / analysis.py) ---
+# Coverage, mean/variance, blob count and dominant wavelength, computed on the GPU
+# every STATS_INTERVAL frames (0 = off) and appended to STATS_LOG.
+STATS_INTERVAL = 0
+STATS_LOG = "pattern_stats.jsonl"
+STATS_THRESHOLD = 0.25  # v above this counts as pattern (the renderer saturates at 0.25)
+
+# --- MIP RENDERER (mainV3 'M' / 'N') ---
+# Zoomed out, pixels sample a box-filtered pyramid level instead of aliasing.
+MIP_ENABLED = True
+MIP_UPDATE_EVERY = 4  # Frames between pyramid rebuilds
+
+# --- PALETTE COLOR MODEL (palette_color.py, backends 'cuda-palette' / 'cpu-palette') ---
+# Color kept as a palette index + uint16 blend on a half-res grid, diffused every N steps.
+COLOR_DIFFUSE_EVERY = 4  # Stable up to 10 on the half-res grid
+
+# --- LIVE VIEWER (mainV3 / replay.py --stream PORT, ../shared/frame_stream.py) ---
+STREAM_FPS = 20  # Max frames per second handed to the encoder
+
+# --- WARM START (mainV3 --warm-start FACTOR, warm_start.py) ---
+WARM_START_COVERAGE = 0.2  # Coarse phase runs until this share of cells has v > STATS_THRESHOLD
+
+# --- FIELD TIME SERIES (mainV3 --fields PATH, field_store.py) ---
+FIELDS_EVERY_STEPS = 300  # Rounded to whole frames of STEPS_PER_FRAME
+FIELDS_RECORDED = ("u", "v")  # Any of u, v, r, g, b
+# Host memory for time blocks. A block is chunk_t x H x W x 4 B per field (1080p u+v: 16.6 MB
+# per frame), and up to 2 are alive. chunk_t shrinks to fit: 1080p -> 7 frames, 4K -> 1.
+FIELDS_BUFFER_MB = 256
+
+# --- METRICS (mainV3 --metrics-port PORT / --metrics-jsonl PATH, ../shared/telemetry.py) ---
+# Same metric names as Gargantua; the sim / instance labels tell the runs apart.
+METRICS_PORT = 0  # Prometheus endpoint on http://127.0.0.1:PORT/metrics (0 = off)
+METRICS_JSONL = None  # Snapshot file, one line every METRICS_INTERVAL seconds (None = off)
+METRICS_INTERVAL = 5.0
+
+# --- HIGH-RES EXPORT (mainV3 'E', hires_export.py) ---
+# Renders the current view at EXPORT_SIZE in background threads, strip by strip into a PNG.
+EXPORT_SIZE = (WIDTH * 4, HEIGHT * 4)
+EXPORT_SUPERSAMPLE = 2  # Samples per axis per output pixel
+EXPORT_STRIP_ROWS = 128  # Rows per work item; about 2 x workers strips are in memory
+EXPORT_WORKERS = 0  # 0 = all cores but one (the sim loop keeps its own)
+EXPORT_DIR = "snapshots"
@@ -0,0 +1,294 @@
+# domain.py
+# Multi-process CPU solver: the grid is split into horizontal strips, one per
+# worker process. The five fields (u, v, r, g, b) live in one
+# multiprocessing.shared_memory block that every process maps.
+#
+# Each worker keeps its strip plus `halo` ghost rows above and below in private
+# double buffers. Per block of up to `halo` steps:
+#   barrier -> read ghost rows from the neighbours' strips (toroidal)
+#   barrier -> run the steps locally (the valid region shrinks by one row per
+#              step, so `halo` rows are enough) -> write the strip back
+# Wider halos trade a little redundant compute for fewer barriers.
+# update_rows does the same float operations in the same order as
+# kernels_cpu.update_step, so the result is bit-identical to the single-process run.
+#
+# Usage:
+#   python domain.py --workers 8 --verify                 (bit-identity check)
+#   python domain.py --scaling 1,2,4,8 --json scaling.json (strong + weak scaling)
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from numba import njit
+import config
+
+FIELDS = ("u", "v", "r", "g", "b")
+
+# -----------------------------
+# 1. STRIP KERNEL
+# -----------------------------
+@njit(cache=True)
+def update_rows(src, dst, lo, hi):
+    """
+    One update_step over rows [lo, hi) of a padded strip (5, rows, w).
+    Vertical neighbours come from the padding, horizontal ones wrap.
+    """
+    w = src.shape[2]
+    u_in, v_in, r_in, g_in, b_in = src[0], src[1], src[2], src[3], src[4]
+    u_out, v_out, r_out, g_out, b_out = dst[0], dst[1], dst[2], dst[3], dst[4]
+    diff_rate = 0.5
+    for r in range(lo, hi):
+        up, down = r - 1, r + 1
+        for c in range(w):
+            left, right = (c - 1) % w, (c + 1) % w
+
+            curr_u = u_in[r, c]
+            curr_v = v_in[r, c]
+            lap_u = (u_in[r, left] + u_in[r, right] + u_in[up, c] + u_in[down, c] - 4.0 * curr_u)
+            lap_v = (v_in[r, left] + v_in[r, right] + v_in[up, c] + v_in[down, c] - 4.0 * curr_v)
+
+            uvv = curr_u * curr_v * curr_v
+            du = (config.Du * lap_u - uvv + config.FEED * (1.0 - curr_u))
+            dv = (config.Dv * lap_v + uvv - (config.FEED + config.KILL) * curr_v)
+            u_out[r, c] = curr_u + du * config.dt
+            v_out[r, c] = curr_v + dv * config.dt
+
+            cr, cg, cb = r_in[r, c], g_in[r, c], b_in[r, c]
+            lap_r = (r_in[r, left] + r_in[r, right] + r_in[up, c] + r_in[down, c] - 4.0 * cr)
+            lap_g = (g_in[r, left] + g_in[r, right] + g_in[up, c] + g_in[down, c] - 4.0 * cg)
+            lap_b = (b_in[r, left] + b_in[r, right] + b_in[up, c] + b_in[down, c] - 4.0 * cb)
+            r_out[r, c] = cr + (diff_rate * lap_r) * config.dt
+            g_out[r, c] = cg + (diff_rate * lap_g) * config.dt
+            b_out[r, c] = cb + (diff_rate * lap_b) * config.dt
+
+# -----------------------------
+# 2. WORKER PROCESS
+# -----------------------------
+def _worker_main(shm_name, shape, r0, r1, halo, barrier, conn):
+    """Owns rows [r0, r1). Commands: ("step", n) -> "done", ("stop", None)."""
+    import numba
+    numba.set_num_threads(1)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    state = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+    height = shape[1]
+    rows = r1 - r0
+    padded = rows + 2 * halo
+    a = np.zeros((shape[0], padded, shape[2]), dtype=np.float32)
+    b = np.zeros_like(a)
+    top = np.arange(r0 - halo, r0) % height
+    bottom = np.arange(r1, r1 + halo) % height
+    update_rows(a, b, 1, 1) # JIT (or cache load) before the first command
+
+    try:
+        while True:
+            cmd, arg = conn.recv()
+            if cmd == "stop":
+                break
+            # The main process may have reset / painted the shared grid since the last call
+            a[:, halo:halo + rows] = state[:, r0:r1]
+            done = 0
+            while done < arg:
+                k = min(halo, arg - done)
+                barrier.wait() # Every strip from the previous block is written
+                a[:, :halo] = state[:, top]
+                a[:, halo + rows:] = state[:, bottom]
+                barrier.wait() # Every halo is read before anyone overwrites its strip
+                for j in range(k):
+                    update_rows(a, b, j + 1, padded - j - 1)
+                    a, b = b, a
+                state[:, r0:r1] = a[:, halo:halo + rows]
+                done += k
+            conn.send("done")
+    finally:
+        del state
+        shm.close()
+
+def split_rows(height, workers):
+    """Near-equal [r0, r1) strips."""
+    edges = np.linspace(0, height, workers + 1).astype(int)
+    return [(int(edges[i]), int(edges[i + 1])) for i in range(workers)]
+
+# -----------------------------
+# 3. BACKEND
+# -----------------------------
+class StripBackend:
+    """
+    Same interface as backends.CpuBackend. init_grid / paint / render run in this
+    process on the shared fields; step(n) fans out to the workers.
+    """
+    name = "strips"
+
+    def __init__(self, width=config.WIDTH, height=config.HEIGHT, tpb=config.TPB, workers=None, halo=1):
+        import kernels_cpu
+        self.kernels = kernels_cpu
+        self.width, self.height = width, height
+        self.workers = workers or os.cpu_count() or 1
+        self.halo = halo
+        bounds = split_rows(height, self.workers)
+        if min(r1 - r0 for r0, r1 in bounds) < halo:
+            raise ValueError(f"{self.workers} strips of {height} rows are thinner than the {halo}-row halo")
+
+        shape = (len(FIELDS), height, width)
+        self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 4)
+        self.state = np.ndarray(shape, dtype=np.float32, buffer=self.shm.buf)
+        self.state[:] = 0.0
+        self.curr = {f: self.state[i] for i, f in enumerate(FIELDS)}
+        self.host_image = np.zeros((height, width, 3), dtype=np.uint8)
+
+        ctx = multiprocessing.get_context("spawn")
+        # Held on self: if it were collected, its semaphore would vanish before spawned workers unpickle it
+        self._barrier = barrier = ctx.Barrier(self.workers)
+        self._conns = []
+        self._procs = []
+        for r0, r1 in bounds:
+            parent, child = ctx.Pipe()
+            p = ctx.Process(target=_worker_main, args=(self.shm.name, shape, r0, r1, halo, barrier, child),
+                            daemon=True)
+            p.start()
+            self._conns.append(parent)
+            self._procs.append(p)
+
+    def init_grid(self):
+        c = self.curr
+        self.kernels.init_grid(c["u"], c["v"], c["r"], c["g"], c["b"])
+
+    def step(self, n=config.STEPS_PER_FRAME):
+        for conn in self._conns:
+            conn.send(("step", n))
+        for conn in self._conns:
+            conn.recv()
+
+    def paint(self, x, y, radius, r_val, g_val, b_val, intensity):
+        c = self.curr
+        self.kernels.paint(c["v"], c["r"], c["g"], c["b"], x, y, radius, r_val, g_val, b_val, intensity)
+
+    def render(self, zoom, pan_x, pan_y):
+        c = self.curr
+        self.kernels.render_camera_view(c["v"], c["r"], c["g"], c["b"], self.host_image, zoom, pan_x, pan_y)
+        return self.host_image
+
+    def synchronize(self):
+        pass
+
+    def close(self):
+        for conn in self._conns:
+            conn.send(("stop", None))
+        for p in self._procs:
+            p.join()
+        self.curr = None
+        self.state = None
+        self.shm.close()
+        self.shm.unlink()
+
+# -----------------------------
+# 4. VERIFICATION + SCALING
+# -----------------------------
+def _seeded(sim):
+    """Default seed plus a few off-centre dabs, so strip boundaries see real gradients."""
+    sim.init_grid()
+    w, h = sim.width, sim.height
+    for i, (fx, fy) in enumerate(((0.25, 0.3), (0.7, 0.5), (0.5, 0.02), (0.1, 0.97))):
+        color = config.COLOR_PALETTE[i % len(config.COLOR_PALETTE)]
+        sim.paint(fx * w, fy * h, config.BRUSH_RADIUS, color[0], color[1], color[2], 1.0)
+
+def verify(width, height, workers, halo, steps):
+    """True when the strip solver matches CpuBackend bit for bit after `steps` steps."""
+    from backends import CpuBackend
+    ref = CpuBackend(width, height)
+    _seeded(ref)
+    ref.step(steps)
+
+    sim = StripBackend(width, height, workers=workers, halo=halo)
+    try:
+        _seeded(sim)
+        sim.step(steps)
+        return all(np.array_equal(sim.curr[f], ref.curr[f]) for f in FIELDS)
+    finally:
+        sim.close()
+
+def _time_steps(sim, steps, repeats):
+    sim.step(steps) # Warm-up
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        sim.step(steps)
+        samples.append(time.perf_counter() - t0)
+    return min(samples)
+
+def scaling_report(width, height, worker_counts, halo=1, steps=30, repeats=3, weak_rows=270):
+    """
+    Strong scaling: fixed width x height grid, 1..N workers.
+    Weak scaling: weak_rows rows per worker.
+    Times are the best of `repeats` calls of step(steps).
+    """
+    from backends import CpuBackend
+    report = {"width": width, "height": height, "halo": halo, "steps": steps, "strong": [], "weak": []}
+
+    # Reference: single process, Numba threads
+    ref = CpuBackend(width, height)
+    _seeded(ref)
+    t = _time_steps(ref, steps, repeats)
+    report["single_process_threads"] = {"seconds": round(t, 5),
+                                        "cell_updates_per_sec": round(width * height * steps / t, 1)}
+
+    t1 = None
+    for n in worker_counts:
+        sim = StripBackend(width, height, workers=n, halo=halo)
+        try:
+            _seeded(sim)
+            t = _time_steps(sim, steps, repeats)
+        finally:
+            sim.close()
+        t1 = t1 or t
+        row = {"workers": n, "seconds": round(t, 5),
+               "cell_updates_per_sec": round(width * height * steps / t, 1),
+               "speedup": round(t1 / t, 3), "efficiency": round(t1 / t / n, 3)}
+        report["strong"].append(row)
+        print(f"[STRONG] {n:>3} workers | {row['cell_updates_per_sec'] / 1e6:9.1f} M cells/s | "
+              f"speedup {row['speedup']:.2f} | efficiency {row['efficiency']:.2f}")
+
+    t1 = None
+    for n in worker_counts:
+        h = weak_rows * n
+        sim = StripBackend(width, h, workers=n, halo=halo)
+        try:
+            _seeded(sim)
+            t = _time_steps(sim, steps, repeats)
+        finally:
+            sim.close()
+        t1 = t1 or t
+        row = {"workers": n, "height": h, "seconds": round(t, 5),
+               "cell_updates_per_sec": round(width * h * steps / t, 1), "efficiency": round(t1 / t, 3)}
+        report["weak"].append(row)
+        print(f"[WEAK]   {n:>3} workers ({width}x{h}) | {row['cell_updates_per_sec'] / 1e6:9.1f} M cells/s | "
+              f"efficiency {row['efficiency']:.2f}")
+    return report
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Strip-decomposed multi-process Gray-Scott (CPU).")
+    p.add_argument("--width", type=int, default=config.WIDTH)
+    p.add_argument("--height", type=int, default=config.HEIGHT)
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--halo", type=int, default=1, help="Ghost rows per side = steps per exchange")
+    p.add_argument("--steps", type=int, default=config.STEPS_PER_FRAME)
+    p.add_argument("--verify", action="store_true", help="Check bit-identity against the single-process solver")
+    p.add_argument("--scaling", type=str, default="", help="Worker counts, e.g. 1,2,4,8")
+    p.add_argument("--json", type=str, default="")
+    args = p.parse_args(sys.argv[1:])
+
+    if args.verify:
+        ok = verify(args.width, args.height, args.workers, args.halo, args.steps)
+        print(f"[VERIFY] {args.workers} workers, halo {args.halo}, {args.steps} steps: "
+              f"{'bit-identical' if ok else 'MISMATCH'}")
+        if not ok:
+            sys.exit(1)
+    if args.scaling:
+        counts = [int(n) for n in args.scaling.split(",")]
+        res = scaling_report(args.width, args.height, counts, args.halo, args.steps)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(res, f, indent=4)
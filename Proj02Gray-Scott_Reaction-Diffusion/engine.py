@@ -0,0 +1,262 @@
+# engine.py
+# Importable Gray-Scott engine for scripts and notebooks: no pygame, no window.
+#
+#   from engine import GrayScottEngine
+#   eng = GrayScottEngine(512, 512, backend="auto")
+#   eng.paint(200, 300, color=1)          # palette index or (r, g, b)
+#   eng.step(300)
+#   v = np.asarray(eng["v"])               # CPU: a view of the live grid, no copy
+#   v = cupy.asarray(eng["v"])             # CUDA: __cuda_array_interface__, no copy
+#   t = torch.from_dlpack(eng["v"])        # DLPack (CPU via NumPy, CUDA via CuPy when installed)
+#   img = eng.render(zoom=2.0)
+#   eng.export("big.png", 16384, 16384)      # tiled, supersampled PNG (hires_export.py)
+#
+# The backends double-buffer, so each step() swaps which array is "current".
+# A FieldView looks up the current array whenever it is exported. Once a
+# consumer has wrapped it, though, it keeps pointing at that buffer; wrap again
+# after step(). get_state() / set_state() make explicit host copies.
+#
+# Self-check (no copy on access):  python engine.py --check [--backend cpu|cuda]
+import sys
+import json
+import numbers
+import argparse
+import numpy as np
+import config
+from backends import create_backend
+
+# -----------------------------
+# 1. ZERO-COPY FIELD VIEW
+# -----------------------------
+class FieldView:
+    """One field of the engine's current state, exported without copying."""
+    def __init__(self, engine, name):
+        self._engine = engine
+        self.name = name
+
+    @property
+    def array(self):
+        """The backend's current array (numpy.ndarray or numba DeviceNDArray)."""
+        return self._engine.sim.curr[self.name]
+
+    @property
+    def on_device(self):
+        return hasattr(self.array, "copy_to_host")
+
+    @property
+    def shape(self):
+        return self.array.shape
+
+    @property
+    def dtype(self):
+        return self.array.dtype
+
+    @property
+    def ptr(self):
+        """Address of the first element (host or device)."""
+        arr = self.array
+        if self.on_device:
+            return arr.__cuda_array_interface__["data"][0]
+        return arr.__array_interface__["data"][0]
+
+    # NumPy (and anything that accepts the array interface)
+    @property
+    def __array_interface__(self):
+        if self.on_device:
+            raise AttributeError("device field: use __cuda_array_interface__ or to_host()")
+        return self.array.__array_interface__
+
+    # CuPy, PyTorch, Numba, JAX ...
+    @property
+    def __cuda_array_interface__(self):
+        if not self.on_device:
+            raise AttributeError("host field: use __array_interface__")
+        return self.array.__cuda_array_interface__
+
+    # Python >= 3.12 buffer protocol (memoryview(view), bytes-like consumers)
+    def __buffer__(self, flags):
+        if self.on_device:
+            raise BufferError("device field has no host buffer")
+        return memoryview(self.array)
+
+    def __dlpack__(self, stream=None):
+        arr = self.array
+        if not self.on_device:
+            return arr.__dlpack__()
+        try:
+            import cupy
+        except ImportError as e:
+            raise BufferError("DLPack export of a CUDA field needs CuPy; "
+                              "__cuda_array_interface__ works without it") from e
+        return cupy.asarray(arr).__dlpack__(stream=stream)
+
+    def __dlpack_device__(self):
+        if not self.on_device:
+            return self.array.__dlpack_device__()
+        from numba import cuda
+        return (2, cuda.get_current_device().id) # kDLCUDA
+
+    def to_host(self):
+        """Explicit copy to a new numpy array."""
+        arr = self.array
+        return arr.copy_to_host() if self.on_device else arr.copy()
+
+    def __repr__(self):
+        where = "cuda" if self.on_device else "host"
+        return f"FieldView({self.name!r}, shape={self.shape}, dtype={self.dtype}, {where} 0x{self.ptr:x})"
+
+# -----------------------------
+# 2. ENGINE
+# -----------------------------
+class GrayScottEngine:
+    """step / paint / render / get_state / set_state over any backends.py backend."""
+    def __init__(self, width=config.WIDTH, height=config.HEIGHT, backend="auto",
+                 steps_per_frame=config.STEPS_PER_FRAME):
+        self.sim = create_backend(backend, width, height)
+        self.width, self.height = width, height
+        self.steps_per_frame = steps_per_frame
+        self.steps = 0
+        self.reset()
+
+    @property
+    def backend(self):
+        return self.sim.name
+
+    @property
+    def fields(self):
+        return tuple(self.sim.curr)
+
+    def reset(self, warm_start=0):
+        """Default center seed; warm_start=FACTOR grows it on a coarse grid first (warm_start.py)."""
+        self.sim.init_grid()
+        self.steps = 0
+        if warm_start > 1:
+            from warm_start import warm_start as _warm
+            _warm(self.sim, warm_start, config.WARM_START_COVERAGE)
+
+    def step(self, n=None):
+        """Advances n update steps (default: one frame's worth). Returns the total step count."""
+        n = self.steps_per_frame if n is None else n
+        self.sim.step(n)
+        self.steps += n
+        return self.steps
+
+    def paint(self, x, y, radius=config.BRUSH_RADIUS, color=0, intensity=1.0):
+        """color: COLOR_PALETTE index or an (r, g, b) tuple in 0..1."""
+        # numbers.Integral also covers NumPy integers (e.g. an index drawn with np.random)
+        r_val, g_val, b_val = config.COLOR_PALETTE[color] if isinstance(color, numbers.Integral) else color
+        self.sim.paint(float(x), float(y), float(radius), r_val, g_val, b_val, float(intensity))
+
+    def render(self, zoom=1.0, pan_x=None, pan_y=None):
+        """(H, W, 3) uint8. The backend reuses this buffer on the next render; copy it to keep it."""
+        pan_x = self.width / 2.0 if pan_x is None else pan_x
+        pan_y = self.height / 2.0 if pan_y is None else pan_y
+        return self.sim.render(zoom, pan_x, pan_y)
+
+    def field(self, name):
+        if name not in self.sim.curr:
+            raise KeyError(f"{name!r} is not a field of the {self.backend} backend {self.fields}")
+        return FieldView(self, name)
+
+    __getitem__ = field
+
+    def get_state(self):
+        """Host copies of every field, plus the step count."""
+        state = {name: self.field(name).to_host() for name in self.fields}
+        state["steps"] = self.steps
+        return state
+
+    def set_state(self, state):
+        """Loads arrays shaped like the fields (e.g. from get_state or an .npz)."""
+        for name in self.fields:
+            if name not in state:
+                continue
+            dst = self.sim.curr[name]
+            src = np.ascontiguousarray(state[name], dtype=dst.dtype)
+            if src.shape != dst.shape:
+                raise ValueError(f"{name}: expected shape {dst.shape}, got {src.shape}")
+            if hasattr(dst, "copy_to_device"):
+                dst.copy_to_device(src)
+            else:
+                dst[...] = src
+        self.steps = int(state.get("steps", self.steps))
+
+    def export(self, path, width, height, zoom=1.0, pan_x=None, pan_y=None,
+               ss=config.EXPORT_SUPERSAMPLE, wait=True, **kwargs):
+        """High-res PNG of the current state (hires_export.py). wait=False returns the running StillExporter."""
+        from hires_export import StillExporter, EXPORT_FIELDS
+        if "idx" in self.sim.curr:
+            # Palette backends: expand idx / amt into the r, g, b grids the exporter shades
+            from palette_color import to_rgb
+            fields = {"v": self.field("v").to_host()}
+            fields["r"], fields["g"], fields["b"] = to_rgb(self.field("idx").to_host(), self.field("amt").to_host(),
+                                                           self.height, self.width)
+        else:
+            fields = {name: self.field(name).to_host() for name in EXPORT_FIELDS}
+        job = StillExporter(fields, path, width, height, zoom, pan_x, pan_y,
+                            view=(self.width, self.height), ss=ss, **kwargs).start()
+        return job.wait() if wait else job
+
+    def synchronize(self):
+        self.sim.synchronize()
+
+    def close(self):
+        if hasattr(self.sim, "close"):
+            self.sim.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# -----------------------------
+# 3. SELF-CHECK
+# -----------------------------
+def self_check(backend="cpu", width=64, height=48):
+    """Confirms field access aliases the engine's memory: same address, writes visible both ways."""
+    results = {}
+    with GrayScottEngine(width, height, backend=backend) as eng:
+        eng.step(5)
+        view = eng["v"]
+        if not view.on_device:
+            arr = np.asarray(view)
+            results["numpy_same_address"] = arr.__array_interface__["data"][0] == view.ptr
+            results["numpy_shares_memory"] = bool(np.shares_memory(arr, eng.sim.curr["v"]))
+            arr[0, 0] = 0.123
+            results["numpy_write_visible"] = bool(eng.sim.curr["v"][0, 0] == np.float32(0.123))
+            dl = np.from_dlpack(view)
+            results["dlpack_shares_memory"] = bool(np.shares_memory(dl, eng.sim.curr["v"]))
+            if sys.version_info >= (3, 12):
+                results["buffer_same_address"] = np.frombuffer(memoryview(view), np.float32).ctypes.data == view.ptr
+            else:
+                results["buffer_same_address"] = "skipped (Python < 3.12 has no __buffer__)"
+        elif not hasattr(view.array, "__cuda_array_interface__"):
+            results["cai"] = "skipped (NUMBA_ENABLE_CUDASIM arrays have no device pointer)"
+        else:
+            from numba import cuda
+            dev = cuda.as_cuda_array(view)
+            results["cai_same_address"] = dev.__cuda_array_interface__["data"][0] == view.ptr
+            dev[0:1, 0:1].copy_to_device(np.array([[0.123]], dtype=np.float32))
+            results["cai_write_visible"] = bool(view.to_host()[0, 0] == np.float32(0.123))
+            try:
+                import cupy
+                results["cupy_same_address"] = cupy.asarray(view).data.ptr == view.ptr
+            except ImportError:
+                results["cupy_same_address"] = "skipped (no cupy)"
+        # A step swaps buffers: the view follows, earlier exports keep the old buffer
+        if "cai" not in results:
+            before = view.ptr
+            eng.step(1)
+            results["view_follows_swap"] = view.ptr != before or eng.backend == "strips"
+    ok = all(v is True for v in results.values() if not isinstance(v, str))
+    print(f"[ENGINE] {backend} zero-copy check: {'OK' if ok else 'FAILED'} {json.dumps(results)}")
+    return ok, results
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Gray-Scott engine API.")
+    p.add_argument("--check", action="store_true", help="Verify zero-copy field access")
+    p.add_argument("--backend", choices=["auto", "cuda", "cpu", "strips"], default="cpu")
+    args = p.parse_args(sys.argv[1:])
+    if args.check:
+        sys.exit(0 if self_check(args.backend)[0] else 1)
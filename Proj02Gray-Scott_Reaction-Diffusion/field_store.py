@@ -0,0 +1,368 @@
+# field_store.py
+# Chunked, compressed time series of simulation fields (u, v, ...) for offline analysis.
+#
+# Layout of a store directory:
+#   meta.json           shape, fields, chunk sizes, dtype, codec, frame count + step numbers
+#   <field>.bin         compressed chunks appended back to back
+#   <field>.idx         int64 records (t_chunk, y_chunk, x_chunk, offset, nbytes)
+# A chunk is CHUNK_T frames x CHUNK_Y x CHUNK_X cells. Frames are buffered into a
+# time block in the solver thread (one device -> host copy per field). Full blocks
+# go to a thread pool: byte-shuffle + zlib release the GIL, so tiles compress in
+# parallel while the solver keeps running. A single writer thread appends the
+# results in order.
+# meta.json is rewritten after every block the writer flushes, so a run that dies
+# still leaves a readable store of every frame written so far.
+# The reader memory-maps the data and index, and decompresses only the chunks a
+# requested (time, y, x) window touches.
+#
+# Usage:
+#   python mainV3.py --fields run.fstore             # every FIELDS_EVERY_STEPS steps
+#   python field_store.py --bench [--backend cpu] [--width 1920 --height 1080]
+#   python field_store.py --info run.fstore
+#   python field_store.py --read run.fstore --field v --t 0:50 --y 400:600 --x 800:1000 --out window.npy
+import os
+import sys
+import json
+import time
+import zlib
+import queue
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import config
+
+FORMAT_VERSION = 1
+INDEX_DTYPE = np.dtype([("t", "<i8"), ("y", "<i8"), ("x", "<i8"), ("offset", "<i8"), ("nbytes", "<i8")])
+
+# -----------------------------
+# 1. CODEC
+# -----------------------------
+def _encode(block, shuffle, level):
+    """Byte-shuffle (all 1st bytes, then all 2nd, ...) groups float exponents, which compress well."""
+    raw = np.ascontiguousarray(block)
+    if shuffle and raw.itemsize > 1:
+        raw = raw.view(np.uint8).reshape(-1, raw.itemsize).T
+    return zlib.compress(np.ascontiguousarray(raw).tobytes(), level)
+
+def _decode(buf, shape, dtype, shuffle):
+    dtype = np.dtype(dtype)
+    data = np.frombuffer(zlib.decompress(buf), dtype=np.uint8)
+    if shuffle and dtype.itemsize > 1:
+        data = data.reshape(dtype.itemsize, -1).T
+    return np.ascontiguousarray(data).view(dtype).reshape(shape)
+
+# -----------------------------
+# 2. WRITER
+# -----------------------------
+class FieldRecorder:
+    """
+    capture(step, fields) from the sim loop; fields maps name -> 2D array (device or host).
+    Only the copy into the current time block happens on the caller's thread. Up to
+    max_pending full blocks may wait for compression; beyond that capture() blocks,
+    and the wait is reported as stall time.
+    Memory: each block is chunk_t full frames per field, and up to max_pending + 1
+    are allocated (the extra ones only once compression falls behind). chunk_t is
+    shortened so that this fits in buffer_mb (0 = no limit).
+    """
+    def __init__(self, path, width, height, fields=("u", "v"), chunk_t=16, chunk_y=256, chunk_x=256,
+                 dtype="float32", level=1, shuffle=True, workers=None, max_pending=1,
+                 buffer_mb=config.FIELDS_BUFFER_MB):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.fields = tuple(fields)
+        self.shape = (height, width)
+        self.dtype = np.dtype(dtype)
+        if buffer_mb:
+            frame_bytes = len(self.fields) * height * width * self.dtype.itemsize
+            chunk_t = max(1, min(chunk_t, int(buffer_mb * 1e6) // ((max_pending + 1) * frame_bytes)))
+        self.chunk = (chunk_t, min(chunk_y, height), min(chunk_x, width))
+        self.level = level
+        self.shuffle = shuffle
+        self.steps = []
+        self.frames = 0
+        self.flushed_frames = 0 # Frames whose chunks are on disk; what meta.json describes
+        self._t_chunk = 0
+        self._fill = 0
+        self._free = queue.Queue()
+        self._max_blocks = max_pending + 1
+        self._n_blocks = 0
+        self._block = self._new_block()
+        self._staging = np.empty((height, width), dtype=np.float32)
+        self._pool = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+        self._pending = queue.Queue()
+        self._data = {f: open(os.path.join(path, f"{f}.bin"), "wb") for f in self.fields}
+        self._index = {f: open(os.path.join(path, f"{f}.idx"), "wb") for f in self.fields}
+        self._offsets = {f: 0 for f in self.fields}
+        self._writer = threading.Thread(target=self._write_loop, daemon=True, name="fstore-writer")
+        self._writer.start()
+        self.stats = {"capture_s": 0.0, "stall_s": 0.0, "compress_s": 0.0, "raw_bytes": 0, "stored_bytes": 0}
+        self._t_open = time.perf_counter()
+        self._write_meta()
+
+    def _new_block(self):
+        # zeros() would still fault pages in on first capture; touch them now instead
+        block = {f: np.empty((self.chunk[0],) + self.shape, dtype=self.dtype) for f in self.fields}
+        for arr in block.values():
+            arr.fill(0)
+        self._n_blocks += 1
+        return block
+
+    def capture(self, step, fields):
+        t0 = time.perf_counter()
+        k = self._fill
+        for f in self.fields:
+            src = fields[f]
+            dst = self._block[f][k]
+            if hasattr(src, "copy_to_host"):
+                if self.dtype == np.float32:
+                    src.copy_to_host(dst)
+                else:
+                    src.copy_to_host(self._staging)
+                    dst[...] = self._staging
+            else:
+                dst[...] = src
+        self.steps.append(int(step))
+        self.frames += 1
+        self._fill += 1
+        self.stats["capture_s"] += time.perf_counter() - t0
+        if self._fill == self.chunk[0]:
+            self._submit()
+
+    def _submit(self):
+        block, n, t_chunk = self._block, self._fill, self._t_chunk
+        jobs = []
+        ct, cy, cx = self.chunk
+        h, w = self.shape
+        for f in self.fields:
+            for yi, y0 in enumerate(range(0, h, cy)):
+                for xi, x0 in enumerate(range(0, w, cx)):
+                    tile = block[f][:n, y0:y0 + cy, x0:x0 + cx]
+                    jobs.append((f, yi, xi, self._pool.submit(self._compress, tile)))
+        self._pending.put((t_chunk, n, block, jobs))
+        self._t_chunk += 1
+        self._fill = 0
+        t0 = time.perf_counter()
+        try:
+            self._block = self._free.get_nowait()
+        except queue.Empty:
+            if self._n_blocks < self._max_blocks:
+                self._block = self._new_block() # Compression fell behind: one more block, up to the cap
+            else:
+                self._block = self._free.get() # Blocks only when max_pending blocks are still compressing
+        self.stats["stall_s"] += time.perf_counter() - t0
+
+    def _compress(self, tile):
+        t0 = time.perf_counter()
+        buf = _encode(tile, self.shuffle, self.level)
+        return buf, tile.nbytes, time.perf_counter() - t0
+
+    def _write_loop(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                break
+            t_chunk, n, block, jobs = item
+            for f, yi, xi, fut in jobs:
+                buf, raw, secs = fut.result()
+                self._data[f].write(buf)
+                rec = np.array([(t_chunk, yi, xi, self._offsets[f], len(buf))], dtype=INDEX_DTYPE)
+                self._index[f].write(rec.tobytes())
+                self._offsets[f] += len(buf)
+                self.stats["raw_bytes"] += raw
+                self.stats["stored_bytes"] += len(buf)
+                self.stats["compress_s"] += secs
+            self._free.put(block)
+            for fh in list(self._data.values()) + list(self._index.values()):
+                fh.flush()
+            self.flushed_frames += n
+            self._write_meta()
+
+    def _write_meta(self):
+        meta = {"version": FORMAT_VERSION, "shape": list(self.shape), "fields": list(self.fields),
+                "chunk": list(self.chunk), "dtype": self.dtype.str, "codec": "zlib",
+                "shuffle": self.shuffle, "frames": self.flushed_frames, "steps": self.steps[:self.flushed_frames],
+                "physics": {"Du": config.Du, "Dv": config.Dv, "FEED": config.FEED, "KILL": config.KILL,
+                            "dt": config.dt}}
+        tmp = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.path, "meta.json"))
+
+    def close(self):
+        """Flushes the partial block, waits for the pool and returns the throughput report."""
+        if self._fill:
+            self._submit()
+        self._pending.put(None)
+        self._writer.join()
+        self._pool.shutdown()
+        for fh in list(self._data.values()) + list(self._index.values()):
+            fh.close()
+        self._write_meta()
+        return self.report()
+
+    def _block_bytes(self):
+        return len(self.fields) * self.chunk[0] * self.shape[0] * self.shape[1] * self.dtype.itemsize
+
+    def report(self):
+        s = self.stats
+        wall = time.perf_counter() - self._t_open
+        return {"path": self.path, "frames": self.frames, "fields": list(self.fields),
+                "raw_mb": round(s["raw_bytes"] / 1e6, 2), "stored_mb": round(s["stored_bytes"] / 1e6, 2),
+                "ratio": round(s["raw_bytes"] / s["stored_bytes"], 2) if s["stored_bytes"] else None,
+                "capture_ms_per_frame": round(1000.0 * s["capture_s"] / max(1, self.frames), 3),
+                "stall_s": round(s["stall_s"], 3), "chunk_t": self.chunk[0],
+                "buffer_mb": round(self._n_blocks * self._block_bytes() / 1e6, 1),
+                "compress_mb_s_per_worker": round(s["raw_bytes"] / 1e6 / s["compress_s"], 1) if s["compress_s"] else None,
+                "wall_s": round(wall, 3)}
+
+# -----------------------------
+# 3. READER
+# -----------------------------
+class FieldStore:
+    """Read-only view of a store. read(field, t, y, x) with slices decodes only the chunks it needs."""
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta["version"] != FORMAT_VERSION:
+            raise ValueError(f"unsupported store version {self.meta['version']}")
+        self.shape = tuple(self.meta["shape"])
+        self.chunk = tuple(self.meta["chunk"])
+        self.frames = self.meta["frames"]
+        self.steps = np.array(self.meta["steps"], dtype=np.int64)
+        self.dtype = np.dtype(self.meta["dtype"])
+        self._data = {}
+        self._lookup = {}
+        for f in self.meta["fields"]:
+            data_path = os.path.join(path, f"{f}.bin")
+            self._data[f] = np.memmap(data_path, dtype=np.uint8, mode="r") if os.path.getsize(data_path) else None
+            idx = np.fromfile(os.path.join(path, f"{f}.idx"), dtype=INDEX_DTYPE)
+            self._lookup[f] = {(int(r["t"]), int(r["y"]), int(r["x"])): (int(r["offset"]), int(r["nbytes"]))
+                               for r in idx}
+        self.chunks_decoded = 0
+
+    @property
+    def fields(self):
+        return tuple(self.meta["fields"])
+
+    def read(self, field, t=slice(None), y=slice(None), x=slice(None)):
+        """(frames, rows, cols) float array for the window; slices must have step 1."""
+        t0, t1, _ = t.indices(self.frames)
+        y0, y1, _ = y.indices(self.shape[0])
+        x0, x1, _ = x.indices(self.shape[1])
+        ct, cy, cx = self.chunk
+        out = np.empty((max(0, t1 - t0), max(0, y1 - y0), max(0, x1 - x0)), dtype=self.dtype)
+        if out.size == 0:
+            return out
+        data = self._data[field]
+        for tc in range(t0 // ct, (t1 - 1) // ct + 1):
+            n_t = min(ct, self.frames - tc * ct)
+            for yc in range(y0 // cy, (y1 - 1) // cy + 1):
+                n_y = min(cy, self.shape[0] - yc * cy)
+                for xc in range(x0 // cx, (x1 - 1) // cx + 1):
+                    n_x = min(cx, self.shape[1] - xc * cx)
+                    off, nbytes = self._lookup[field][(tc, yc, xc)]
+                    chunk = _decode(data[off:off + nbytes], (n_t, n_y, n_x), self.dtype, self.meta["shuffle"])
+                    self.chunks_decoded += 1
+                    # Overlap of this chunk with the request, in global then local coordinates
+                    gt0, gt1 = max(t0, tc * ct), min(t1, tc * ct + n_t)
+                    gy0, gy1 = max(y0, yc * cy), min(y1, yc * cy + n_y)
+                    gx0, gx1 = max(x0, xc * cx), min(x1, xc * cx + n_x)
+                    out[gt0 - t0:gt1 - t0, gy0 - y0:gy1 - y0, gx0 - x0:gx1 - x0] = \
+                        chunk[gt0 - tc * ct:gt1 - tc * ct, gy0 - yc * cy:gy1 - yc * cy, gx0 - xc * cx:gx1 - xc * cx]
+        return out
+
+# -----------------------------
+# 4. BENCHMARK / CLI
+# -----------------------------
+def benchmark(backend="auto", width=config.WIDTH, height=config.HEIGHT, frames=64, every=config.STEPS_PER_FRAME,
+              path="bench.fstore", fields=("u", "v")):
+    """Solver-only vs solver + recording, then a full read vs a small window read."""
+    from backends import create_backend
+    sim = create_backend(backend, width, height)
+    sim.init_grid()
+    sim.step(every) # Warm-up / JIT
+    sim.synchronize()
+
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        sim.step(every)
+    sim.synchronize()
+    solver_s = time.perf_counter() - t0
+
+    sim.init_grid()
+    rec = FieldRecorder(path, width, height, fields)
+    t0 = time.perf_counter()
+    for i in range(frames):
+        sim.step(every)
+        rec.capture((i + 1) * every, sim.curr)
+    sim.synchronize()
+    loop_s = time.perf_counter() - t0
+    report = rec.close()
+    report.update({"backend": sim.name, "resolution": f"{width}x{height}", "every_steps": every,
+                   "solver_only_s": round(solver_s, 3), "solver_recording_s": round(loop_s, 3),
+                   "overhead": round(loop_s / solver_s - 1.0, 4) if solver_s > 0 else None})
+    print(f"[FSTORE] {frames} frames of {','.join(fields)} at {width}x{height}: {report['raw_mb']} MB -> "
+          f"{report['stored_mb']} MB (x{report['ratio']}) | capture {report['capture_ms_per_frame']} ms/frame | "
+          f"stall {report['stall_s']}s | loop overhead {report['overhead']:+.1%}")
+
+    store = FieldStore(path)
+    t0 = time.perf_counter()
+    full = store.read("v")
+    full_s = time.perf_counter() - t0
+    store.chunks_decoded = 0
+    t0 = time.perf_counter()
+    window = store.read("v", slice(frames // 2, frames // 2 + 8), slice(height // 2, height // 2 + 64),
+                        slice(width // 2, width // 2 + 64))
+    window_s = time.perf_counter() - t0
+    assert np.array_equal(window, full[frames // 2:frames // 2 + 8, height // 2:height // 2 + 64,
+                                       width // 2:width // 2 + 64])
+    report["read"] = {"full_ms": round(full_s * 1000, 2), "window_ms": round(window_s * 1000, 3),
+                      "window_chunks": store.chunks_decoded}
+    print(f"[FSTORE] Read v: full {report['read']['full_ms']} ms | 8x64x64 window "
+          f"{report['read']['window_ms']} ms ({store.chunks_decoded} chunks)")
+    if hasattr(sim, "close"):
+        sim.close()
+    return report
+
+def _parse_slice(text):
+    if not text:
+        return slice(None)
+    a, _, b = text.partition(":")
+    return slice(int(a) if a else None, int(b) if b else None)
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Chunked compressed field time series.")
+    p.add_argument("--bench", action="store_true")
+    p.add_argument("--backend", choices=["auto", "cuda", "cpu", "strips"], default="auto")
+    p.add_argument("--width", type=int, default=config.WIDTH)
+    p.add_argument("--height", type=int, default=config.HEIGHT)
+    p.add_argument("--frames", type=int, default=64)
+    p.add_argument("--info", type=str, default="")
+    p.add_argument("--read", type=str, default="", help="Store to read a window from")
+    p.add_argument("--field", type=str, default="v")
+    p.add_argument("--t", type=str, default="")
+    p.add_argument("--y", type=str, default="")
+    p.add_argument("--x", type=str, default="")
+    p.add_argument("--out", type=str, default="")
+    p.add_argument("--json", type=str, default="")
+    args = p.parse_args(sys.argv[1:])
+
+    if args.bench:
+        res = benchmark(args.backend, args.width, args.height, args.frames)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(res, f, indent=4)
+    if args.info:
+        s = FieldStore(args.info)
+        steps = f"{s.steps[0]}..{s.steps[-1]}" if len(s.steps) else "-"
+        print(f"[FSTORE] {args.info}: {s.frames} frames (steps {steps}) of {','.join(s.fields)} "
+              f"{s.shape[1]}x{s.shape[0]}, chunks {s.chunk}, {s.dtype}")
+    if args.read:
+        s = FieldStore(args.read)
+        arr = s.read(args.field, _parse_slice(args.t), _parse_slice(args.y), _parse_slice(args.x))
+        print(f"[FSTORE] {args.field} window {arr.shape}: min {arr.min():.4f} max {arr.max():.4f} "
+              f"({s.chunks_decoded} chunks decoded)")
+        if args.out:
+            np.save(args.out, arr)
@@ -0,0 +1,311 @@
+# hires_export.py
+# High-resolution still export: renders the current state at any output size
+# (e.g. 16384 x 16384 with 2x2 supersampling) with the render_camera_view
+# shading, strip by strip, straight into a PNG on disk.
+#
+# - The view matches the window: same pan and zoom, with the zoom scaled by
+#   output size / window size. Each output pixel averages SS x SS shaded samples.
+#   Samples read the fields bilinearly (or nearest, which with SS=1 at window
+#   size gives exactly render_camera_view's image).
+# - Strips of STRIP rows are rendered on a thread pool. The kernel is nogil, so
+#   the threads really run in parallel. Each worker also filters and deflates
+#   its own strip: a raw deflate stream ended with a sync flush, pigz-style,
+#   plus its adler32. A writer appends the strips in order as IDAT chunks and
+#   combines the adler32s. At most 2 x workers strips are alive at once, so
+#   memory stays at a few strips whatever the output size.
+# - The interactive loop only pays for the host copy of v, r, g, b ('E' in
+#   mainV3). Everything else runs on background threads.
+#
+# Usage:
+#   python hires_export.py --size 16384x16384 --ss 2 --steps 6000 [--backend cpu] [--state state.npz]
+#   python hires_export.py --check        (nearest, SS=1, window size == render_camera_view)
+import os
+import sys
+import json
+import time
+import zlib
+import queue
+import struct
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from numba import njit
+import config
+
+EXPORT_FIELDS = ("v", "r", "g", "b")
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+ADLER_BASE = 65521
+
+# -----------------------------
+# 1. STRIP RENDERER
+# -----------------------------
+@njit(nogil=True, cache=True)
+def _shade(v, c):
+    """render_camera_view's tone curve for one channel (0..255 float)."""
+    t = v * 4.0
+    t = min(1.0, max(0.0, t))
+    t = t ** (1.0 / config.THICKNESS_MODIFIER + 0.5)
+    return min(1.0, c) * 255.0 * t
+
+@njit(nogil=True, cache=True)
+def _sample(grid, gx, gy, bilinear):
+    h, w = grid.shape
+    if not bilinear:
+        return grid[int(gy), int(gx)]
+    # Cell centres sit at +0.5; neighbours wrap like the simulation grid
+    fx = gx - 0.5
+    fy = gy - 0.5
+    x0 = int(np.floor(fx))
+    y0 = int(np.floor(fy))
+    tx = fx - x0
+    ty = fy - y0
+    x0m, x1m = x0 % w, (x0 + 1) % w
+    y0m, y1m = y0 % h, (y0 + 1) % h
+    top = grid[y0m, x0m] * (1.0 - tx) + grid[y0m, x1m] * tx
+    bottom = grid[y1m, x0m] * (1.0 - tx) + grid[y1m, x1m] * tx
+    return top * (1.0 - ty) + bottom * ty
+
+@njit(nogil=True, cache=True)
+def render_strip(v_grid, r_grid, g_grid, b_grid, out, y0, out_w, out_h, zoom, pan_x, pan_y, ss, bilinear):
+    """
+    Rows y0 .. y0 + out.shape[0] of an out_w x out_h image into out (rows, out_w, 3) uint8.
+    Same mapping as render_camera_view: grid = pan + (pixel - size / 2) / zoom.
+    """
+    h, w = v_grid.shape
+    inv = 1.0 / (ss * ss)
+    for row in range(out.shape[0]):
+        sy = y0 + row
+        for sx in range(out_w):
+            acc_r = 0.0
+            acc_g = 0.0
+            acc_b = 0.0
+            for j in range(ss):
+                py = sy + (j + 0.5) / ss - 0.5
+                gy = pan_y + (py - out_h / 2.0) / zoom
+                for i in range(ss):
+                    px = sx + (i + 0.5) / ss - 0.5
+                    gx = pan_x + (px - out_w / 2.0) / zoom
+                    # Outside the grid is black, like the live renderer (it truncates too)
+                    if 0 <= int(gx) < w and 0 <= int(gy) < h:
+                        v = _sample(v_grid, gx, gy, bilinear)
+                        acc_r += _shade(v, _sample(r_grid, gx, gy, bilinear))
+                        acc_g += _shade(v, _sample(g_grid, gx, gy, bilinear))
+                        acc_b += _shade(v, _sample(b_grid, gx, gy, bilinear))
+            if ss == 1:
+                # Truncate like the live kernel so SS=1 nearest is bit-identical
+                out[row, sx, 0] = int(acc_r)
+                out[row, sx, 1] = int(acc_g)
+                out[row, sx, 2] = int(acc_b)
+            else:
+                out[row, sx, 0] = int(acc_r * inv + 0.5)
+                out[row, sx, 1] = int(acc_g * inv + 0.5)
+                out[row, sx, 2] = int(acc_b * inv + 0.5)
+
+# -----------------------------
+# 2. STREAMING PNG (PARALLEL DEFLATE)
+# -----------------------------
+def _chunk(tag, data):
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+def adler32_combine(adler1, adler2, len2):
+    """zlib's adler32_combine: checksum of A + B from the checksums of A and B."""
+    rem = len2 % ADLER_BASE
+    sum1 = adler1 & 0xFFFF
+    sum2 = (rem * sum1) % ADLER_BASE
+    sum1 += (adler2 & 0xFFFF) + ADLER_BASE - 1
+    sum2 += ((adler1 >> 16) & 0xFFFF) + ((adler2 >> 16) & 0xFFFF) + ADLER_BASE - rem
+    if sum1 >= ADLER_BASE: sum1 -= ADLER_BASE
+    if sum1 >= ADLER_BASE: sum1 -= ADLER_BASE
+    if sum2 >= ADLER_BASE << 1: sum2 -= ADLER_BASE << 1
+    if sum2 >= ADLER_BASE: sum2 -= ADLER_BASE
+    return sum1 | (sum2 << 16)
+
+def encode_strip(pixels, level):
+    """PNG 'Sub' filter per row, then raw deflate ended with a sync flush. Returns (data, adler32, raw_len)."""
+    rows, width, _ = pixels.shape
+    flat = pixels.reshape(rows, width * 3)
+    filtered = np.empty((rows, width * 3 + 1), dtype=np.uint8)
+    filtered[:, 0] = 1 # Sub: each byte minus the same channel one pixel left
+    filtered[:, 1:4] = flat[:, :3]
+    np.subtract(flat[:, 3:], flat[:, :-3], out=filtered[:, 4:])
+    raw = filtered.tobytes()
+    comp = zlib.compressobj(level, zlib.DEFLATED, -15)
+    data = comp.compress(raw) + comp.flush(zlib.Z_SYNC_FLUSH)
+    return data, zlib.adler32(raw), len(raw)
+
+class PNGStripWriter:
+    """Writes header, then pre-deflated strips in order, then the stream trailer."""
+    def __init__(self, path, width, height):
+        self.f = open(path, "wb")
+        self.f.write(PNG_SIGNATURE)
+        self.f.write(_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        self.f.write(_chunk(b"IDAT", b"\x78\x9c")) # zlib header (deflate, 32K window)
+        self.adler = 1
+        self.bytes_written = 0
+
+    def write(self, data, adler, raw_len):
+        self.f.write(_chunk(b"IDAT", data))
+        self.adler = adler32_combine(self.adler, adler, raw_len)
+        self.bytes_written += len(data)
+
+    def close(self):
+        final = zlib.compressobj(6, zlib.DEFLATED, -15).flush(zlib.Z_FINISH) # Empty last block
+        self.f.write(_chunk(b"IDAT", final + struct.pack(">I", self.adler)))
+        self.f.write(_chunk(b"IEND", b""))
+        self.f.close()
+
+# -----------------------------
+# 3. EXPORT JOB
+# -----------------------------
+def export_zoom(view_w, view_h, out_w, out_h, zoom):
+    """Zoom for an out_w x out_h image framing what a view_w x view_h window shows (fit inside)."""
+    return zoom * min(out_w / view_w, out_h / view_h)
+
+class StillExporter:
+    """
+    fields: host arrays {"v", "r", "g", "b"} (copied by the caller; the job keeps a reference).
+    start() returns at once; done() / wait() / report for the outcome.
+    """
+    def __init__(self, fields, path, width, height, zoom=1.0, pan_x=None, pan_y=None,
+                 view=(config.WIDTH, config.HEIGHT), ss=2, strip=128, workers=0,
+                 bilinear=True, level=6):
+        gh, gw = fields["v"].shape
+        self.fields = [np.ascontiguousarray(fields[f], dtype=np.float32) for f in EXPORT_FIELDS]
+        self.path = path
+        self.width, self.height = width, height
+        pan_x = gw / 2.0 if pan_x is None else pan_x
+        pan_y = gh / 2.0 if pan_y is None else pan_y
+        self.camera = (export_zoom(view[0], view[1], width, height, zoom), pan_x, pan_y)
+        self.ss = ss
+        self.strip = strip
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1) # Leave a core for the sim loop
+        self.bilinear = bilinear
+        self.level = level
+        self.report = None
+        self.error = None
+        self.progress = 0.0
+        self._thread = threading.Thread(target=self._run, name="hires-export", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def done(self):
+        return not self._thread.is_alive()
+
+    def wait(self):
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.report
+
+    def _strip(self, y0):
+        rows = min(self.strip, self.height - y0)
+        out = np.empty((rows, self.width, 3), dtype=np.uint8)
+        zoom, pan_x, pan_y = self.camera
+        render_strip(*self.fields, out, y0, self.width, self.height, zoom, pan_x, pan_y,
+                     self.ss, self.bilinear)
+        return encode_strip(out, self.level)
+
+    def _run(self):
+        t0 = time.perf_counter()
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            writer = PNGStripWriter(self.path, self.width, self.height)
+            starts = list(range(0, self.height, self.strip))
+            window = 2 * self.workers
+            pending = queue.deque()
+            with ThreadPoolExecutor(self.workers, thread_name_prefix="hires-strip") as pool:
+                for i, y0 in enumerate(starts):
+                    pending.append(pool.submit(self._strip, y0))
+                    if len(pending) >= window:
+                        writer.write(*pending.popleft().result())
+                        self.progress = (i + 2 - len(pending)) / len(starts)
+                while pending:
+                    writer.write(*pending.popleft().result())
+            writer.close()
+            elapsed = time.perf_counter() - t0
+            mp = self.width * self.height / 1e6
+            self.progress = 1.0
+            self.report = {"path": self.path, "size": f"{self.width}x{self.height}", "supersample": self.ss,
+                           "filter": "bilinear" if self.bilinear else "nearest", "workers": self.workers,
+                           "strips": len(starts), "seconds": round(elapsed, 2),
+                           "mpix_per_s": round(mp / elapsed, 2) if elapsed > 0 else None,
+                           "file_mb": round(os.path.getsize(self.path) / 1e6, 2),
+                           "strip_buffer_mb": round(window * self.strip * self.width * 3 / 1e6, 2)}
+        except Exception as e:
+            self.error = e
+
+def export_fields(fields, path, width, height, **kwargs):
+    """Blocking export. Returns the report."""
+    return StillExporter(fields, path, width, height, **kwargs).start().wait()
+
+# -----------------------------
+# 4. CLI
+# -----------------------------
+def _check():
+    """SS=1 nearest at window size must match kernels_cpu.render_camera_view byte for byte."""
+    import tempfile
+    import pygame
+    import kernels_cpu
+    from engine import GrayScottEngine
+    w, h = 320, 180
+    with GrayScottEngine(w, h, backend="cpu") as eng:
+        eng.paint(100, 60, color=1)
+        eng.step(600)
+        fields = {f: eng[f].to_host() for f in EXPORT_FIELDS}
+    ok = True
+    for zoom, pan in ((1.0, (w / 2, h / 2)), (2.7, (130.3, 77.1)), (0.6, (160.0, 90.0))):
+        ref = np.zeros((h, w, 3), dtype=np.uint8)
+        kernels_cpu.render_camera_view(fields["v"], fields["r"], fields["g"], fields["b"], ref, zoom, *pan)
+        path = os.path.join(tempfile.mkdtemp(), "check.png")
+        export_fields(fields, path, w, h, zoom=zoom, pan_x=pan[0], pan_y=pan[1], view=(w, h),
+                      ss=1, strip=32, bilinear=False)
+        img = pygame.surfarray.array3d(pygame.image.load(path)).swapaxes(0, 1)
+        same = np.array_equal(img, ref)
+        ok &= same
+        print(f"[EXPORT] zoom {zoom}: {'identical' if same else 'DIFFERENT'} to render_camera_view")
+    return ok
+
+def _size(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Tiled, supersampled high-resolution still export.")
+    p.add_argument("--size", type=_size, default=(16384, 16384), help="WIDTHxHEIGHT of the image")
+    p.add_argument("--ss", type=int, default=config.EXPORT_SUPERSAMPLE, help="Samples per axis per pixel")
+    p.add_argument("--state", type=str, default=None, help=".npz from GrayScottEngine.get_state (v, r, g, b)")
+    p.add_argument("--steps", type=int, default=6000, help="Without --state: steps to run from the default seed")
+    p.add_argument("--backend", choices=["auto", "cuda", "cpu", "strips"], default="auto")
+    p.add_argument("--grid", type=_size, default=(config.WIDTH, config.HEIGHT), help="Simulation size without --state")
+    p.add_argument("--zoom", type=float, default=1.0)
+    p.add_argument("--nearest", action="store_true", help="Nearest-cell sampling (blocky when magnified)")
+    p.add_argument("--strip", type=int, default=config.EXPORT_STRIP_ROWS)
+    p.add_argument("--workers", type=int, default=config.EXPORT_WORKERS)
+    p.add_argument("--out", type=str, default=None)
+    p.add_argument("--check", action="store_true")
+    args = p.parse_args(sys.argv[1:])
+    if args.check:
+        sys.exit(0 if _check() else 1)
+
+    if args.state:
+        state = np.load(args.state)
+        fields = {f: state[f] for f in EXPORT_FIELDS}
+    else:
+        from engine import GrayScottEngine
+        with GrayScottEngine(*args.grid, backend=args.backend) as eng:
+            t0 = time.perf_counter()
+            eng.step(args.steps)
+            eng.synchronize()
+            print(f"[EXPORT] {args.steps} steps on {eng.backend} in {time.perf_counter() - t0:.1f}s")
+            fields = {f: eng[f].to_host() for f in EXPORT_FIELDS}
+    gh, gw = fields["v"].shape
+    out = args.out or os.path.join(config.EXPORT_DIR, f"still_{args.size[0]}x{args.size[1]}_{time.strftime('%Y%m%d_%H%M%S')}.png")
+    rep = export_fields(fields, out, *args.size, zoom=args.zoom, view=(gw, gh), ss=args.ss,
+                        strip=args.strip, workers=args.workers, bilinear=not args.nearest)
+    print(f"[EXPORT] {rep['size']} x{rep['supersample']}^2 -> {rep['path']} ({rep['file_mb']} MB) in "
+          f"{rep['seconds']}s, {rep['mpix_per_s']} MP/s on {rep['workers']} workers, "
+          f"{rep['strip_buffer_mb']} MB of strips in flight")
+    print(json.dumps(rep))
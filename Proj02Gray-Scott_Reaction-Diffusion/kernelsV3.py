@@ -8,7 +8,8 @@ def init_grid(u, v, r_grid, g_grid, b_grid):
     Initialize grid with a center seed of Cyan color.
     """
     x, y = cuda.grid(2)
-    if x < config.WIDTH and y < config.HEIGHT:
+    h, w = u.shape
+    if x < w and y < h:
         u[y, x] = 1.0
         v[y, x] = 0.0
         r_grid[y, x] = 0.0
@@ -16,7 +17,7 @@ def init_grid(u, v, r_grid, g_grid, b_grid):
         b_grid[y, x] = 0.0
         
         # Center Seed
-        cx, cy = config.WIDTH // 2, config.HEIGHT // 2
+        cx, cy = w // 2, h // 2
         if (x > cx - 20 and x < cx + 20 and 
             y > cy - 20 and y < cy + 20):
             
@@ -37,7 +38,7 @@ def update_step(u_in, v_in, u_out, v_out,
     Physics Step + Color Diffusion Step
     """
     c, r = cuda.grid(2)
-    w, h = config.WIDTH, config.HEIGHT
+    h, w = u_in.shape
     
     if c < w and r < h:
         # --- 1. Gray-Scott Physics ---
@@ -78,13 +79,15 @@ def render_camera_view(v_grid, r_grid, g_grid, b_grid, image_out, zoom, pan_x, p
     Renders the grid with Thickness Modifier and RGB Tinting.
     """
     sx, sy = cuda.grid(2)
-    if sx < config.WIDTH and sy < config.HEIGHT:
-        dx = sx - config.WIDTH / 2.0
-        dy = sy - config.HEIGHT / 2.0
+    out_h, out_w = image_out.shape[0], image_out.shape[1]
+    h, w = v_grid.shape
+    if sx < out_w and sy < out_h:
+        dx = sx - out_w / 2.0
+        dy = sy - out_h / 2.0
         grid_x = int(pan_x + dx / zoom)
         grid_y = int(pan_y + dy / zoom)
         
-        if 0 <= grid_x < config.WIDTH and 0 <= grid_y < config.HEIGHT:
+        if 0 <= grid_x < w and 0 <= grid_y < h:
             val = v_grid[grid_y, grid_x]
             
             # --- Thickness Math ---
@@ -116,7 +119,8 @@ def paint(v_grid, r_grid, g_grid, b_grid, x, y, radius, r_val, g_val, b_val, int
     Injects Chemical V + Color with Variable Intensity (Alpha).
     """
     c, r = cuda.grid(2)
-    if r < config.HEIGHT and c < config.WIDTH:
+    h, w = v_grid.shape
+    if r < h and c < w:
         dist_sq = (c - x)**2 + (r - y)**2
         if dist_sq < radius**2:
             # 1. Inject V (Reactant)
@@ -0,0 +1,112 @@
+# kernels_cpu.py
+# CPU (Numba prange) versions of the kernelsV3 kernels, for machines without a
+# CUDA device and for benchmarking. Same signatures, same math, same config constants.
+from numba import njit, prange
+import config
+
+@njit(parallel=True, cache=True)
+def init_grid(u, v, r_grid, g_grid, b_grid):
+    """
+    Initialize grid with a center seed of Cyan color.
+    """
+    h, w = u.shape
+    cx, cy = w // 2, h // 2
+    for y in prange(h):
+        for x in range(w):
+            u[y, x] = 1.0
+            v[y, x] = 0.0
+            r_grid[y, x] = 0.0
+            g_grid[y, x] = 0.0
+            b_grid[y, x] = 0.0
+
+            # Center Seed
+            if (x > cx - 20 and x < cx + 20 and
+                y > cy - 20 and y < cy + 20):
+                noise = ((x * y * 12.9898) % 1.0)
+                if noise > 0.5:
+                    v[y, x] = 0.8
+                    g_grid[y, x] = 1.0
+                    b_grid[y, x] = 1.0
+                else:
+                    v[y, x] = 0.2
+
+@njit(parallel=True, cache=True)
+def update_step(u_in, v_in, u_out, v_out,
+                r_in, g_in, b_in, r_out, g_out, b_out):
+    """
+    Physics Step + Color Diffusion Step
+    """
+    h, w = u_in.shape
+    diff_rate = 0.5
+    for r in prange(h):
+        up, down = (r - 1) % h, (r + 1) % h
+        for c in range(w):
+            left, right = (c - 1) % w, (c + 1) % w
+
+            # --- 1. Gray-Scott Physics ---
+            curr_u = u_in[r, c]
+            curr_v = v_in[r, c]
+            lap_u = (u_in[r, left] + u_in[r, right] + u_in[up, c] + u_in[down, c] - 4.0 * curr_u)
+            lap_v = (v_in[r, left] + v_in[r, right] + v_in[up, c] + v_in[down, c] - 4.0 * curr_v)
+
+            uvv = curr_u * curr_v * curr_v
+            du = (config.Du * lap_u - uvv + config.FEED * (1.0 - curr_u))
+            dv = (config.Dv * lap_v + uvv - (config.FEED + config.KILL) * curr_v)
+            u_out[r, c] = curr_u + du * config.dt
+            v_out[r, c] = curr_v + dv * config.dt
+
+            # --- 2. Color Diffusion ---
+            cr, cg, cb = r_in[r, c], g_in[r, c], b_in[r, c]
+            lap_r = (r_in[r, left] + r_in[r, right] + r_in[up, c] + r_in[down, c] - 4.0 * cr)
+            lap_g = (g_in[r, left] + g_in[r, right] + g_in[up, c] + g_in[down, c] - 4.0 * cg)
+            lap_b = (b_in[r, left] + b_in[r, right] + b_in[up, c] + b_in[down, c] - 4.0 * cb)
+            r_out[r, c] = cr + (diff_rate * lap_r) * config.dt
+            g_out[r, c] = cg + (diff_rate * lap_g) * config.dt
+            b_out[r, c] = cb + (diff_rate * lap_b) * config.dt
+
+@njit(parallel=True, cache=True)
+def render_camera_view(v_grid, r_grid, g_grid, b_grid, image_out, zoom, pan_x, pan_y):
+    """
+    Renders the grid with Thickness Modifier and RGB Tinting.
+    """
+    out_h, out_w = image_out.shape[0], image_out.shape[1]
+    h, w = v_grid.shape
+    for sy in prange(out_h):
+        for sx in range(out_w):
+            grid_x = int(pan_x + (sx - out_w / 2.0) / zoom)
+            grid_y = int(pan_y + (sy - out_h / 2.0) / zoom)
+            if 0 <= grid_x < w and 0 <= grid_y < h:
+                t = v_grid[grid_y, grid_x] * 4.0
+                t = min(1.0, max(0.0, t))
+                t = t ** (1.0 / config.THICKNESS_MODIFIER + 0.5)
+                image_out[sy, sx, 0] = int(min(1.0, r_grid[grid_y, grid_x]) * 255 * t)
+                image_out[sy, sx, 1] = int(min(1.0, g_grid[grid_y, grid_x]) * 255 * t)
+                image_out[sy, sx, 2] = int(min(1.0, b_grid[grid_y, grid_x]) * 255 * t)
+            else:
+                image_out[sy, sx, 0] = 0
+                image_out[sy, sx, 1] = 0
+                image_out[sy, sx, 2] = 0
+
+@njit(parallel=True, cache=True)
+def paint(v_grid, r_grid, g_grid, b_grid, x, y, radius, r_val, g_val, b_val, intensity):
+    """
+    Injects Chemical V + Color with Variable Intensity (Alpha).
+    Only the brush's bounding box is visited (the GPU version launches over the full grid).
+    """
+    h, w = v_grid.shape
+    y0 = max(0, int(y - radius) - 1)
+    y1 = min(h, int(y + radius) + 2)
+    x0 = max(0, int(x - radius) - 1)
+    x1 = min(w, int(x + radius) + 2)
+    inject_amount = 0.5 * intensity
+    for r in prange(y0, y1):
+        for c in range(x0, x1):
+            dist_sq = (c - x)**2 + (r - y)**2
+            if dist_sq < radius**2:
+                v_grid[r, c] = max(v_grid[r, c], inject_amount)
+                curr_r = r_grid[r, c]
+                curr_g = g_grid[r, c]
+                curr_b = b_grid[r, c]
+                r_grid[r, c] = curr_r + (r_val - curr_r) * intensity
+                g_grid[r, c] = curr_g + (g_val - curr_g) * intensity
+                b_grid[r, c] = curr_b + (b_val - curr_b) * intensity
@@ -5,10 +5,46 @@ from numba import cuda
 import config
 import kernelsV3 as kernels
 import utils
+import os
 import sys
 import math
+import json
+import time
+import argparse
+from datetime import datetime
+from replay import InputRecorder
+from analysis import PatternAnalyzer, ConvergenceDetector, StatsLog
+from mip_render import MipRenderer
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "shared")) # frame_profiler.py, frame_stream.py, telemetry.py
+from frame_profiler import FrameProfiler, format_overlay_lines
+from frame_stream import FrameStreamer
+from warm_start import warm_start_fields
+from field_store import FieldRecorder
+from hires_export import StillExporter
+from telemetry import Registry, MetricsServer, JsonlExporter, FRAME_BUCKETS
 
-def main():
+# Frame phases, in loop order
+PHASES = ["events", "paint", "simulate", "stats", "render", "copy", "blit", "ui", "present", "tick"]
+(PH_EVENTS, PH_PAINT, PH_SIMULATE, PH_STATS, PH_RENDER, PH_COPY,
+ PH_BLIT, PH_UI, PH_PRESENT, PH_TICK) = range(len(PHASES))
+
+def export_profile(profiler, path, cam_zoom):
+    """Appends the current phase percentiles as one JSON line."""
+    report = profiler.percentiles()
+    if not report:
+        return
+    entry = {
+        "timestamp": datetime.now().isoformat(),
+        "resolution": f"{config.WIDTH}x{config.HEIGHT}",
+        "steps_per_frame": config.STEPS_PER_FRAME,
+        "zoom": round(cam_zoom, 3),
+        "timings_ms": report,
+    }
+    with open(path, 'a') as f:
+        f.write(json.dumps(entry) + "\n")
+
+def main(record_path=None, stream_port=0, warm_factor=0, fields_path=None,
+         metrics_port=config.METRICS_PORT, metrics_path=config.METRICS_JSONL):
     # 1. Setup Pygame
     pygame.init()
     # SCALED allows 4K config to fit on 1080p monitors if needed
@@ -47,6 +83,14 @@ def main():
     
     # Initialize
     kernels.init_grid[blocks, threads](u_curr, v_curr, r_curr, g_curr, b_curr)
+    warm = None
+    if warm_factor > 1:
+        # Grow the seed on a coarse grid first ('R' still resets to the plain seed)
+        print(f"[WARM] Coarse x{warm_factor} phase until coverage {config.WARM_START_COVERAGE}...")
+        warm = {"factor": warm_factor, "coverage": config.WARM_START_COVERAGE}
+        info = warm_start_fields({"u": u_curr, "v": v_curr, "r": r_curr, "g": g_curr, "b": b_curr},
+                                 warm_factor, "cuda", config.WARM_START_COVERAGE)
+        print(f"[WARM] {info['coarse_steps']} coarse steps in {info['total_s']:.2f}s")
     
     # 4. State Variables
     cam_zoom = 1.0
@@ -61,10 +105,63 @@ def main():
     last_mouse_pos = (0, 0)
     clock = pygame.time.Clock()
     running = True
+
+    # Phase profiler ('P' toggles the overlay)
+    profiler = FrameProfiler(PHASES, enabled=config.PROFILE_ENABLED, sync_fn=cuda.synchronize)
+    show_profile = False
+
+    # Mip-pyramid renderer ('M') and reduced internal resolution ('N': 1 -> 1/2 -> 1/4)
+    mip = MipRenderer(config.WIDTH, config.HEIGHT, backend="cuda", update_every=config.MIP_UPDATE_EVERY)
+    use_mip = config.MIP_ENABLED
+    internal_scale = 1
+    small_surf = None
+    profile_font = pygame.font.SysFont('Consolas', 14)
+    profile_surf = None
+    last_overlay = 0.0
+    last_export = time.perf_counter()
+
+    # Input recording (--record): resets, paint dabs and camera moves per frame index
+    recorder = InputRecorder(record_path, warm_start=warm) if record_path else None
+    frame_index = 0
+
+    # Live viewer (--stream PORT): tile diffs encoded off-thread, slow clients never block this loop
+    streamer = FrameStreamer(stream_port, fps_cap=config.STREAM_FPS) if stream_port else None
+
+    # Field time series (--fields PATH): u/v every FIELDS_EVERY_STEPS steps, compressed off-thread
+    field_rec = FieldRecorder(fields_path, config.WIDTH, config.HEIGHT, config.FIELDS_RECORDED) if fields_path else None
+    fields_every = max(1, config.FIELDS_EVERY_STEPS // config.STEPS_PER_FRAME)
+
+    # Pattern statistics (config.STATS_INTERVAL > 0): scalars only, no frame readback
+    analyzer = stats_log = detector = None
+    if config.STATS_INTERVAL > 0:
+        analyzer = PatternAnalyzer(config.WIDTH, config.HEIGHT, backend="cuda")
+        detector = ConvergenceDetector()
+        stats_log = StatsLog(config.STATS_LOG)
+    pattern_converged = False
+
+    # Shared metrics (shared/telemetry.py): same names as Gargantua, told apart by the sim label.
+    # Recording is lock-free; the exporters read on their own threads.
+    registry = Registry({"sim": "gray_scott", "backend": "cuda"})
+    m_frames = registry.counter("sim_frames_total", "Frames presented")
+    m_frame_s = registry.histogram("sim_frame_seconds", "Wall time per frame", FRAME_BUCKETS)
+    m_steps = registry.counter("sim_steps_total", "Reaction-diffusion update steps")
+    m_copy = registry.counter("sim_copy_bytes_total", "Device to host bytes")
+    m_fps = registry.gauge("sim_fps", "Frames per second (pygame clock)")
+    m_steps_s = registry.gauge("sim_steps_per_second", "Update steps per second")
+    m_zoom = registry.gauge("gray_scott_zoom", "Camera zoom")
+    registry.gauge("sim_cells", "Grid cells").set(config.WIDTH * config.HEIGHT)
+    metrics_server = MetricsServer(registry, metrics_port) if metrics_port else None
+    metrics_jsonl = JsonlExporter(registry, metrics_path, config.METRICS_INTERVAL) if metrics_path else None
+    field_bytes = len(config.FIELDS_RECORDED) * config.WIDTH * config.HEIGHT * 4
+
+    # High-res still export ('E'): the loop only pays for copying v, r, g, b to the host
+    exporter = None
+    last_frame_t = time.perf_counter()
     
     print("--- SYSTEM READY ---")
 
     while running:
+        profiler.begin_frame()
         current_mouse_pos = pygame.mouse.get_pos()
         
         # --- Events ---
@@ -91,8 +188,22 @@ def main():
                 if event.key == pygame.K_r:
                     # Reset all grids
                     kernels.init_grid[blocks, threads](u_curr, v_curr, r_curr, g_curr, b_curr)
+                    if recorder: recorder.reset(frame_index)
+                    mip.invalidate()
                 elif event.key == pygame.K_s:
                     utils.save_snapshot(display_surf)
+                elif event.key == pygame.K_e:
+                    if exporter is not None and not exporter.done():
+                        print(f"[EXPORT] Busy ({exporter.progress * 100:.0f}%)")
+                    else:
+                        out_w, out_h = config.EXPORT_SIZE
+                        fields = {"v": v_curr.copy_to_host(), "r": r_curr.copy_to_host(),
+                                  "g": g_curr.copy_to_host(), "b": b_curr.copy_to_host()}
+                        path = os.path.join(config.EXPORT_DIR, f"still_{out_w}x{out_h}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png")
+                        exporter = StillExporter(fields, path, out_w, out_h, cam_zoom, cam_x, cam_y,
+                                                 ss=config.EXPORT_SUPERSAMPLE, strip=config.EXPORT_STRIP_ROWS,
+                                                 workers=config.EXPORT_WORKERS).start()
+                        print(f"[EXPORT] Rendering {out_w}x{out_h} (x{config.EXPORT_SUPERSAMPLE}^2) in the background...")
                 elif event.key == pygame.K_ESCAPE:
                     running = False
                 
@@ -110,6 +221,27 @@ def main():
                     brush_alpha = min(1.0, brush_alpha + 0.1)
                     print(f"Intensity: {brush_alpha:.1f}")
 
+                # PROFILER OVERLAY (P)
+                elif event.key == pygame.K_p:
+                    show_profile = not show_profile
+                    profile_surf = None
+                    if show_profile and not profiler.enabled:
+                        profiler.enabled = True # The per-phase syncs start now
+                        profiler.reset()
+                        profiler.begin_frame()
+                    elif not show_profile:
+                        profiler.enabled = config.PROFILE_ENABLED
+
+                # MIP RENDERER (M) / INTERNAL RESOLUTION (N)
+                elif event.key == pygame.K_m:
+                    use_mip = not use_mip
+                    print(f"Mip renderer: {'ON' if use_mip else 'OFF'}")
+                elif event.key == pygame.K_n:
+                    internal_scale = {1: 2, 2: 4, 4: 1}[internal_scale]
+                    mip.set_internal_scale(internal_scale)
+                    small_surf = None
+                    print(f"Internal resolution: 1/{internal_scale}")
+
         # --- Panning Logic ---
         if is_panning:
             dx = current_mouse_pos[0] - last_mouse_pos[0]
@@ -117,6 +249,8 @@ def main():
             cam_x -= dx / cam_zoom
             cam_y -= dy / cam_zoom
             last_mouse_pos = current_mouse_pos
+        if recorder: recorder.camera(frame_index, cam_zoom, cam_x, cam_y)
+        profiler.mark(PH_EVENTS)
 
         # --- Painting Logic ---
         if pygame.mouse.get_pressed()[0]:
@@ -136,6 +270,9 @@ def main():
                 world_x, world_y, eff_radius,
                 r_val, g_val, b_val, brush_alpha
             )
+            if recorder:
+                recorder.paint(frame_index, world_x, world_y, eff_radius, r_val, g_val, b_val, brush_alpha)
+        profiler.mark(PH_PAINT, sync=True)
 
         # --- Simulation Loop ---
         for _ in range(config.STEPS_PER_FRAME):
@@ -149,15 +286,49 @@ def main():
             r_curr, r_next = r_next, r_curr
             g_curr, g_next = g_next, g_curr
             b_curr, b_next = b_next, b_curr
+        profiler.mark(PH_SIMULATE, sync=True)
+
+        # --- Pattern Statistics ---
+        if analyzer is not None and frame_index % config.STATS_INTERVAL == 0:
+            stats = analyzer.analyze(u_curr, v_curr)
+            converged = detector.update(stats)
+            stats_log.write(frame_index, stats, converged=converged)
+            if converged and not pattern_converged:
+                print(f"[STATS] Pattern converged at frame {frame_index} "
+                      f"(coverage {stats['coverage']:.3f}, {stats['blobs']} blobs, wavelength {stats['wavelength']})")
+            pattern_converged = converged
+        if field_rec is not None and (frame_index + 1) % fields_every == 0:
+            field_rec.capture((frame_index + 1) * config.STEPS_PER_FRAME,
+                              {"u": u_curr, "v": v_curr, "r": r_curr, "g": g_curr, "b": b_curr})
+            m_copy.inc(field_bytes)
+        profiler.mark(PH_STATS)
 
         # --- Render ---
-        kernels.render_camera_view[blocks, threads](
-            v_curr, r_curr, g_curr, b_curr, gpu_image, cam_zoom, cam_x, cam_y
-        )
-        
-        gpu_image.copy_to_host(host_image)
-        frame_data = np.transpose(host_image, (1, 0, 2))
-        pygame.surfarray.blit_array(display_surf, frame_data)
+        if use_mip or internal_scale > 1:
+            # MipRenderer copies its (possibly smaller) image back itself; 'render' covers both
+            frame_image = mip.render(v_curr, r_curr, g_curr, b_curr, cam_zoom, cam_x, cam_y, frame_index)
+            profiler.mark(PH_RENDER)
+            profiler.mark(PH_COPY)
+        else:
+            kernels.render_camera_view[blocks, threads](
+                v_curr, r_curr, g_curr, b_curr, gpu_image, cam_zoom, cam_x, cam_y
+            )
+            profiler.mark(PH_RENDER, sync=True)
+            gpu_image.copy_to_host(host_image)
+            frame_image = host_image
+            profiler.mark(PH_COPY)
+
+        m_copy.inc(frame_image.nbytes)
+        frame_data = np.transpose(frame_image, (1, 0, 2))
+        if internal_scale == 1:
+            pygame.surfarray.blit_array(display_surf, frame_data)
+        else:
+            # Display-side upscale of the reduced internal image
+            if small_surf is None:
+                small_surf = pygame.Surface((frame_data.shape[0], frame_data.shape[1]))
+            pygame.surfarray.blit_array(small_surf, frame_data)
+            pygame.transform.scale(small_surf, (config.WIDTH, config.HEIGHT), display_surf)
+        profiler.mark(PH_BLIT)
         
         # --- UI Overlay ---
         # Create transparent surface for the UI
@@ -176,15 +347,91 @@ def main():
         
         # Blit UI
         display_surf.blit(ui_surf, (0, 0))
+
+        # Profiler overlay (re-rendered twice a second, not every frame)
+        if show_profile and profiler.enabled:
+            now = time.perf_counter()
+            if profile_surf is None or now - last_overlay >= 0.5:
+                lines = format_overlay_lines(profiler.percentiles())
+                line_h = profile_font.get_linesize()
+                profile_surf = pygame.Surface((300, line_h * len(lines) + 8), pygame.SRCALPHA)
+                profile_surf.fill((0, 0, 0, 170))
+                for i, line in enumerate(lines):
+                    profile_surf.blit(profile_font.render(line, True, (220, 220, 220)), (6, 4 + i * line_h))
+                last_overlay = now
+            display_surf.blit(profile_surf, (config.WIDTH - profile_surf.get_width() - 10, 10))
+        profiler.mark(PH_UI)
         
         screen.blit(display_surf, (0, 0))
+        if streamer and streamer.due():
+            streamer.publish(pygame.surfarray.pixels3d(screen).swapaxes(0, 1))
         pygame.display.flip()
         
-        pygame.display.set_caption(f"Gray-Scott Vivid | FPS: {clock.get_fps():.1f} | Zoom: {cam_zoom:.1f}x")
+        fps_now = clock.get_fps()
+        pygame.display.set_caption(f"Gray-Scott Vivid | FPS: {fps_now:.1f} | Zoom: {cam_zoom:.1f}x")
+        profiler.mark(PH_PRESENT)
         clock.tick()
+        profiler.mark(PH_TICK)
+        profiler.end_frame()
+        frame_index += 1
+
+        now = time.perf_counter()
+        m_frame_s.observe(now - last_frame_t)
+        last_frame_t = now
+        m_frames.inc()
+        m_steps.inc(config.STEPS_PER_FRAME)
+        m_fps.set(fps_now)
+        m_steps_s.set(fps_now * config.STEPS_PER_FRAME)
+        m_zoom.set(cam_zoom)
+
+        if exporter is not None and exporter.done():
+            if exporter.error is not None:
+                print(f"[EXPORT] Failed: {exporter.error}")
+            else:
+                rep = exporter.report
+                print(f"[EXPORT] {rep['path']} ({rep['file_mb']} MB) in {rep['seconds']}s, {rep['mpix_per_s']} MP/s")
+            exporter = None
+
+        # Metrics export
+        if profiler.enabled and time.perf_counter() - last_export >= config.PROFILE_INTERVAL:
+            export_profile(profiler, config.PROFILE_LOG, cam_zoom)
+            last_export = time.perf_counter()
 
+    if profiler.enabled:
+        export_profile(profiler, config.PROFILE_LOG, cam_zoom)
+    if recorder:
+        recorder.close(frame_index)
+    if stats_log:
+        stats_log.close()
+    if streamer:
+        streamer.close()
+    if exporter is not None:
+        print("[EXPORT] Finishing the running export...")
+        exporter.wait()
+    if metrics_server:
+        metrics_server.close()
+    if metrics_jsonl:
+        metrics_jsonl.close()
+    if field_rec is not None:
+        rep = field_rec.close()
+        print(f"[FSTORE] {rep['frames']} frames -> {rep['path']} ({rep['stored_mb']} MB, x{rep['ratio']}, "
+              f"capture {rep['capture_ms_per_frame']} ms/frame, stall {rep['stall_s']}s)")
     pygame.quit()
     sys.exit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Gray-Scott Vivid Edition")
+    parser.add_argument("--record", type=str, default=None,
+                        help="Record inputs to this file for headless replay (replay.py)")
+    parser.add_argument("--stream", type=int, default=0, metavar="PORT",
+                        help="Serve a live viewer on http://127.0.0.1:PORT/")
+    parser.add_argument("--warm-start", type=int, default=0, metavar="FACTOR",
+                        help="Grow the initial pattern on a FACTOR-times coarser grid first (warm_start.py)")
+    parser.add_argument("--fields", type=str, default=None, metavar="PATH",
+                        help="Record u/v time series to a chunked store (field_store.py)")
+    parser.add_argument("--metrics-port", type=int, default=config.METRICS_PORT, metavar="PORT",
+                        help="Prometheus endpoint on http://127.0.0.1:PORT/metrics (shared/telemetry.py)")
+    parser.add_argument("--metrics-jsonl", type=str, default=config.METRICS_JSONL, metavar="PATH",
+                        help="Append a metrics snapshot every METRICS_INTERVAL seconds")
+    args = parser.parse_args()
+    main(args.record, args.stream, args.warm_start, args.fields, args.metrics_port, args.metrics_jsonl)
\ No newline at end of file
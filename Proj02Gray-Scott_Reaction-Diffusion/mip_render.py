@@ -0,0 +1,293 @@
+# mip_render.py
+# Zoom-aware rendering: a mip pyramid of (v, r, g, b) and an optional reduced
+# internal resolution that the display upscales.
+#
+# render_camera_view takes one nearest-neighbour sample per screen pixel. Zoomed
+# out, one pixel covers many cells and the pattern aliases; the pyramid keeps
+# 2x box-filtered copies of the fields so each pixel samples the level whose
+# cell size matches its footprint. Zoomed in, many pixels show the same cell, so
+# rendering at 1/2 or 1/4 resolution and upscaling loses little and costs less.
+# Levels are rebuilt every `update_every` frames and only as deep as the current
+# zoom needs.
+#
+# Cost comparison (render + copy + display upscale, per zoom level):
+#   python mip_render.py [--backend cpu|cuda] [--width 1920 --height 1080]
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import numpy as np
+from numba import cuda, njit, prange
+import config
+
+MAX_LEVELS = 6 # Level 6 = 1/64 size, enough for zoom 0.1 at internal scale 4
+
+# -----------------------------
+# 1. CUDA KERNELS
+# -----------------------------
+@cuda.jit
+def build_level_from_fields(v, r_grid, g_grid, b_grid, dst):
+    """Level 1: 2x2 box filter of the live fields into packed (h/2, w/2, 4)."""
+    x, y = cuda.grid(2)
+    lh, lw = dst.shape[0], dst.shape[1]
+    h, w = v.shape
+    if x < lw and y < lh:
+        y0, x0 = 2 * y, 2 * x
+        y1, x1 = min(y0 + 1, h - 1), min(x0 + 1, w - 1)
+        dst[y, x, 0] = 0.25 * (v[y0, x0] + v[y0, x1] + v[y1, x0] + v[y1, x1])
+        dst[y, x, 1] = 0.25 * (r_grid[y0, x0] + r_grid[y0, x1] + r_grid[y1, x0] + r_grid[y1, x1])
+        dst[y, x, 2] = 0.25 * (g_grid[y0, x0] + g_grid[y0, x1] + g_grid[y1, x0] + g_grid[y1, x1])
+        dst[y, x, 3] = 0.25 * (b_grid[y0, x0] + b_grid[y0, x1] + b_grid[y1, x0] + b_grid[y1, x1])
+
+@cuda.jit
+def build_level(src, dst):
+    """Level k+1 from level k (both packed)."""
+    x, y = cuda.grid(2)
+    lh, lw = dst.shape[0], dst.shape[1]
+    h, w = src.shape[0], src.shape[1]
+    if x < lw and y < lh:
+        y0, x0 = 2 * y, 2 * x
+        y1, x1 = min(y0 + 1, h - 1), min(x0 + 1, w - 1)
+        for k in range(4):
+            dst[y, x, k] = 0.25 * (src[y0, x0, k] + src[y0, x1, k] + src[y1, x0, k] + src[y1, x1, k])
+
+@cuda.jit
+def render_level_view(level, scale, image_out, zoom, pan_x, pan_y):
+    """render_camera_view over a pyramid level; scale = level-0 cells per level cell."""
+    sx, sy = cuda.grid(2)
+    out_h, out_w = image_out.shape[0], image_out.shape[1]
+    lh, lw = level.shape[0], level.shape[1]
+    if sx < out_w and sy < out_h:
+        grid_x = int((pan_x + (sx - out_w / 2.0) / zoom) / scale)
+        grid_y = int((pan_y + (sy - out_h / 2.0) / zoom) / scale)
+        if 0 <= grid_x < lw and 0 <= grid_y < lh:
+            t = level[grid_y, grid_x, 0] * 4.0
+            t = min(1.0, max(0.0, t))
+            t = t ** (1.0 / config.THICKNESS_MODIFIER + 0.5)
+            image_out[sy, sx, 0] = int(min(1.0, level[grid_y, grid_x, 1]) * 255 * t)
+            image_out[sy, sx, 1] = int(min(1.0, level[grid_y, grid_x, 2]) * 255 * t)
+            image_out[sy, sx, 2] = int(min(1.0, level[grid_y, grid_x, 3]) * 255 * t)
+        else:
+            image_out[sy, sx, 0] = 0
+            image_out[sy, sx, 1] = 0
+            image_out[sy, sx, 2] = 0
+
+# -----------------------------
+# 2. CPU VERSIONS
+# -----------------------------
+@njit(parallel=True, cache=True)
+def build_level_from_fields_cpu(v, r_grid, g_grid, b_grid, dst):
+    lh, lw = dst.shape[0], dst.shape[1]
+    h, w = v.shape
+    for y in prange(lh):
+        y0 = 2 * y
+        y1 = min(y0 + 1, h - 1)
+        for x in range(lw):
+            x0 = 2 * x
+            x1 = min(x0 + 1, w - 1)
+            dst[y, x, 0] = 0.25 * (v[y0, x0] + v[y0, x1] + v[y1, x0] + v[y1, x1])
+            dst[y, x, 1] = 0.25 * (r_grid[y0, x0] + r_grid[y0, x1] + r_grid[y1, x0] + r_grid[y1, x1])
+            dst[y, x, 2] = 0.25 * (g_grid[y0, x0] + g_grid[y0, x1] + g_grid[y1, x0] + g_grid[y1, x1])
+            dst[y, x, 3] = 0.25 * (b_grid[y0, x0] + b_grid[y0, x1] + b_grid[y1, x0] + b_grid[y1, x1])
+
+@njit(parallel=True, cache=True)
+def build_level_cpu(src, dst):
+    lh, lw = dst.shape[0], dst.shape[1]
+    h, w = src.shape[0], src.shape[1]
+    for y in prange(lh):
+        y0 = 2 * y
+        y1 = min(y0 + 1, h - 1)
+        for x in range(lw):
+            x0 = 2 * x
+            x1 = min(x0 + 1, w - 1)
+            for k in range(4):
+                dst[y, x, k] = 0.25 * (src[y0, x0, k] + src[y0, x1, k] + src[y1, x0, k] + src[y1, x1, k])
+
+@njit(parallel=True, cache=True)
+def render_level_view_cpu(level, scale, image_out, zoom, pan_x, pan_y):
+    out_h, out_w = image_out.shape[0], image_out.shape[1]
+    lh, lw = level.shape[0], level.shape[1]
+    for sy in prange(out_h):
+        for sx in range(out_w):
+            grid_x = int((pan_x + (sx - out_w / 2.0) / zoom) / scale)
+            grid_y = int((pan_y + (sy - out_h / 2.0) / zoom) / scale)
+            if 0 <= grid_x < lw and 0 <= grid_y < lh:
+                t = level[grid_y, grid_x, 0] * 4.0
+                t = min(1.0, max(0.0, t))
+                t = t ** (1.0 / config.THICKNESS_MODIFIER + 0.5)
+                image_out[sy, sx, 0] = int(min(1.0, level[grid_y, grid_x, 1]) * 255 * t)
+                image_out[sy, sx, 1] = int(min(1.0, level[grid_y, grid_x, 2]) * 255 * t)
+                image_out[sy, sx, 2] = int(min(1.0, level[grid_y, grid_x, 3]) * 255 * t)
+            else:
+                image_out[sy, sx, 0] = 0
+                image_out[sy, sx, 1] = 0
+                image_out[sy, sx, 2] = 0
+
+# -----------------------------
+# 3. RENDERER
+# -----------------------------
+def choose_level(zoom, internal_scale, n_levels):
+    """Pyramid level whose cell size matches one internal pixel's footprint."""
+    footprint = internal_scale / zoom # level-0 cells per internal pixel
+    if footprint <= 1.0:
+        return 0
+    return min(n_levels, int(math.floor(math.log2(footprint))))
+
+class MipRenderer:
+    """
+    render(v, r, g, b, zoom, pan_x, pan_y, frame) -> host RGB image at internal resolution
+    (height // internal_scale, width // internal_scale, 3). The caller upscales it.
+    """
+    def __init__(self, width=config.WIDTH, height=config.HEIGHT, backend="cuda",
+                 levels=MAX_LEVELS, update_every=4, internal_scale=1, tpb=config.TPB):
+        self.width, self.height = width, height
+        self.backend = backend
+        self.update_every = update_every
+        self.tpb = tpb
+        self.levels = []
+        lw, lh = width, height
+        for _ in range(levels):
+            lw, lh = max(1, (lw + 1) // 2), max(1, (lh + 1) // 2)
+            if backend == "cuda":
+                self.levels.append(cuda.device_array((lh, lw, 4), dtype=np.float32))
+            else:
+                self.levels.append(np.zeros((lh, lw, 4), dtype=np.float32))
+        self._built_frame = [-1] * levels
+        self.set_internal_scale(internal_scale)
+
+    def set_internal_scale(self, internal_scale):
+        """Output resolution = display / internal_scale."""
+        self.internal_scale = internal_scale
+        ow, oh = self.width // internal_scale, self.height // internal_scale
+        self.host_image = np.zeros((oh, ow, 3), dtype=np.uint8)
+        if self.backend == "cuda":
+            self.gpu_image = cuda.device_array((oh, ow, 3), dtype=np.uint8)
+
+    def _blocks(self, w, h):
+        return ((w + self.tpb - 1) // self.tpb, (h + self.tpb - 1) // self.tpb)
+
+    def _ensure_levels(self, v, r_grid, g_grid, b_grid, level, frame):
+        """Rebuilds levels 1..level when older than update_every frames."""
+        threads = (self.tpb, self.tpb)
+        for k in range(level):
+            if self._built_frame[k] >= 0 and frame - self._built_frame[k] < self.update_every:
+                continue
+            dst = self.levels[k]
+            if self.backend == "cuda":
+                blocks = self._blocks(dst.shape[1], dst.shape[0])
+                if k == 0:
+                    build_level_from_fields[blocks, threads](v, r_grid, g_grid, b_grid, dst)
+                else:
+                    build_level[blocks, threads](self.levels[k - 1], dst)
+            else:
+                if k == 0:
+                    build_level_from_fields_cpu(v, r_grid, g_grid, b_grid, dst)
+                else:
+                    build_level_cpu(self.levels[k - 1], dst)
+            self._built_frame[k] = frame
+            # Everything above this level derives from it
+            for j in range(k + 1, len(self._built_frame)):
+                self._built_frame[j] = -1
+
+    def invalidate(self):
+        """Forces a rebuild on the next render (e.g. after a reset)."""
+        self._built_frame = [-1] * len(self.levels)
+
+    def render(self, v, r_grid, g_grid, b_grid, zoom, pan_x, pan_y, frame):
+        level = choose_level(zoom, self.internal_scale, len(self.levels))
+        self.last_level = level
+        eff_zoom = zoom / self.internal_scale # Internal pixels are internal_scale display pixels wide
+        out = self.gpu_image if self.backend == "cuda" else self.host_image
+        oh, ow = out.shape[0], out.shape[1]
+
+        if level > 0:
+            self._ensure_levels(v, r_grid, g_grid, b_grid, level, frame)
+        if self.backend == "cuda":
+            import kernelsV3 as kernels
+            threads = (self.tpb, self.tpb)
+            blocks = self._blocks(ow, oh)
+            if level == 0:
+                kernels.render_camera_view[blocks, threads](v, r_grid, g_grid, b_grid, out, eff_zoom, pan_x, pan_y)
+            else:
+                render_level_view[blocks, threads](self.levels[level - 1], float(2 ** level), out,
+                                                   eff_zoom, pan_x, pan_y)
+            out.copy_to_host(self.host_image)
+        else:
+            import kernels_cpu as kernels
+            if level == 0:
+                kernels.render_camera_view(v, r_grid, g_grid, b_grid, out, eff_zoom, pan_x, pan_y)
+            else:
+                render_level_view_cpu(self.levels[level - 1], float(2 ** level), out, eff_zoom, pan_x, pan_y)
+        return self.host_image
+
+# -----------------------------
+# 4. COST COMPARISON
+# -----------------------------
+def benchmark(backend="auto", width=config.WIDTH, height=config.HEIGHT,
+              zooms=(0.1, 0.25, 0.5, 1.0, 4.0, 20.0), scales=(1, 2, 4), frames=30, warm_frames=300):
+    """
+    ms/frame for render_camera_view (before) vs the mip renderer at each internal
+    scale (after), including the device copy and the display-side upscale.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    import pygame
+    from backends import create_backend
+
+    sim = create_backend(backend, width, height)
+    sim.init_grid()
+    sim.step(warm_frames) # Grow some pattern to render
+    c = sim.curr
+    display = pygame.Surface((width, height))
+
+    def timed(fn):
+        fn(0)
+        sim.synchronize()
+        t0 = time.perf_counter()
+        for f in range(1, frames + 1):
+            fn(f)
+        sim.synchronize()
+        return 1000.0 * (time.perf_counter() - t0) / frames
+
+    results = []
+    for zoom in zooms:
+        pan_x, pan_y = width / 2.0, height / 2.0
+        row = {"zoom": zoom}
+
+        def baseline(f):
+            img = sim.render(zoom, pan_x, pan_y)
+            pygame.surfarray.blit_array(display, np.transpose(img, (1, 0, 2)))
+        row["nearest_ms"] = round(timed(baseline), 3)
+
+        for s in scales:
+            mip = MipRenderer(width, height, sim.name, internal_scale=s)
+            small = pygame.Surface((width // s, height // s))
+
+            def mip_frame(f):
+                img = mip.render(c["v"], c["r"], c["g"], c["b"], zoom, pan_x, pan_y, f)
+                if s == 1:
+                    pygame.surfarray.blit_array(display, np.transpose(img, (1, 0, 2)))
+                else:
+                    pygame.surfarray.blit_array(small, np.transpose(img, (1, 0, 2)))
+                    pygame.transform.scale(small, (width, height), display)
+            row[f"mip_x{s}_ms"] = round(timed(mip_frame), 3)
+            row[f"mip_x{s}_level"] = mip.last_level
+        results.append(row)
+        print(f"[MIP] zoom {zoom:>5}: nearest {row['nearest_ms']:7.3f} ms | " +
+              " | ".join(f"1/{s}: {row[f'mip_x{s}_ms']:7.3f} ms (L{row[f'mip_x{s}_level']})" for s in scales))
+    return results
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Render cost: nearest vs mip pyramid + reduced internal resolution.")
+    p.add_argument("--backend", choices=["auto", "cuda", "cpu"], default="auto")
+    p.add_argument("--width", type=int, default=config.WIDTH)
+    p.add_argument("--height", type=int, default=config.HEIGHT)
+    p.add_argument("--frames", type=int, default=30)
+    p.add_argument("--json", type=str, default="")
+    args = p.parse_args(sys.argv[1:])
+    res = benchmark(args.backend, args.width, args.height, frames=args.frames)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(res, f, indent=4)
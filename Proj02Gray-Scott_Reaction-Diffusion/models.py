@@ -0,0 +1,368 @@
+# models.py
+# Registry of reaction-diffusion models, each compiled into its own fused stencil kernel.
+# A model is declared as data: species, diffusion coefficients, constants and a
+# reaction expression per species. From that, generate_source() writes one
+# straight-line kernel with the constants folded in as literals. It is compiled
+# once per model with cuda.jit, and njit(parallel=True) for the CPU.
+# The hot loop never looks up the model, loops over species or evaluates an
+# expression at run time; adding a model only adds another kernel.
+#
+# Usage:
+#   python models.py --list
+#   python models.py --source brusselator           # print the generated kernel
+#   python models.py --bench [--models gray_scott,brusselator] [--device cpu|cuda]
+#   python models.py --check                        # generated Gray-Scott vs kernels_cpu
+import sys
+import json
+import math
+import time
+import argparse
+import numpy as np
+from numba import cuda, njit, prange
+import config
+
+# -----------------------------
+# 1. MODEL DEFINITIONS
+# -----------------------------
+class Model:
+    """
+    species:   names, in kernel argument order
+    diffusion: {species: D} in cells^2 per unit time
+    params:    {name: value}, folded into the kernel as literals
+    reactions: {species: expression over species + params}; math.* is available
+    init:      fn(rng, height, width) -> {species: float32 array}
+    display:   (species, lo, hi) used by render()
+    """
+    def __init__(self, name, species, diffusion, params, reactions, init, dt, display, paint_value=1.0):
+        self.name = name
+        self.species = tuple(species)
+        self.diffusion = dict(diffusion)
+        self.params = dict(params)
+        self.reactions = dict(reactions)
+        self.init = init
+        self.dt = dt
+        self.display = display
+        self.paint_value = paint_value
+        self._validate()
+
+    def _validate(self):
+        names = set(self.species) | set(self.params)
+        if any(n.startswith("_") or n == "math" for n in names):
+            raise ValueError(f"{self.name}: species/param names may not start with '_' or be 'math'")
+        if set(self.reactions) != set(self.species) or set(self.diffusion) != set(self.species):
+            raise ValueError(f"{self.name}: every species needs a reaction and a diffusion coefficient")
+        # Explicit 5-point stencil: D * dt <= 0.25 in grid units
+        worst = max(self.diffusion.values()) * self.dt
+        if worst > 0.25:
+            raise ValueError(f"{self.name}: max(D) * dt = {worst:.3f} exceeds the 0.25 stability limit")
+
+    @property
+    def bytes_per_cell(self):
+        """Each species read + written once per step (float32)."""
+        return len(self.species) * 4 * 2
+
+def _seed_square(rng, height, width, size=20):
+    """Center window mask, as in kernelsV3.init_grid."""
+    mask = np.zeros((height, width), dtype=bool)
+    cy, cx = height // 2, width // 2
+    mask[max(0, cy - size):cy + size, max(0, cx - size):cx + size] = True
+    return mask
+
+def _init_gray_scott(rng, height, width):
+    u = np.ones((height, width), dtype=np.float32)
+    v = np.zeros((height, width), dtype=np.float32)
+    mask = _seed_square(rng, height, width)
+    v[mask] = np.where(rng.random(mask.sum()) > 0.5, 0.8, 0.2)
+    return {"u": u, "v": v}
+
+def _init_noise(means, amp):
+    def init(rng, height, width):
+        return {s: (m + amp * rng.standard_normal((height, width))).astype(np.float32) for s, m in means.items()}
+    return init
+
+MODELS = {}
+
+def register(model):
+    MODELS[model.name] = model
+    return model
+
+register(Model(
+    "gray_scott", ("u", "v"),
+    {"u": config.Du, "v": config.Dv},
+    {"FEED": config.FEED, "KILL": config.KILL},
+    {"u": "-u * v * v + FEED * (1.0 - u)",
+     "v": "u * v * v - (FEED + KILL) * v"},
+    _init_gray_scott, config.dt, ("v", 0.0, 0.25), paint_value=0.5))
+
+# Excitable medium: spirals and labyrinths
+register(Model(
+    "fitzhugh_nagumo", ("u", "v"),
+    {"u": 1.0, "v": 10.0},
+    {"EPS": 0.05, "A0": -0.1, "A1": 2.0},
+    {"u": "u - u * u * u - v",
+     "v": "EPS * (u - A1 * v - A0)"},
+    _init_noise({"u": 0.0, "v": 0.0}, 0.05), 0.02, ("u", -1.0, 1.0)))
+
+# Turing spots around the steady state (A, B / A)
+register(Model(
+    "brusselator", ("u", "v"),
+    {"u": 2.0, "v": 16.0},
+    {"A": 4.5, "B": 6.75},
+    {"u": "A - (B + 1.0) * u + u * u * v",
+     "v": "B * u - u * u * v"},
+    _init_noise({"u": 4.5, "v": 1.5}, 0.1), 0.01, ("u", 2.0, 7.0), paint_value=7.0))
+
+# Activator (a) / inhibitor (h) with saturation
+register(Model(
+    "gierer_meinhardt", ("a", "h"),
+    {"a": 0.05, "h": 1.0},
+    {"RHO": 1.0, "MU_A": 1.0, "MU_H": 1.2, "RHO_A": 0.01, "KAPPA": 0.1},
+    {"a": "RHO * a * a / (h * (1.0 + KAPPA * a * a)) - MU_A * a + RHO_A",
+     "h": "RHO * a * a - MU_H * h"},
+    _init_noise({"a": 1.0, "h": 1.0}, 0.01), 0.1, ("a", 0.0, 3.0), paint_value=3.0))
+
+# N species: May-Leonard cyclic competition (rock-paper-scissors waves)
+register(Model(
+    "may_leonard3", ("a", "b", "c"),
+    {"a": 0.2, "b": 0.2, "c": 0.2},
+    {"ALPHA": 0.8, "BETA": 1.4},
+    {"a": "a * (1.0 - a - ALPHA * b - BETA * c)",
+     "b": "b * (1.0 - b - ALPHA * c - BETA * a)",
+     "c": "c * (1.0 - c - ALPHA * a - BETA * b)"},
+    _init_noise({"a": 0.33, "b": 0.33, "c": 0.33}, 0.02), 0.5, ("a", 0.0, 1.0)))
+
+# -----------------------------
+# 2. KERNEL GENERATION
+# -----------------------------
+def generate_source(model, target="cuda"):
+    """Python source of the fused update kernel: one stencil pass, all species, constants inlined."""
+    sp = model.species
+    args = ", ".join([f"{s}_in" for s in sp] + [f"{s}_out" for s in sp])
+    first = f"{sp[0]}_in"
+    lines = [f"def _step_{model.name}({args}):"]
+    if target == "cuda":
+        lines += [f"    _c, _r = cuda.grid(2)",
+                  f"    _h, _w = {first}.shape",
+                  f"    if _c < _w and _r < _h:"]
+        ind = "        "
+    else:
+        lines += [f"    _h, _w = {first}.shape",
+                  f"    for _r in prange(_h):",
+                  f"        for _c in range(_w):"]
+        ind = "            "
+    lines += [f"{ind}_left, _right = (_c - 1) % _w, (_c + 1) % _w",
+              f"{ind}_up, _down = (_r - 1) % _h, (_r + 1) % _h"]
+    for name, value in model.params.items():
+        lines.append(f"{ind}{name} = {float(value)!r}")
+    for s in sp:
+        lines.append(f"{ind}{s} = {s}_in[_r, _c]")
+    for s in sp:
+        lines.append(f"{ind}_lap_{s} = ({s}_in[_r, _left] + {s}_in[_r, _right] + "
+                     f"{s}_in[_up, _c] + {s}_in[_down, _c] - 4.0 * {s})")
+    for s in sp:
+        lines.append(f"{ind}_d_{s} = {float(model.diffusion[s])!r} * _lap_{s} + ({model.reactions[s]})")
+    for s in sp:
+        lines.append(f"{ind}{s}_out[_r, _c] = {s} + _d_{s} * {float(model.dt)!r}")
+    return "\n".join(lines) + "\n"
+
+_COMPILED = {}
+
+def compile_model(model, target="cuda"):
+    """Generated kernel for (model, target), compiled once and cached."""
+    key = (model.name, target)
+    if key not in _COMPILED:
+        src = generate_source(model, target)
+        namespace = {"cuda": cuda, "prange": prange, "math": math}
+        exec(compile(src, f"<models:{model.name}:{target}>", "exec"), namespace)
+        fn = namespace[f"_step_{model.name}"]
+        # exec'd source has no file, so the on-disk cache cannot be used
+        _COMPILED[key] = cuda.jit(fn) if target == "cuda" else njit(parallel=True)(fn)
+    return _COMPILED[key]
+
+# -----------------------------
+# 3. SHARED RENDER / PAINT
+# -----------------------------
+TINT_R, TINT_G, TINT_B = (float(x) for x in config.COLOR_PALETTE[0])
+
+@cuda.jit
+def render_field(field, lo, hi, image_out, zoom, pan_x, pan_y):
+    """Display species mapped to [0, 1] and tinted with COLOR_PALETTE[0]."""
+    sx, sy = cuda.grid(2)
+    out_h, out_w = image_out.shape[0], image_out.shape[1]
+    h, w = field.shape
+    if sx < out_w and sy < out_h:
+        grid_x = int(pan_x + (sx - out_w / 2.0) / zoom)
+        grid_y = int(pan_y + (sy - out_h / 2.0) / zoom)
+        t = 0.0
+        if 0 <= grid_x < w and 0 <= grid_y < h:
+            t = min(1.0, max(0.0, (field[grid_y, grid_x] - lo) / (hi - lo)))
+        image_out[sy, sx, 0] = int(TINT_R * 255 * t)
+        image_out[sy, sx, 1] = int(TINT_G * 255 * t)
+        image_out[sy, sx, 2] = int(TINT_B * 255 * t)
+
+@njit(parallel=True, cache=True)
+def render_field_cpu(field, lo, hi, image_out, zoom, pan_x, pan_y):
+    out_h, out_w = image_out.shape[0], image_out.shape[1]
+    h, w = field.shape
+    for sy in prange(out_h):
+        for sx in range(out_w):
+            grid_x = int(pan_x + (sx - out_w / 2.0) / zoom)
+            grid_y = int(pan_y + (sy - out_h / 2.0) / zoom)
+            t = 0.0
+            if 0 <= grid_x < w and 0 <= grid_y < h:
+                t = min(1.0, max(0.0, (field[grid_y, grid_x] - lo) / (hi - lo)))
+            image_out[sy, sx, 0] = int(TINT_R * 255 * t)
+            image_out[sy, sx, 1] = int(TINT_G * 255 * t)
+            image_out[sy, sx, 2] = int(TINT_B * 255 * t)
+
+@cuda.jit
+def paint_field(field, x, y, radius, value):
+    c, r = cuda.grid(2)
+    h, w = field.shape
+    if r < h and c < w:
+        if (c - x)**2 + (r - y)**2 < radius**2:
+            field[r, c] = value
+
+@njit(cache=True)
+def paint_field_cpu(field, x, y, radius, value):
+    h, w = field.shape
+    for r in range(max(0, int(y - radius) - 1), min(h, int(y + radius) + 2)):
+        for c in range(max(0, int(x - radius) - 1), min(w, int(x + radius) + 2)):
+            if (c - x)**2 + (r - y)**2 < radius**2:
+                field[r, c] = value
+
+# -----------------------------
+# 4. BACKEND
+# -----------------------------
+class ModelBackend:
+    """backends.py interface for any registered model. paint() ignores color and sets the display species."""
+    def __init__(self, model, width=config.WIDTH, height=config.HEIGHT, tpb=config.TPB, device="cuda", seed=0):
+        self.model = MODELS[model] if isinstance(model, str) else model
+        self.device = device
+        self.name = f"{device}:{self.model.name}"
+        self.width, self.height = width, height
+        self.seed = seed
+        self.kernel = compile_model(self.model, device)
+        sp = self.model.species
+        if device == "cuda":
+            self.curr = {s: cuda.device_array((height, width), dtype=np.float32) for s in sp}
+            self.next = {s: cuda.device_array((height, width), dtype=np.float32) for s in sp}
+            self.gpu_image = cuda.device_array((height, width, 3), dtype=np.uint8)
+            self.threads = (tpb, tpb)
+            self.blocks = (int(np.ceil(width / tpb)), int(np.ceil(height / tpb)))
+        else:
+            self.curr = {s: np.zeros((height, width), dtype=np.float32) for s in sp}
+            self.next = {s: np.zeros((height, width), dtype=np.float32) for s in sp}
+        self.host_image = np.zeros((height, width, 3), dtype=np.uint8)
+
+    def init_grid(self):
+        state = self.model.init(np.random.default_rng(self.seed), self.height, self.width)
+        for s in self.model.species:
+            if self.device == "cuda":
+                self.curr[s].copy_to_device(state[s])
+            else:
+                self.curr[s][:] = state[s]
+
+    def step(self, n=config.STEPS_PER_FRAME):
+        sp = self.model.species
+        for _ in range(n):
+            args = [self.curr[s] for s in sp] + [self.next[s] for s in sp]
+            if self.device == "cuda":
+                self.kernel[self.blocks, self.threads](*args)
+            else:
+                self.kernel(*args)
+            self.curr, self.next = self.next, self.curr
+
+    def paint(self, x, y, radius, r_val, g_val, b_val, intensity):
+        field = self.curr[self.model.display[0]]
+        value = self.model.paint_value * intensity
+        if self.device == "cuda":
+            paint_field[self.blocks, self.threads](field, x, y, radius, value)
+        else:
+            paint_field_cpu(field, x, y, radius, value)
+
+    def render(self, zoom, pan_x, pan_y):
+        name, lo, hi = self.model.display
+        if self.device == "cuda":
+            render_field[self.blocks, self.threads](self.curr[name], lo, hi, self.gpu_image, zoom, pan_x, pan_y)
+            self.gpu_image.copy_to_host(self.host_image)
+        else:
+            render_field_cpu(self.curr[name], lo, hi, self.host_image, zoom, pan_x, pan_y)
+        return self.host_image
+
+    def synchronize(self):
+        if self.device == "cuda":
+            cuda.synchronize()
+
+# -----------------------------
+# 5. BENCHMARK & CHECK
+# -----------------------------
+def bench_models(names, device, resolutions, steps=30, repeats=10):
+    """update throughput per model / resolution (same stats as benchmark.py)."""
+    from benchmark import _time, _summary
+    cases = []
+    for name in names:
+        model = MODELS[name]
+        for width, height in resolutions:
+            sim = ModelBackend(model, width, height, device=device)
+            sim.init_grid()
+            samples = _time(lambda: sim.step(steps), sim, repeats) # First call also compiles
+            case = {"key": f"{device}/{width}x{height}/{name}/steps{steps}", "model": name,
+                    "species": len(model.species), "resolution": f"{width}x{height}",
+                    "steps": steps, "bytes_per_cell": model.bytes_per_cell}
+            case.update(_summary(samples, width * height * steps, model.bytes_per_cell))
+            cases.append(case)
+            print(f"[MODELS] {case['key']:<44} {case['median_ms']:9.3f} ms | "
+                  f"{case['cell_updates_per_sec'] / 1e9:7.3f} G cells/s | {case['bandwidth_gb_s']:7.2f} GB/s")
+    return cases
+
+def check_gray_scott(width=256, height=256, steps=200):
+    """Generated gray_scott vs the hand-written kernels_cpu.update_step (U, V only)."""
+    import kernels_cpu
+    sim = ModelBackend("gray_scott", width, height, device="cpu")
+    sim.init_grid()
+    ref = {f: np.zeros((height, width), dtype=np.float32) for f in ("u", "v", "r", "g", "b")}
+    ref["u"][:] = sim.curr["u"]
+    ref["v"][:] = sim.curr["v"]
+    nxt = {f: np.zeros_like(a) for f, a in ref.items()}
+    for _ in range(steps):
+        kernels_cpu.update_step(ref["u"], ref["v"], nxt["u"], nxt["v"],
+                                ref["r"], ref["g"], ref["b"], nxt["r"], nxt["g"], nxt["b"])
+        ref, nxt = nxt, ref
+    sim.step(steps)
+    diff = {s: float(np.max(np.abs(sim.curr[s] - ref[s]))) for s in ("u", "v")}
+    # Operation order differs slightly from the hand-written kernel, so expect float32 rounding, not bit identity
+    ok = all(d < 1e-4 for d in diff.values())
+    print(f"[MODELS] gray_scott vs kernels_cpu after {steps} steps: max |diff| {diff} -> {'OK' if ok else 'MISMATCH'}")
+    return ok
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Reaction-diffusion model registry with generated kernels.")
+    p.add_argument("--list", action="store_true")
+    p.add_argument("--source", type=str, default="", help="Print the generated kernel for a model")
+    p.add_argument("--target", choices=["cuda", "cpu"], default="cuda")
+    p.add_argument("--bench", action="store_true")
+    p.add_argument("--models", type=str, default=",".join(MODELS))
+    p.add_argument("--device", choices=["cuda", "cpu"], default="cuda" if cuda.is_available() else "cpu")
+    p.add_argument("--resolutions", type=str, default="1280x720,1920x1080")
+    p.add_argument("--steps", type=int, default=30)
+    p.add_argument("--repeats", type=int, default=10)
+    p.add_argument("--out", type=str, default="")
+    p.add_argument("--check", action="store_true")
+    args = p.parse_args(sys.argv[1:])
+
+    if args.list:
+        for m in MODELS.values():
+            print(f"[MODELS] {m.name:<18} species={','.join(m.species):<8} dt={m.dt:<5} {m.params}")
+    if args.source:
+        print(generate_source(MODELS[args.source], args.target))
+    if args.check:
+        sys.exit(0 if check_gray_scott() else 1)
+    if args.bench:
+        res = tuple(tuple(int(v) for v in r.lower().split("x")) for r in args.resolutions.split(","))
+        cases = bench_models(args.models.split(","), args.device, res, args.steps, args.repeats)
+        if args.out:
+            with open(args.out, 'w') as f:
+                json.dump({"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "device": args.device,
+                           "cases": cases}, f, indent=4)
+            print(f"[MODELS] Results saved to {args.out}")
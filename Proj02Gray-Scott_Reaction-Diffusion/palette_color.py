@@ -0,0 +1,492 @@
+# palette_color.py
+# Compact color model: a palette index + blend amount per cell instead of three
+# diffusing float32 color grids.
+#
+# kernelsV3 moves 40 bytes per cell per step, and 24 of them are R, G, B in and out,
+# just to tint V. Every color comes from config.COLOR_PALETTE, so here each cell
+# stores
+#   idx  uint8    dominant palette entry
+#   amt  uint16   blend toward that color (0..65535 -> 0..1, black at 0)
+# on a half-resolution color grid (one color cell per 2x2 sim cells). Color is
+# diffused only every COLOR_DIFFUSE_EVERY steps. The coarser grid makes the larger
+# time step stable (diffusion number 0.5 * dt * N / 4 = 0.1 at N = 4). N is
+# config.COLOR_DIFFUSE_EVERY.
+# Where colors meet, a cell takes the index of its strongest neighbour instead
+# of mixing hues.
+#
+# Per step and sim cell: u, v in + out = 16 bytes, plus 6 / 4 / N bytes of color.
+#
+# Runs as backends 'cuda-palette' / 'cpu-palette' (benchmark.py, replay.py).
+# Comparison against the RGB model (time/step, modeled bytes, render difference):
+#   python palette_color.py [--backend cpu|cuda] [--width 1920 --height 1080]
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from numba import cuda, njit, prange
+import config
+
+COLOR_DIFFUSE_EVERY = config.COLOR_DIFFUSE_EVERY
+AMT_SCALE = 65535.0
+DIFF_RATE = 0.5 # Same color diffusion rate as kernelsV3
+PALETTE = np.array(config.COLOR_PALETTE, dtype=np.float32)
+
+def coarse_rate(every):
+    """Color diffusion number per coarse update: rate * dt * every / (2 * 2)."""
+    return DIFF_RATE * config.dt * every / 4.0
+
+def palette_index(r_val, g_val, b_val):
+    """Nearest config.COLOR_PALETTE entry to an RGB brush color."""
+    d = np.sum((PALETTE - np.array([r_val, g_val, b_val], dtype=np.float32)) ** 2, axis=1)
+    return int(np.argmin(d))
+
+# -----------------------------
+# 1. CUDA KERNELS
+# -----------------------------
+@cuda.jit
+def init_uv(u, v):
+    """kernelsV3.init_grid without the color grids."""
+    x, y = cuda.grid(2)
+    h, w = u.shape
+    if x < w and y < h:
+        u[y, x] = 1.0
+        v[y, x] = 0.0
+        cx, cy = w // 2, h // 2
+        if (x > cx - 20 and x < cx + 20 and
+            y > cy - 20 and y < cy + 20):
+            noise = ((x * y * 12.9898) % 1.0)
+            v[y, x] = 0.8 if noise > 0.5 else 0.2
+
+@cuda.jit
+def init_color_from_seed(v, idx, amt):
+    """Seeded cells (v = 0.8) start cyan (palette 0); amt = seeded share of the 2x2 block."""
+    x, y = cuda.grid(2)
+    ch, cw = idx.shape
+    h, w = v.shape
+    if x < cw and y < ch:
+        n = 0
+        for dy in range(2):
+            for dx in range(2):
+                fy, fx = 2 * y + dy, 2 * x + dx
+                if fy < h and fx < w and v[fy, fx] > 0.5:
+                    n += 1
+        idx[y, x] = 0
+        amt[y, x] = int(AMT_SCALE * n / 4.0 + 0.5)
+
+@cuda.jit
+def update_uv(u_in, v_in, u_out, v_out):
+    """Physics half of kernelsV3.update_step."""
+    c, r = cuda.grid(2)
+    h, w = u_in.shape
+    if c < w and r < h:
+        curr_u = u_in[r, c]
+        curr_v = v_in[r, c]
+        left, right = (c - 1) % w, (c + 1) % w
+        up, down    = (r - 1) % h, (r + 1) % h
+        lap_u = (u_in[r, left] + u_in[r, right] + u_in[up, c] + u_in[down, c] - 4.0 * curr_u)
+        lap_v = (v_in[r, left] + v_in[r, right] + v_in[up, c] + v_in[down, c] - 4.0 * curr_v)
+        uvv = curr_u * curr_v * curr_v
+        du = (config.Du * lap_u - uvv + config.FEED * (1.0 - curr_u))
+        dv = (config.Dv * lap_v + uvv - (config.FEED + config.KILL) * curr_v)
+        u_out[r, c] = curr_u + du * config.dt
+        v_out[r, c] = curr_v + dv * config.dt
+
+@cuda.jit
+def diffuse_color(idx_in, amt_in, idx_out, amt_out, rate):
+    """Blend amount diffuses; the index follows the strongest of self + 4 neighbours."""
+    c, r = cuda.grid(2)
+    h, w = amt_in.shape
+    if c < w and r < h:
+        left, right = (c - 1) % w, (c + 1) % w
+        up, down    = (r - 1) % h, (r + 1) % h
+        a = amt_in[r, c] / AMT_SCALE
+        a_l = amt_in[r, left] / AMT_SCALE
+        a_r = amt_in[r, right] / AMT_SCALE
+        a_u = amt_in[up, c] / AMT_SCALE
+        a_d = amt_in[down, c] / AMT_SCALE
+        new_a = a + rate * (a_l + a_r + a_u + a_d - 4.0 * a)
+        new_a = min(1.0, max(0.0, new_a))
+        amt_out[r, c] = int(new_a * AMT_SCALE + 0.5)
+
+        best_i = idx_in[r, c]
+        best_a = a
+        if a_l > best_a: best_a = a_l; best_i = idx_in[r, left]
+        if a_r > best_a: best_a = a_r; best_i = idx_in[r, right]
+        if a_u > best_a: best_a = a_u; best_i = idx_in[up, c]
+        if a_d > best_a: best_a = a_d; best_i = idx_in[down, c]
+        idx_out[r, c] = best_i
+
+@cuda.jit
+def paint_uv(v_grid, x, y, radius, intensity):
+    """V half of kernelsV3.paint."""
+    c, r = cuda.grid(2)
+    h, w = v_grid.shape
+    if r < h and c < w:
+        if (c - x)**2 + (r - y)**2 < radius**2:
+            v_grid[r, c] = max(v_grid[r, c], 0.5 * intensity)
+
+@cuda.jit
+def paint_color(idx, amt, x, y, radius, color_idx, intensity):
+    """Color half of kernelsV3.paint on the coarse grid (x, y, radius in coarse cells)."""
+    c, r = cuda.grid(2)
+    h, w = amt.shape
+    if r < h and c < w:
+        if (c + 0.5 - x)**2 + (r + 0.5 - y)**2 < radius**2:
+            a = amt[r, c] / AMT_SCALE
+            if idx[r, c] == color_idx:
+                a = a + (1.0 - a) * intensity
+            else:
+                # The lerp toward the brush color: keep whichever part now dominates
+                remaining = a * (1.0 - intensity)
+                if intensity >= remaining:
+                    idx[r, c] = color_idx
+                a = remaining + intensity
+            amt[r, c] = int(min(1.0, a) * AMT_SCALE + 0.5)
+
+@cuda.jit
+def render_palette_view(v_grid, idx, amt, palette, image_out, zoom, pan_x, pan_y):
+    """render_camera_view with the color looked up from the coarse palette grid."""
+    sx, sy = cuda.grid(2)
+    out_h, out_w = image_out.shape[0], image_out.shape[1]
+    h, w = v_grid.shape
+    ch, cw = idx.shape
+    if sx < out_w and sy < out_h:
+        grid_x = int(pan_x + (sx - out_w / 2.0) / zoom)
+        grid_y = int(pan_y + (sy - out_h / 2.0) / zoom)
+        if 0 <= grid_x < w and 0 <= grid_y < h:
+            t = v_grid[grid_y, grid_x] * 4.0
+            t = min(1.0, max(0.0, t))
+            t = t ** (1.0 / config.THICKNESS_MODIFIER + 0.5)
+            cy, cx = min(grid_y // 2, ch - 1), min(grid_x // 2, cw - 1)
+            k = idx[cy, cx]
+            a = amt[cy, cx] / AMT_SCALE
+            image_out[sy, sx, 0] = int(palette[k, 0] * a * 255 * t)
+            image_out[sy, sx, 1] = int(palette[k, 1] * a * 255 * t)
+            image_out[sy, sx, 2] = int(palette[k, 2] * a * 255 * t)
+        else:
+            image_out[sy, sx, 0] = 0
+            image_out[sy, sx, 1] = 0
+            image_out[sy, sx, 2] = 0
+
+# -----------------------------
+# 2. CPU VERSIONS
+# -----------------------------
+@njit(parallel=True, cache=True)
+def init_uv_cpu(u, v):
+    h, w = u.shape
+    cx, cy = w // 2, h // 2
+    for y in prange(h):
+        for x in range(w):
+            u[y, x] = 1.0
+            v[y, x] = 0.0
+            if (x > cx - 20 and x < cx + 20 and
+                y > cy - 20 and y < cy + 20):
+                noise = ((x * y * 12.9898) % 1.0)
+                v[y, x] = 0.8 if noise > 0.5 else 0.2
+
+@njit(parallel=True, cache=True)
+def init_color_from_seed_cpu(v, idx, amt):
+    ch, cw = idx.shape
+    h, w = v.shape
+    for y in prange(ch):
+        for x in range(cw):
+            n = 0
+            for dy in range(2):
+                for dx in range(2):
+                    fy, fx = 2 * y + dy, 2 * x + dx
+                    if fy < h and fx < w and v[fy, fx] > 0.5:
+                        n += 1
+            idx[y, x] = 0
+            amt[y, x] = int(AMT_SCALE * n / 4.0 + 0.5)
+
+@njit(parallel=True, cache=True)
+def update_uv_cpu(u_in, v_in, u_out, v_out):
+    h, w = u_in.shape
+    for r in prange(h):
+        up, down = (r - 1) % h, (r + 1) % h
+        for c in range(w):
+            left, right = (c - 1) % w, (c + 1) % w
+            curr_u = u_in[r, c]
+            curr_v = v_in[r, c]
+            lap_u = (u_in[r, left] + u_in[r, right] + u_in[up, c] + u_in[down, c] - 4.0 * curr_u)
+            lap_v = (v_in[r, left] + v_in[r, right] + v_in[up, c] + v_in[down, c] - 4.0 * curr_v)
+            uvv = curr_u * curr_v * curr_v
+            du = (config.Du * lap_u - uvv + config.FEED * (1.0 - curr_u))
+            dv = (config.Dv * lap_v + uvv - (config.FEED + config.KILL) * curr_v)
+            u_out[r, c] = curr_u + du * config.dt
+            v_out[r, c] = curr_v + dv * config.dt
+
+@njit(parallel=True, cache=True)
+def diffuse_color_cpu(idx_in, amt_in, idx_out, amt_out, rate):
+    h, w = amt_in.shape
+    for r in prange(h):
+        up, down = (r - 1) % h, (r + 1) % h
+        for c in range(w):
+            left, right = (c - 1) % w, (c + 1) % w
+            a = amt_in[r, c] / AMT_SCALE
+            a_l = amt_in[r, left] / AMT_SCALE
+            a_r = amt_in[r, right] / AMT_SCALE
+            a_u = amt_in[up, c] / AMT_SCALE
+            a_d = amt_in[down, c] / AMT_SCALE
+            new_a = a + rate * (a_l + a_r + a_u + a_d - 4.0 * a)
+            new_a = min(1.0, max(0.0, new_a))
+            amt_out[r, c] = int(new_a * AMT_SCALE + 0.5)
+
+            best_i = idx_in[r, c]
+            best_a = a
+            if a_l > best_a:
+                best_a = a_l
+                best_i = idx_in[r, left]
+            if a_r > best_a:
+                best_a = a_r
+                best_i = idx_in[r, right]
+            if a_u > best_a:
+                best_a = a_u
+                best_i = idx_in[up, c]
+            if a_d > best_a:
+                best_a = a_d
+                best_i = idx_in[down, c]
+            idx_out[r, c] = best_i
+
+@njit(cache=True)
+def paint_palette_cpu(v_grid, idx, amt, x, y, radius, color_idx, intensity):
+    """paint_uv + paint_color over the brush's bounding box."""
+    h, w = v_grid.shape
+    for r in range(max(0, int(y - radius) - 1), min(h, int(y + radius) + 2)):
+        for c in range(max(0, int(x - radius) - 1), min(w, int(x + radius) + 2)):
+            if (c - x)**2 + (r - y)**2 < radius**2:
+                v_grid[r, c] = max(v_grid[r, c], 0.5 * intensity)
+    ch, cw = amt.shape
+    cx, cy, cr = x / 2.0, y / 2.0, radius / 2.0
+    for r in range(max(0, int(cy - cr) - 1), min(ch, int(cy + cr) + 2)):
+        for c in range(max(0, int(cx - cr) - 1), min(cw, int(cx + cr) + 2)):
+            if (c + 0.5 - cx)**2 + (r + 0.5 - cy)**2 < cr**2:
+                a = amt[r, c] / AMT_SCALE
+                if idx[r, c] == color_idx:
+                    a = a + (1.0 - a) * intensity
+                else:
+                    remaining = a * (1.0 - intensity)
+                    if intensity >= remaining:
+                        idx[r, c] = color_idx
+                    a = remaining + intensity
+                amt[r, c] = int(min(1.0, a) * AMT_SCALE + 0.5)
+
+@njit(parallel=True, cache=True)
+def render_palette_view_cpu(v_grid, idx, amt, palette, image_out, zoom, pan_x, pan_y):
+    out_h, out_w = image_out.shape[0], image_out.shape[1]
+    h, w = v_grid.shape
+    ch, cw = idx.shape
+    for sy in prange(out_h):
+        for sx in range(out_w):
+            grid_x = int(pan_x + (sx - out_w / 2.0) / zoom)
+            grid_y = int(pan_y + (sy - out_h / 2.0) / zoom)
+            if 0 <= grid_x < w and 0 <= grid_y < h:
+                t = v_grid[grid_y, grid_x] * 4.0
+                t = min(1.0, max(0.0, t))
+                t = t ** (1.0 / config.THICKNESS_MODIFIER + 0.5)
+                cy, cx = min(grid_y // 2, ch - 1), min(grid_x // 2, cw - 1)
+                k = idx[cy, cx]
+                a = amt[cy, cx] / AMT_SCALE
+                image_out[sy, sx, 0] = int(palette[k, 0] * a * 255 * t)
+                image_out[sy, sx, 1] = int(palette[k, 1] * a * 255 * t)
+                image_out[sy, sx, 2] = int(palette[k, 2] * a * 255 * t)
+            else:
+                image_out[sy, sx, 0] = 0
+                image_out[sy, sx, 1] = 0
+                image_out[sy, sx, 2] = 0
+
+# -----------------------------
+# 3. BACKENDS
+# -----------------------------
+def _coarse_shape(width, height):
+    return (height + 1) // 2, (width + 1) // 2
+
+def step_bytes_per_cell(every=COLOR_DIFFUSE_EVERY):
+    """Modeled traffic per sim cell per step: u, v in/out + amortized coarse color in/out."""
+    return 4 * 2 * 2 + (1 + 2) * 2 / 4.0 / every
+
+class CudaPaletteBackend:
+    """backends.CudaBackend interface with the palette color model."""
+    name = "cuda-palette"
+
+    def __init__(self, width=config.WIDTH, height=config.HEIGHT, tpb=config.TPB, every=COLOR_DIFFUSE_EVERY):
+        self.width, self.height = width, height
+        self.every = every
+        self.rate = coarse_rate(every)
+        self.step_bytes_per_cell = step_bytes_per_cell(every)
+        ch, cw = _coarse_shape(width, height)
+        self.curr = {"u": cuda.device_array((height, width), dtype=np.float32),
+                     "v": cuda.device_array((height, width), dtype=np.float32),
+                     "idx": cuda.device_array((ch, cw), dtype=np.uint8),
+                     "amt": cuda.device_array((ch, cw), dtype=np.uint16)}
+        self.next = {k: cuda.device_array(a.shape, dtype=a.dtype) for k, a in self.curr.items()}
+        self.palette = cuda.to_device(PALETTE)
+        self.gpu_image = cuda.device_array((height, width, 3), dtype=np.uint8)
+        self.host_image = np.zeros((height, width, 3), dtype=np.uint8)
+        self.threads = (tpb, tpb)
+        self.blocks = (int(np.ceil(width / tpb)), int(np.ceil(height / tpb)))
+        self.coarse_blocks = (int(np.ceil(cw / tpb)), int(np.ceil(ch / tpb)))
+        self._steps = 0
+
+    def init_grid(self):
+        c = self.curr
+        init_uv[self.blocks, self.threads](c["u"], c["v"])
+        init_color_from_seed[self.coarse_blocks, self.threads](c["v"], c["idx"], c["amt"])
+        self._steps = 0
+
+    def step(self, n=config.STEPS_PER_FRAME):
+        for _ in range(n):
+            c, nx = self.curr, self.next
+            update_uv[self.blocks, self.threads](c["u"], c["v"], nx["u"], nx["v"])
+            c["u"], nx["u"] = nx["u"], c["u"]
+            c["v"], nx["v"] = nx["v"], c["v"]
+            self._steps += 1
+            if self._steps % self.every == 0:
+                diffuse_color[self.coarse_blocks, self.threads](c["idx"], c["amt"], nx["idx"], nx["amt"], self.rate)
+                c["idx"], nx["idx"] = nx["idx"], c["idx"]
+                c["amt"], nx["amt"] = nx["amt"], c["amt"]
+
+    def paint(self, x, y, radius, r_val, g_val, b_val, intensity):
+        c = self.curr
+        k = palette_index(r_val, g_val, b_val)
+        paint_uv[self.blocks, self.threads](c["v"], x, y, radius, intensity)
+        paint_color[self.coarse_blocks, self.threads](c["idx"], c["amt"], x / 2.0, y / 2.0, radius / 2.0, k, intensity)
+
+    def render(self, zoom, pan_x, pan_y):
+        c = self.curr
+        render_palette_view[self.blocks, self.threads](c["v"], c["idx"], c["amt"], self.palette,
+                                                       self.gpu_image, zoom, pan_x, pan_y)
+        self.gpu_image.copy_to_host(self.host_image)
+        return self.host_image
+
+    def synchronize(self):
+        cuda.synchronize()
+
+class CpuPaletteBackend:
+    """backends.CpuBackend interface with the palette color model."""
+    name = "cpu-palette"
+
+    def __init__(self, width=config.WIDTH, height=config.HEIGHT, tpb=config.TPB, every=COLOR_DIFFUSE_EVERY):
+        self.width, self.height = width, height
+        self.every = every
+        self.rate = coarse_rate(every)
+        self.step_bytes_per_cell = step_bytes_per_cell(every)
+        ch, cw = _coarse_shape(width, height)
+        self.curr = {"u": np.zeros((height, width), dtype=np.float32),
+                     "v": np.zeros((height, width), dtype=np.float32),
+                     "idx": np.zeros((ch, cw), dtype=np.uint8),
+                     "amt": np.zeros((ch, cw), dtype=np.uint16)}
+        self.next = {k: np.zeros_like(a) for k, a in self.curr.items()}
+        self.host_image = np.zeros((height, width, 3), dtype=np.uint8)
+        self._steps = 0
+
+    def init_grid(self):
+        c = self.curr
+        init_uv_cpu(c["u"], c["v"])
+        init_color_from_seed_cpu(c["v"], c["idx"], c["amt"])
+        self._steps = 0
+
+    def step(self, n=config.STEPS_PER_FRAME):
+        for _ in range(n):
+            c, nx = self.curr, self.next
+            update_uv_cpu(c["u"], c["v"], nx["u"], nx["v"])
+            c["u"], nx["u"] = nx["u"], c["u"]
+            c["v"], nx["v"] = nx["v"], c["v"]
+            self._steps += 1
+            if self._steps % self.every == 0:
+                diffuse_color_cpu(c["idx"], c["amt"], nx["idx"], nx["amt"], self.rate)
+                c["idx"], nx["idx"] = nx["idx"], c["idx"]
+                c["amt"], nx["amt"] = nx["amt"], c["amt"]
+
+    def paint(self, x, y, radius, r_val, g_val, b_val, intensity):
+        c = self.curr
+        paint_palette_cpu(c["v"], c["idx"], c["amt"], x, y, radius, palette_index(r_val, g_val, b_val), intensity)
+
+    def render(self, zoom, pan_x, pan_y):
+        c = self.curr
+        render_palette_view_cpu(c["v"], c["idx"], c["amt"], PALETTE, self.host_image, zoom, pan_x, pan_y)
+        return self.host_image
+
+    def synchronize(self):
+        pass
+
+# -----------------------------
+# 4. RGB CONVERSION
+# -----------------------------
+def to_rgb(idx, amt, height, width):
+    """Full-resolution r, g, b float32 grids (host): palette color x amount over each 2x2 block."""
+    color = PALETTE[idx] * (amt.astype(np.float32) / AMT_SCALE)[..., None]
+    full = np.repeat(np.repeat(color, 2, axis=0), 2, axis=1)[:height, :width]
+    return tuple(np.ascontiguousarray(full[..., k]) for k in range(3))
+
+def from_rgb(r, g, b):
+    """Inverse of to_rgb: 2x2 block means, then the palette entry + amount that fit each coarse cell best."""
+    h, w = r.shape
+    ch, cw = _coarse_shape(w, h)
+    rgb = np.pad(np.stack([r, g, b], axis=-1), ((0, 2 * ch - h), (0, 2 * cw - w), (0, 0)), mode="edge")
+    mean = rgb.reshape(ch, 2, cw, 2, 3).mean(axis=(1, 3))
+    # Least-squares amount for every entry (clipped to 0..1); keep the entry with the smallest residual
+    a = np.clip(mean @ PALETTE.T / np.sum(PALETTE ** 2, axis=1), 0.0, 1.0)
+    resid = np.sum((mean[..., None, :] - a[..., None] * PALETTE) ** 2, axis=-1)
+    k = np.argmin(resid, axis=-1)
+    amt = np.take_along_axis(a, k[..., None], axis=-1)[..., 0]
+    return k.astype(np.uint8), (amt * AMT_SCALE + 0.5).astype(np.uint16)
+
+# -----------------------------
+# 5. COMPARISON
+# -----------------------------
+def compare(backend="auto", width=config.WIDTH, height=config.HEIGHT, frames=200, steps=config.STEPS_PER_FRAME):
+    """
+    Runs the RGB and palette models from the same seed + dabs and reports ms per
+    step, modeled bytes per cell per step and the PSNR between their renders.
+    """
+    from backends import create_backend, available_backends
+    if backend == "auto":
+        backend = available_backends()[0]
+    rgb = create_backend(backend, width, height)
+    pal = (CudaPaletteBackend if backend == "cuda" else CpuPaletteBackend)(width, height)
+
+    report = {"backend": backend, "resolution": f"{width}x{height}", "frames": frames,
+              "steps_per_frame": steps, "color_every": COLOR_DIFFUSE_EVERY}
+    for name, sim in (("rgb", rgb), ("palette", pal)):
+        sim.init_grid()
+        for i, (fx, fy) in enumerate(((0.3, 0.4), (0.65, 0.55), (0.45, 0.7))):
+            color = config.COLOR_PALETTE[(i + 1) % len(config.COLOR_PALETTE)]
+            sim.paint(fx * width, fy * height, config.BRUSH_RADIUS, color[0], color[1], color[2], 1.0)
+        sim.step(steps) # Warm-up
+        sim.synchronize()
+        t0 = time.perf_counter()
+        for _ in range(frames):
+            sim.step(steps)
+        sim.synchronize()
+        ms_per_step = 1000.0 * (time.perf_counter() - t0) / (frames * steps)
+        bytes_cell = getattr(sim, "step_bytes_per_cell", 5 * 4 * 2)
+        report[name] = {"ms_per_step": round(ms_per_step, 5), "bytes_per_cell_step": bytes_cell,
+                        "modeled_gb_s": round(width * height * bytes_cell / (ms_per_step / 1000.0) / 1e9, 3)}
+
+    img_rgb = rgb.render(1.0, width / 2.0, height / 2.0).astype(np.float64)
+    img_pal = pal.render(1.0, width / 2.0, height / 2.0).astype(np.float64)
+    mse = float(np.mean((img_rgb - img_pal) ** 2))
+    report["render_psnr_db"] = round(10.0 * np.log10(255.0 ** 2 / mse), 2) if mse > 0 else None
+    report["bytes_saved_per_cell_step"] = round(report["rgb"]["bytes_per_cell_step"]
+                                                - report["palette"]["bytes_per_cell_step"], 3)
+    report["step_speedup"] = round(report["rgb"]["ms_per_step"] / report["palette"]["ms_per_step"], 3)
+    print(f"[PALETTE] {backend} {width}x{height}: rgb {report['rgb']['ms_per_step']:.4f} ms/step "
+          f"({report['rgb']['bytes_per_cell_step']} B/cell) | palette {report['palette']['ms_per_step']:.4f} ms/step "
+          f"({report['palette']['bytes_per_cell_step']:.3f} B/cell) | x{report['step_speedup']} | "
+          f"PSNR {report['render_psnr_db']} dB")
+    return report
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="RGB vs palette-index color model.")
+    p.add_argument("--backend", choices=["auto", "cuda", "cpu"], default="auto")
+    p.add_argument("--width", type=int, default=config.WIDTH)
+    p.add_argument("--height", type=int, default=config.HEIGHT)
+    p.add_argument("--frames", type=int, default=200)
+    p.add_argument("--json", type=str, default="")
+    args = p.parse_args(sys.argv[1:])
+    res = compare(args.backend, args.width, args.height, args.frames)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(res, f, indent=4)
@@ -0,0 +1,223 @@
+# replay.py
+# Deterministic input recording (mainV3 --record) and headless replay.
+# Only resets and paint dabs change the simulation; the camera only changes what
+# is rendered. Both are logged per frame index, so replaying the log on the same
+# backend rebuilds the exact same grids, at full speed and with no window.
+#
+# Log format: gzip'd JSON Lines. Line 1 is a header (size, steps, physics),
+# then one compact array per event:
+#   [frame, "reset"]
+#   [frame, "paint", x, y, radius, r, g, b, intensity]
+#   [frame, "cam", zoom, pan_x, pan_y]
+#   [frame, "end"]
+#
+# Usage:
+#   python mainV3.py --record session.rec.gz
+#   python replay.py session.rec.gz [--backend cpu|cuda] [--no-render] [--save-state final.npz] [--report r.json]
+#   python replay.py session.rec.gz --compare other_final.npz
+#   python replay.py session.rec.gz --stream 8765     # watch at http://127.0.0.1:8765/
+import os
+import sys
+import gzip
+import json
+import time
+import hashlib
+import argparse
+import numpy as np
+import config
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "shared")) # frame_profiler.py, frame_stream.py
+
+FORMAT_VERSION = 1
+
+def physics_params():
+    """Compile-time constants a replay must match to reproduce the run."""
+    return {"Du": config.Du, "Dv": config.Dv, "FEED": config.FEED, "KILL": config.KILL,
+            "dt": config.dt, "THICKNESS_MODIFIER": config.THICKNESS_MODIFIER}
+
+# -----------------------------
+# 1. RECORDER
+# -----------------------------
+class InputRecorder:
+    """Collects events from the live loop; written out on close()."""
+    def __init__(self, path, width=config.WIDTH, height=config.HEIGHT, steps=config.STEPS_PER_FRAME,
+                 warm_start=None):
+        self.path = path
+        self.header = {"version": FORMAT_VERSION, "width": width, "height": height,
+                       "steps_per_frame": steps, "physics": physics_params()}
+        if warm_start:
+            self.header["warm_start"] = warm_start # {"factor", "coverage"}, redone before frame 0
+        self.events = []
+        self._last_cam = None
+
+    def reset(self, frame):
+        self.events.append([frame, "reset"])
+
+    def paint(self, frame, x, y, radius, r_val, g_val, b_val, intensity):
+        self.events.append([frame, "paint", x, y, radius, r_val, g_val, b_val, intensity])
+
+    def camera(self, frame, zoom, pan_x, pan_y):
+        """Logged only when the camera actually moved."""
+        cam = (zoom, pan_x, pan_y)
+        if cam != self._last_cam:
+            self.events.append([frame, "cam", zoom, pan_x, pan_y])
+            self._last_cam = cam
+
+    def close(self, frames):
+        self.events.append([frames, "end"])
+        with gzip.open(self.path, 'wt') as f:
+            f.write(json.dumps(self.header) + "\n")
+            for ev in self.events:
+                f.write(json.dumps(ev, separators=(",", ":")) + "\n")
+        print(f"[RECORD] {len(self.events)} events over {frames} frames -> {self.path}")
+
+def load_recording(path):
+    """Returns (header, events)."""
+    with gzip.open(path, 'rt') as f:
+        header = json.loads(f.readline())
+        events = [json.loads(line) for line in f if line.strip()]
+    return header, events
+
+# -----------------------------
+# 2. REPLAY
+# -----------------------------
+def state_checksum(sim):
+    """SHA-256 over the current U, V, R, G, B grids (host copies)."""
+    h = hashlib.sha256()
+    for arr in state_arrays(sim).values():
+        h.update(np.ascontiguousarray(arr).tobytes())
+    return h.hexdigest()
+
+def state_arrays(sim):
+    out = {}
+    for name, arr in sim.curr.items():
+        out[name] = arr.copy_to_host() if hasattr(arr, "copy_to_host") else arr.copy()
+    return out
+
+def replay(path, backend="auto", render=True, streamer=None):
+    """
+    Re-runs a recording headlessly as fast as possible.
+    Returns (sim, report) where report holds timings and the final-state checksum.
+    With a frame_stream.FrameStreamer, rendered frames are also published to viewers.
+    """
+    from backends import create_backend
+    from frame_profiler import FrameProfiler
+
+    header, events = load_recording(path)
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"unsupported recording version {header.get('version')}")
+    if header["physics"] != physics_params():
+        print(f"[REPLAY] Warning: config.py physics differ from the recording: {header['physics']}")
+
+    width, height = header["width"], header["height"]
+    steps = header["steps_per_frame"]
+    sim = create_backend(backend, width, height)
+    profiler = FrameProfiler(["paint", "simulate", "render"], capacity=4096, sync_fn=sim.synchronize)
+
+    sim.init_grid()
+    if header.get("warm_start"):
+        from warm_start import warm_start
+        warm_start(sim, header["warm_start"]["factor"], header["warm_start"]["coverage"])
+    cam = (1.0, width / 2.0, height / 2.0)
+    frames = 0
+    i = 0
+    n_events = len(events)
+    t0 = time.perf_counter()
+    while i < n_events:
+        frame = events[i][0]
+        # Frames without input still step the simulation
+        while frames < frame:
+            _replay_frame(sim, profiler, steps, cam if render else None, streamer)
+            frames += 1
+        if events[i][1] == "end":
+            break
+
+        profiler.begin_frame()
+        while i < n_events and events[i][0] == frame and events[i][1] != "end":
+            ev = events[i]
+            if ev[1] == "reset":
+                sim.init_grid()
+            elif ev[1] == "paint":
+                sim.paint(*ev[2:])
+            elif ev[1] == "cam":
+                cam = tuple(ev[2:])
+            i += 1
+        profiler.mark(0, sync=True)
+        _step_and_render(sim, profiler, steps, cam if render else None, streamer)
+        frames += 1
+    sim.synchronize()
+    elapsed = time.perf_counter() - t0
+
+    report = {
+        "recording": path, "backend": sim.name, "resolution": f"{width}x{height}",
+        "frames": frames, "steps_per_frame": steps, "rendered": render,
+        "seconds": round(elapsed, 4), "fps": round(frames / elapsed, 2) if elapsed > 0 else None,
+        "timings_ms": profiler.percentiles(),
+        "checksum": state_checksum(sim),
+    }
+    return sim, report
+
+def _replay_frame(sim, profiler, steps, cam, streamer=None):
+    profiler.begin_frame()
+    profiler.mark(0)
+    _step_and_render(sim, profiler, steps, cam, streamer)
+
+def _step_and_render(sim, profiler, steps, cam, streamer=None):
+    sim.step(steps)
+    profiler.mark(1, sync=True)
+    if cam is not None:
+        image = sim.render(*cam)
+        if streamer is not None:
+            streamer.publish(image)
+    profiler.mark(2, sync=True)
+    profiler.end_frame()
+
+# -----------------------------
+# 3. CLI
+# -----------------------------
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Headless replay of a mainV3 input recording.")
+    p.add_argument("recording")
+    p.add_argument("--backend", choices=["auto", "cuda", "cpu", "strips", "cuda-palette", "cpu-palette"], default="auto")
+    p.add_argument("--no-render", action="store_true", help="Skip render_camera_view (simulation only)")
+    p.add_argument("--save-state", type=str, default="", help="Write final U, V, R, G, B to .npz")
+    p.add_argument("--compare", type=str, default="", help="Compare the final state with a saved .npz")
+    p.add_argument("--report", type=str, default="", help="Write the timing report to JSON")
+    p.add_argument("--stream", type=int, default=0, metavar="PORT", help="Serve a live viewer while replaying")
+    args = p.parse_args(argv)
+
+    streamer = None
+    if args.stream:
+        from frame_stream import FrameStreamer
+        streamer = FrameStreamer(args.stream, fps_cap=config.STREAM_FPS)
+    sim, report = replay(args.recording, args.backend, render=not args.no_render, streamer=streamer)
+    if streamer:
+        report["stream"] = streamer.stats()
+        streamer.close()
+    if hasattr(sim, "close"):
+        # Strip workers and their shared memory go away once the state is read below
+        import atexit
+        atexit.register(sim.close)
+    print(f"[REPLAY] {report['frames']} frames on {report['backend']} in {report['seconds']}s "
+          f"({report['fps']} FPS) | checksum {report['checksum'][:16]}")
+
+    status = 0
+    if args.save_state or args.compare:
+        state = state_arrays(sim)
+        if args.save_state:
+            np.savez_compressed(args.save_state, **state)
+            print(f"[REPLAY] Final state saved to {args.save_state}")
+        if args.compare:
+            ref = np.load(args.compare)
+            diffs = {k: float(np.max(np.abs(state[k] - ref[k]))) for k in state}
+            identical = all(np.array_equal(state[k], ref[k]) for k in state)
+            report["compare"] = {"path": args.compare, "identical": identical, "max_abs_diff": diffs}
+            print(f"[REPLAY] vs {args.compare}: {'identical' if identical else 'DIFFERS'} (max |diff| {diffs})")
+            status = 0 if identical else 1
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=4)
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,31 @@
+# test_engine.py
+# Automated version of `python engine.py --check` on the CPU backend (no GPU needed).
+#   python -m pytest -q test_engine.py
+import numpy as np
+import config
+from engine import GrayScottEngine, self_check
+
+def test_self_check_cpu():
+    ok, results = self_check("cpu")
+    assert ok, results
+
+def test_paint_accepts_numpy_palette_index():
+    with GrayScottEngine(64, 48, backend="cpu") as eng:
+        eng.paint(32, 24, radius=4, color=np.int64(1))
+        r = np.asarray(eng["r"])
+        g = np.asarray(eng["g"])
+        assert np.allclose((r[24, 32], g[24, 32]), config.COLOR_PALETTE[1][:2])
+
+def test_warm_start_on_palette_backend():
+    with GrayScottEngine(64, 48, backend="cpu-palette") as eng:
+        seed_cells = np.count_nonzero(eng.get_state()["amt"])
+        eng.reset(warm_start=2)
+        state = eng.get_state()
+    assert state["v"].mean() > 0.05
+    assert np.count_nonzero(state["amt"]) > seed_cells # Color spread during the coarse phase
+
+def test_export_on_palette_backend(tmp_path):
+    with GrayScottEngine(64, 48, backend="cpu-palette") as eng:
+        eng.step(50)
+        report = eng.export(str(tmp_path / "still.png"), 128, 96, ss=1)
+    assert (tmp_path / "still.png").stat().st_size > 0, report
@@ -0,0 +1,214 @@
+# warm_start.py
+# Coarse-to-fine warm start: grow the pattern on a grid FACTOR times coarser,
+# then upsample U, V, R, G, B into the full-resolution grids and continue there.
+#
+# On the coarse grid one cell is FACTOR full cells wide, so every diffusion
+# coefficient (Du, Dv and the 0.5 color rate) is divided by FACTOR^2. With the
+# same dt, one coarse step covers the same simulated time as one full step, and
+# the front spreads at the same physical speed. Each coarse step touches only
+# 1 / FACTOR^2 of the cells, though. The coarse kernel comes from models.py
+# (constants folded in); the hand-off is bilinear and periodic, like the grid.
+# Palette backends (idx / amt) are expanded to R, G, B for the coarse phase and
+# fitted back to the nearest palette entry afterwards (palette_color.py).
+#
+# Usage:
+#   python mainV3.py --warm-start 2                  # coarse phase before the first frame
+#   python warm_start.py [--backend cpu|cuda] [--width 3840 --height 2160] [--target 0.2] [--factors 2,4]
+#     -> wall time to reach the target coverage: cold start vs warm start per factor
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from numba import njit, prange
+import config
+from models import Model, ModelBackend
+from analysis import PatternAnalyzer
+
+FIELDS = ("u", "v", "r", "g", "b")
+COLOR_DIFF_RATE = 0.5 # kernelsV3 color diffusion
+HANDOFF = 0.9 # Switch to full resolution at this share of the target coverage
+
+# -----------------------------
+# 1. COARSE MODEL + RESAMPLING
+# -----------------------------
+def coarse_model(factor, dt_scale=1.0):
+    """Gray-Scott + color diffusion with every D divided by factor^2."""
+    s2 = float(factor * factor)
+    c = COLOR_DIFF_RATE / s2
+    return Model(f"gray_scott_coarse{factor}_dt{str(dt_scale).replace('.', 'p')}", FIELDS,
+                 {"u": config.Du / s2, "v": config.Dv / s2, "r": c, "g": c, "b": c},
+                 {"FEED": config.FEED, "KILL": config.KILL},
+                 {"u": "-u * v * v + FEED * (1.0 - u)",
+                  "v": "u * v * v - (FEED + KILL) * v",
+                  "r": "0.0", "g": "0.0", "b": "0.0"},
+                 init=None, dt=config.dt * dt_scale, display=("v", 0.0, 0.25), paint_value=0.5)
+
+def downsample(field, factor):
+    """Block mean over factor x factor cells (trailing rows / columns beyond a whole block are dropped)."""
+    h, w = field.shape[0] // factor, field.shape[1] // factor
+    return field[:h * factor, :w * factor].reshape(h, factor, w, factor).mean(axis=(1, 3)).astype(np.float32)
+
+@njit(parallel=True, cache=True)
+def upsample_bilinear(src, dst):
+    """Periodic bilinear resample of src onto dst's shape (cell centres aligned)."""
+    sh, sw = src.shape
+    dh, dw = dst.shape
+    fy, fx = dh / sh, dw / sw
+    for y in prange(dh):
+        sy = (y + 0.5) / fy - 0.5
+        y0 = int(np.floor(sy))
+        ty = sy - y0
+        y0m, y1m = y0 % sh, (y0 + 1) % sh
+        for x in range(dw):
+            sx = (x + 0.5) / fx - 0.5
+            x0 = int(np.floor(sx))
+            tx = sx - x0
+            x0m, x1m = x0 % sw, (x0 + 1) % sw
+            top = src[y0m, x0m] * (1.0 - tx) + src[y0m, x1m] * tx
+            bottom = src[y1m, x0m] * (1.0 - tx) + src[y1m, x1m] * tx
+            dst[y, x] = top * (1.0 - ty) + bottom * ty
+
+def _to_host(arr):
+    return arr.copy_to_host() if hasattr(arr, "copy_to_host") else np.asarray(arr)
+
+def _load(dst, host):
+    if hasattr(dst, "copy_to_device"):
+        dst.copy_to_device(host)
+    else:
+        dst[...] = host
+
+# -----------------------------
+# 2. WARM START
+# -----------------------------
+def warm_start_fields(fields, factor=2, device="cpu", target=0.2, max_steps=200000,
+                      check_every=config.STEPS_PER_FRAME * 10, dt_scale=1.0):
+    """
+    fields: {"u", "v", "r", "g", "b"} full-resolution grids (device arrays on 'cuda'),
+    already holding the initial state. Evolves a downsampled copy until its coverage
+    reaches `target` (or max_steps), then writes the upsampled state back in place.
+    Returns a dict with the coarse step count and timings.
+    """
+    t0 = time.perf_counter()
+    host = {f: _to_host(fields[f]) for f in FIELDS}
+    height, width = host["u"].shape
+    ch, cw = height // factor, width // factor
+    coarse = ModelBackend(coarse_model(factor, dt_scale), cw, ch, device=device)
+    for f in FIELDS:
+        _load(coarse.curr[f], downsample(host[f], factor))
+    analyzer = PatternAnalyzer(cw, ch, backend=device)
+
+    t_sim = time.perf_counter()
+    steps = 0
+    coverage = analyzer.coverage(coarse.curr["u"], coarse.curr["v"])
+    while coverage < target and steps < max_steps:
+        coarse.step(check_every)
+        steps += check_every
+        coverage = analyzer.coverage(coarse.curr["u"], coarse.curr["v"])
+    coarse.synchronize()
+    t_up = time.perf_counter()
+
+    for f in FIELDS:
+        upsample_bilinear(_to_host(coarse.curr[f]), host[f])
+        _load(fields[f], host[f])
+    t_end = time.perf_counter()
+    return {"factor": factor, "coarse_size": f"{cw}x{ch}", "coarse_steps": steps,
+            "coarse_coverage": round(coverage, 4), "dt_scale": dt_scale,
+            "setup_s": round(t_sim - t0, 3), "coarse_s": round(t_up - t_sim, 3),
+            "handoff_s": round(t_end - t_up, 3), "total_s": round(t_end - t0, 3)}
+
+def warm_start(sim, factor=2, target=0.2, **kwargs):
+    """
+    warm_start_fields on a backends.py simulator after init_grid(). Palette backends
+    (idx / amt instead of r, g, b) go through palette_color.to_rgb and back.
+    """
+    device = "cuda" if sim.name.startswith("cuda") else "cpu"
+    if "idx" not in sim.curr:
+        return warm_start_fields(sim.curr, factor, device, target, **kwargs)
+    from palette_color import to_rgb, from_rgb
+    c = sim.curr
+    fields = {"u": _to_host(c["u"]), "v": _to_host(c["v"])}
+    fields["r"], fields["g"], fields["b"] = to_rgb(_to_host(c["idx"]), _to_host(c["amt"]), sim.height, sim.width)
+    report = warm_start_fields(fields, factor, device, target, **kwargs)
+    idx, amt = from_rgb(fields["r"], fields["g"], fields["b"])
+    for name, host in (("u", fields["u"]), ("v", fields["v"]), ("idx", idx), ("amt", amt)):
+        _load(c[name], host)
+    return report
+
+# -----------------------------
+# 3. COVERAGE-TIME BENCHMARK
+# -----------------------------
+def _run_to_coverage(sim, analyzer, target, steps_per_check, max_steps):
+    """Full-resolution steps until coverage >= target. Returns (steps, coverage)."""
+    steps = 0
+    coverage = analyzer.coverage(sim.curr["u"], sim.curr["v"])
+    while coverage < target and steps < max_steps:
+        sim.step(steps_per_check)
+        steps += steps_per_check
+        coverage = analyzer.coverage(sim.curr["u"], sim.curr["v"])
+    sim.synchronize()
+    return steps, coverage
+
+def benchmark(backend="auto", width=config.WIDTH, height=config.HEIGHT, target=0.2, factors=(2, 4),
+              steps_per_check=config.STEPS_PER_FRAME * 10, max_steps=400000):
+    """Wall time to reach `target` coverage from the default seed: cold vs each warm-start factor."""
+    from backends import create_backend
+    sim = create_backend(backend, width, height)
+    device = "cuda" if sim.name == "cuda" else "cpu"
+    analyzer = PatternAnalyzer(width, height, backend=device)
+    report = {"backend": sim.name, "resolution": f"{width}x{height}", "target_coverage": target,
+              "handoff": HANDOFF, "runs": []}
+
+    # Compile everything once so neither side pays JIT time
+    sim.init_grid()
+    sim.step(1)
+    for factor in factors:
+        ModelBackend(coarse_model(factor), 16, 16, device=device).step(1)
+    upsample_bilinear(np.zeros((4, 4), np.float32), np.zeros((8, 8), np.float32))
+
+    def finish(name, t0, fine_steps, coverage, extra=None):
+        wall = time.perf_counter() - t0
+        stats = analyzer.analyze(sim.curr["u"], sim.curr["v"])
+        run = {"mode": name, "wall_s": round(wall, 3), "full_res_steps": fine_steps,
+               "coverage": round(coverage, 4), "reached": coverage >= target,
+               "mean_v": stats["mean_v"], "wavelength": stats["wavelength"], "blobs": stats["blobs"]}
+        if extra:
+            run.update(extra)
+        report["runs"].append(run)
+        print(f"[WARM] {name:<8} {run['wall_s']:8.2f}s | full-res steps {fine_steps:>7} | "
+              f"coverage {run['coverage']:.3f} | wavelength {run['wavelength']} | blobs {run['blobs']}")
+
+    sim.init_grid()
+    t0 = time.perf_counter()
+    steps, coverage = _run_to_coverage(sim, analyzer, target, steps_per_check, max_steps)
+    finish("cold", t0, steps, coverage)
+
+    for factor in factors:
+        sim.init_grid()
+        t0 = time.perf_counter()
+        info = warm_start(sim, factor, target * HANDOFF, check_every=steps_per_check)
+        steps, coverage = _run_to_coverage(sim, analyzer, target, steps_per_check, max_steps)
+        finish(f"warm x{factor}", t0, steps, coverage, {"warm_start": info})
+
+    cold = report["runs"][0]["wall_s"]
+    for run in report["runs"][1:]:
+        run["speedup"] = round(cold / run["wall_s"], 2) if run["wall_s"] > 0 else None
+        print(f"[WARM] {run['mode']}: x{run['speedup']} vs cold start")
+    if hasattr(sim, "close"):
+        sim.close()
+    return report
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Cold vs coarse-to-fine warm start: time to reach a coverage.")
+    p.add_argument("--backend", choices=["auto", "cuda", "cpu", "strips"], default="auto")
+    p.add_argument("--width", type=int, default=config.WIDTH)
+    p.add_argument("--height", type=int, default=config.HEIGHT)
+    p.add_argument("--target", type=float, default=0.2, help="Coverage (share of cells with v > STATS_THRESHOLD)")
+    p.add_argument("--factors", type=lambda t: tuple(int(v) for v in t.split(",")), default=(2, 4))
+    p.add_argument("--check-every", type=int, default=config.STEPS_PER_FRAME * 10)
+    p.add_argument("--json", type=str, default="")
+    args = p.parse_args(sys.argv[1:])
+    res = benchmark(args.backend, args.width, args.height, args.target, args.factors, args.check_every)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(res, f, indent=4)
@@ -0,0 +1,79 @@
+# frame_profiler.py
+# Shared by Gargantua (main_blackwell_02.py) and Gray-Scott (mainV3.py, replay.py).
+# Per-stage frame timers kept in a fixed-size ring buffer.
+# Recording a stage is one perf_counter() call and one array store; when the
+# profiler is disabled every call returns immediately.
+# GPU launches are asynchronous, so a phase that only queues kernels would look
+# free and its cost would land in whatever blocks next. mark(i, sync=True) waits
+# for the device first; the wait only happens while profiling is on.
+import time
+import numpy as np
+
+class FrameProfiler:
+    """
+    Usage per frame:
+        prof.begin_frame()
+        ... work ...; prof.mark(0)
+        ... work ...; prof.mark(1)
+        prof.end_frame()
+    Stage i records the time since the previous mark (or begin_frame).
+    sync_fn: called by mark(i, sync=True), e.g. numba.cuda.synchronize.
+    """
+    def __init__(self, stage_names, capacity=1024, enabled=True, sync_fn=None):
+        self.stage_names = list(stage_names)
+        self.capacity = capacity
+        self.enabled = enabled
+        self.sync_fn = sync_fn
+        # Column -1 holds the whole frame time
+        self._samples = np.zeros((capacity, len(self.stage_names) + 1), dtype=np.float64)
+        self._row = 0
+        self._count = 0
+        self._frame_start = 0.0
+        self._last = 0.0
+
+    def begin_frame(self):
+        if not self.enabled: return
+        self._frame_start = self._last = time.perf_counter()
+
+    def mark(self, stage, sync=False):
+        if not self.enabled: return
+        if sync and self.sync_fn is not None:
+            self.sync_fn()
+        now = time.perf_counter()
+        self._samples[self._row, stage] = now - self._last
+        self._last = now
+
+    def end_frame(self):
+        if not self.enabled: return
+        self._samples[self._row, -1] = time.perf_counter() - self._frame_start
+        self._row = (self._row + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def reset(self):
+        self._row = 0
+        self._count = 0
+
+    def percentiles(self, qs=(50, 95, 99)):
+        """
+        Returns {"frame": {"p50": ms, ...}, "<stage>": {...}} over the frames
+        currently held in the ring buffer (empty dict if nothing recorded).
+        """
+        if self._count == 0:
+            return {}
+        window = self._samples[:self._count] * 1000.0
+        values = np.percentile(window, qs, axis=0)
+        names = self.stage_names + ["frame"]
+        report = {}
+        for col, name in enumerate(names):
+            report[name] = {f"p{q}": round(float(values[i, col]), 3) for i, q in enumerate(qs)}
+        return report
+
+def format_overlay_lines(report):
+    """Text lines for the on-screen overlay: one row per stage, frame last."""
+    if not report:
+        return ["profiling: no samples"]
+    lines = [f"{'stage':<10}{'p50':>8}{'p95':>8}{'p99':>8}  ms"]
+    for name, p in report.items():
+        lines.append(f"{name:<10}{p['p50']:>8.2f}{p['p95']:>8.2f}{p['p99']:>8.2f}")
+    return lines
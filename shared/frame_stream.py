@@ -0,0 +1,474 @@
+# frame_stream.py
+# Local HTTP/WebSocket viewer for long or headless runs (standard library + numpy only).
+#   http://127.0.0.1:<port>/        viewer page (canvas)
+#   ws://127.0.0.1:<port>/ws        binary frame stream
+#   http://127.0.0.1:<port>/stats   JSON counters
+#
+# The sim loop calls publish(image). That only copies the frame into a pending
+# slot and returns; it never waits on the network. A background encoder thread
+# splits the frame into TILE x TILE tiles and keeps the ones that changed since
+# the last encoded frame, then zlib-compresses them into one message. Each
+# client has a short queue and its own writer thread. When a slow client's
+# queue is full, its backlog is dropped and it gets a keyframe (all tiles) next
+# time, so it never falls behind and never stalls anyone else.
+#
+# Message: header "<4sIHHHHB" (b"TDIF", frame, width, height, tile, n_tiles, keyframe)
+# then zlib(n_tiles x (uint16 ty, uint16 tx) + n_tiles x tile*tile*3 RGB bytes).
+#
+# One copy for both simulators: Gargantua (main_blackwell_02.py --serve) and
+# Gray-Scott (mainV3.py / replay.py --stream) put ../shared on sys.path.
+#
+# Self-test with a local client (fast + deliberately slow viewer):
+#   python shared/frame_stream.py --selftest
+import sys
+import json
+import time
+import zlib
+import queue
+import base64
+import socket
+import struct
+import hashlib
+import argparse
+import threading
+import socketserver
+import numpy as np
+
+TILE = 32
+HEADER = struct.Struct("<4sIHHHHB")
+MAGIC = b"TDIF"
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# -----------------------------
+# 1. TILE-DIFF ENCODING
+# -----------------------------
+def _tiles(frame, tile):
+    """(H, W, 3) padded frame -> (H/t, W/t, t, t, 3) view."""
+    th, tw = frame.shape[0] // tile, frame.shape[1] // tile
+    return frame.reshape(th, tile, tw, tile, 3).swapaxes(1, 2)
+
+def encode(frame, prev, seq, width, height, tile, level=1):
+    """Tiles of `frame` that differ from `prev` (all tiles when prev is None)."""
+    cur = _tiles(frame, tile)
+    if prev is None:
+        dirty = np.ones(cur.shape[:2], dtype=bool)
+    else:
+        dirty = np.any(cur != _tiles(prev, tile), axis=(2, 3, 4))
+    idx = np.argwhere(dirty).astype(np.uint16)
+    payload = idx.tobytes() + np.ascontiguousarray(cur[dirty]).tobytes()
+    head = HEADER.pack(MAGIC, seq & 0xFFFFFFFF, width, height, tile, len(idx), prev is None)
+    return head + zlib.compress(payload, level)
+
+class TileDecoder:
+    """Client-side: applies messages to a canvas. .image is the current (H, W, 3) frame."""
+    def __init__(self):
+        self.canvas = None
+        self.size = (0, 0)
+        self.frame = -1
+
+    def apply(self, msg):
+        magic, seq, width, height, tile, n, key = HEADER.unpack_from(msg)
+        if magic != MAGIC:
+            raise ValueError("not a tile-diff message")
+        ph, pw = -(-height // tile) * tile, -(-width // tile) * tile
+        if self.canvas is None or self.canvas.shape[:2] != (ph, pw):
+            if not key:
+                raise ValueError("diff before keyframe")
+            self.canvas = np.zeros((ph, pw, 3), dtype=np.uint8)
+        data = zlib.decompress(msg[HEADER.size:])
+        idx = np.frombuffer(data, dtype=np.uint16, count=2 * n).reshape(n, 2)
+        pixels = np.frombuffer(data, dtype=np.uint8, offset=4 * n).reshape(n, tile, tile, 3)
+        view = _tiles(self.canvas, tile)
+        view[idx[:, 0], idx[:, 1]] = pixels
+        self.size = (height, width)
+        self.frame = seq
+        return seq
+
+    @property
+    def image(self):
+        return self.canvas[:self.size[0], :self.size[1]]
+
+# -----------------------------
+# 2. SERVER
+# -----------------------------
+class _Client:
+    def __init__(self, addr, max_queue):
+        self.addr = addr
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.needs_key = True
+        self.sent_bytes = 0
+        self.sent_msgs = 0
+        self.dropped = 0
+        self.alive = True
+
+    def offer(self, diff_msg, key_fn):
+        """Never blocks: a full queue is flushed and the client resyncs with a keyframe."""
+        msg = key_fn() if self.needs_key else diff_msg
+        try:
+            self.queue.put_nowait(msg)
+            self.needs_key = False
+        except queue.Full:
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            self.needs_key = True
+            self.dropped += 1
+
+def _ws_frame(payload, opcode=0x2):
+    n = len(payload)
+    if n < 126:
+        head = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 65536:
+        head = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        head = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return head + payload
+
+class FrameStreamer:
+    """
+    publish(image) from the sim loop; everything else runs on background threads.
+    fps_cap limits how often frames are taken (0 = every publish); due() lets the
+    caller skip building the image at all. sndbuf bounds the bytes the kernel may
+    buffer per client, so a slow viewer shows up in its queue instead.
+    """
+    def __init__(self, port=8765, host="127.0.0.1", tile=TILE, fps_cap=20.0, max_queue=2, level=1,
+                 sndbuf=1 << 18):
+        self.tile = tile
+        self.sndbuf = sndbuf
+        self.level = level
+        self.max_queue = max_queue
+        self.min_interval = 1.0 / fps_cap if fps_cap > 0 else 0.0
+        self.clients = []
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._pending = None
+        self._work = None
+        self._prev = None
+        self._size = (0, 0)
+        self._seq = 0
+        self._new_frame = False
+        self._encoded = (-1, (0, 0))
+        self._last_publish = 0.0
+        self._running = True
+        self.stats_counters = {"published": 0, "encoded": 0, "coalesced": 0, "raw_bytes": 0,
+                               "diff_bytes": 0, "keyframes": 0, "encode_ms": 0.0}
+
+        streamer = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                streamer._handle(self)
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self.server = Server((host, port), Handler)
+        self.host, self.port = self.server.server_address[:2]
+        threading.Thread(target=self.server.serve_forever, daemon=True, name="stream-http").start()
+        threading.Thread(target=self._encode_loop, daemon=True, name="stream-encoder").start()
+        print(f"[VIEWER] Viewer at http://{self.host}:{self.port}/")
+
+    def due(self):
+        """True when publish() would take a frame (clients connected, fps cap passed)."""
+        return bool(self.clients) and time.perf_counter() - self._last_publish >= self.min_interval
+
+    def publish(self, image):
+        """Copies an (H, W, 3) uint8 image for the encoder. Returns its sequence number, or 0 if skipped."""
+        if not self.due():
+            return 0
+        self._last_publish = time.perf_counter()
+        h, w = image.shape[0], image.shape[1]
+        t = self.tile
+        shape = (-(-h // t) * t, -(-w // t) * t, 3)
+        with self._lock:
+            if self._pending is None or self._pending.shape != shape:
+                self._pending = np.zeros(shape, dtype=np.uint8)
+                self._work = np.zeros(shape, dtype=np.uint8)
+            if self._new_frame:
+                self.stats_counters["coalesced"] += 1 # Encoder never saw the previous one
+            self._pending[:h, :w] = image
+            self._size = (h, w)
+            self._seq += 1
+            self._new_frame = True
+            self.stats_counters["published"] += 1
+            seq = self._seq
+        self._event.set()
+        return seq
+
+    def _encode_loop(self):
+        while self._running:
+            self._event.wait(timeout=0.5)
+            self._event.clear()
+            with self._lock:
+                fresh = self._new_frame
+                if fresh:
+                    # The publisher writes into the other buffer from now on
+                    self._pending, self._work = self._work, self._pending
+                    self._new_frame = False
+                    seq, (h, w) = self._seq, self._size
+                elif self._encoded[0] >= 0 and any(c.needs_key for c in self.clients):
+                    seq, (h, w) = self._encoded # New client while the sim is paused
+                else:
+                    continue
+                frame = self._work
+            t0 = time.perf_counter()
+            key_cache = []
+
+            def key_fn():
+                if not key_cache:
+                    key_cache.append(encode(frame, None, seq, w, h, self.tile, self.level))
+                    self.stats_counters["keyframes"] += 1
+                return key_cache[0]
+
+            if fresh:
+                prev = self._prev if self._prev is not None and self._prev.shape == frame.shape else None
+                diff = encode(frame, prev, seq, w, h, self.tile, self.level) if prev is not None else key_fn()
+                self.stats_counters["diff_bytes"] += len(diff)
+            else:
+                diff = key_fn()
+            for client in list(self.clients):
+                client.offer(diff, key_fn)
+            if fresh:
+                if prev is None:
+                    self._prev = frame.copy()
+                else:
+                    np.copyto(self._prev, frame)
+                self._encoded = (seq, (h, w))
+                self.stats_counters["encoded"] += 1
+                self.stats_counters["raw_bytes"] += h * w * 3
+            self.stats_counters["encode_ms"] += (time.perf_counter() - t0) * 1000.0
+
+    # --- HTTP / WebSocket ---
+    def _handle(self, req):
+        request_line = req.rfile.readline().decode("latin-1").strip()
+        headers = {}
+        while True:
+            line = req.rfile.readline().decode("latin-1").strip()
+            if not line:
+                break
+            k, _, v = line.partition(":")
+            headers[k.strip().lower()] = v.strip()
+        parts = request_line.split()
+        path = parts[1] if len(parts) > 1 else "/"
+        if path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+            self._serve_ws(req, headers)
+        elif path == "/stats":
+            self._reply(req, "200 OK", "application/json", json.dumps(self.stats()).encode())
+        elif path == "/":
+            self._reply(req, "200 OK", "text/html; charset=utf-8", VIEWER_HTML.encode())
+        else:
+            self._reply(req, "404 Not Found", "text/plain", b"not found")
+
+    def _reply(self, req, status, ctype, body):
+        req.wfile.write(f"HTTP/1.1 {status}\r\nContent-Type: {ctype}\r\nContent-Length: {len(body)}\r\n"
+                        f"Cache-Control: no-store\r\nConnection: close\r\n\r\n".encode() + body)
+
+    def _serve_ws(self, req, headers):
+        key = headers.get("sec-websocket-key")
+        if not key:
+            self._reply(req, "400 Bad Request", "text/plain", b"missing Sec-WebSocket-Key")
+            return
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        req.connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.sndbuf)
+        req.wfile.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                         f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        client = _Client(req.client_address, self.max_queue)
+        with self._lock:
+            self.clients.append(client)
+        self._event.set() # Keyframe for the newcomer even if the sim is paused
+        print(f"[VIEWER] Client connected {client.addr[0]}:{client.addr[1]} ({len(self.clients)} total)")
+        try:
+            while self._running:
+                try:
+                    msg = client.queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                req.wfile.write(_ws_frame(msg))
+                client.sent_bytes += len(msg)
+                client.sent_msgs += 1
+        except OSError:
+            pass
+        finally:
+            client.alive = False
+            with self._lock:
+                self.clients.remove(client)
+            print(f"[VIEWER] Client left {client.addr[0]}:{client.addr[1]} "
+                  f"({client.sent_msgs} msgs, {client.dropped} resyncs)")
+
+    def stats(self):
+        s = dict(self.stats_counters)
+        s["encode_ms"] = round(s["encode_ms"], 2)
+        s["ratio"] = round(s["raw_bytes"] / s["diff_bytes"], 2) if s["diff_bytes"] else None
+        s["clients"] = [{"addr": f"{c.addr[0]}:{c.addr[1]}", "sent_bytes": c.sent_bytes,
+                         "sent_msgs": c.sent_msgs, "resyncs": c.dropped, "queued": c.queue.qsize()}
+                        for c in list(self.clients)]
+        return s
+
+    def close(self):
+        self._running = False
+        self._event.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+VIEWER_HTML = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Live view</title>
+<style>body{background:#111;color:#8cf;font:13px monospace;margin:0}canvas{display:block;max-width:100vw;image-rendering:pixelated}</style>
+</head><body><div id="s">connecting...</div><canvas id="c"></canvas><script>
+const cv = document.getElementById('c'), ctx = cv.getContext('2d'), st = document.getElementById('s');
+const ws = new WebSocket(`ws://${location.host}/ws`);
+ws.binaryType = 'arraybuffer';
+let chain = Promise.resolve(), bytes = 0, t0 = performance.now();
+ws.onmessage = ev => { chain = chain.then(() => apply(ev.data)); };
+ws.onclose = () => { st.textContent = 'disconnected'; };
+async function apply(buf) {
+  const dv = new DataView(buf);
+  const seq = dv.getUint32(4, true), w = dv.getUint16(8, true), h = dv.getUint16(10, true);
+  const t = dv.getUint16(12, true), n = dv.getUint16(14, true), key = dv.getUint8(16);
+  if (cv.width !== w || cv.height !== h) { cv.width = w; cv.height = h; }
+  const stream = new Blob([buf.slice(17)]).stream().pipeThrough(new DecompressionStream('deflate'));
+  const data = new Uint8Array(await new Response(stream).arrayBuffer());
+  const idx = new Uint16Array(data.buffer, 0, 2 * n);
+  const img = ctx.createImageData(t, t), px = img.data;
+  let off = 4 * n;
+  for (let i = 0; i < n; i++) {
+    for (let p = 0, q = 0; p < t * t; p++, q += 4) {
+      px[q] = data[off++]; px[q + 1] = data[off++]; px[q + 2] = data[off++]; px[q + 3] = 255;
+    }
+    ctx.putImageData(img, idx[2 * i + 1] * t, idx[2 * i] * t);
+  }
+  bytes += buf.byteLength;
+  const kbps = bytes / 1024 / ((performance.now() - t0) / 1000);
+  st.textContent = `frame ${seq} | ${n} tiles${key ? ' (key)' : ''} | ${kbps.toFixed(0)} KiB/s`;
+}
+</script></body></html>
+"""
+
+# -----------------------------
+# 3. LOCAL CLIENT + SELF-TEST
+# -----------------------------
+class StreamClient:
+    """Minimal WebSocket client for tests and scripts."""
+    def __init__(self, host, port, timeout=10.0, rcvbuf=0):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if rcvbuf:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        self.sock.settimeout(timeout)
+        self.sock.connect((host, port))
+        key = base64.b64encode(np.random.bytes(16)).decode()
+        self.sock.sendall((f"GET /ws HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\n"
+                           f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+        self.rfile = self.sock.makefile("rb")
+        status = self.rfile.readline().decode()
+        if " 101 " not in status:
+            raise ConnectionError(f"handshake failed: {status.strip()}")
+        expected = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        while True:
+            line = self.rfile.readline().decode().strip()
+            if not line:
+                break
+            if line.lower().startswith("sec-websocket-accept") and line.split(":", 1)[1].strip() != expected:
+                raise ConnectionError("bad Sec-WebSocket-Accept")
+
+    def recv(self):
+        b0, b1 = self.rfile.read(2)
+        n = b1 & 0x7F
+        if n == 126:
+            n = struct.unpack("!H", self.rfile.read(2))[0]
+        elif n == 127:
+            n = struct.unpack("!Q", self.rfile.read(8))[0]
+        return self.rfile.read(n)
+
+    def close(self):
+        self.sock.close()
+
+def selftest(width=320, height=240, frames=120, slow_delay=0.05):
+    """
+    Publishes a moving square over a static gradient with a fast and a slow
+    client attached. Checks every decoded frame is exact, and that publish()
+    stays cheap while the slow client is behind.
+    """
+    streamer = FrameStreamer(port=0, fps_cap=0, sndbuf=1 << 14)
+    rng = np.random.default_rng(0)
+    yy, xx = np.mgrid[0:height, 0:width]
+    background = np.stack([xx * 255 // width, yy * 255 // height, np.full_like(xx, 64)], axis=-1).astype(np.uint8)
+    history = {}
+    results = {}
+
+    def run_client(name, delay):
+        client = StreamClient(streamer.host, streamer.port, rcvbuf=(1 << 14) if delay else 0)
+        dec = TileDecoder()
+        ok, msgs, nbytes = True, 0, 0
+        while True:
+            msg = client.recv()
+            seq = dec.apply(msg)
+            msgs += 1
+            nbytes += len(msg)
+            ok &= np.array_equal(dec.image, history[seq])
+            if delay:
+                time.sleep(delay)
+            if seq >= frames:
+                break
+        client.close()
+        results[name] = {"messages": msgs, "bytes": nbytes, "exact": bool(ok)}
+
+    threads = [threading.Thread(target=run_client, args=("fast", 0.0)),
+               threading.Thread(target=run_client, args=("slow", slow_delay))]
+    for t in threads:
+        t.start()
+    while len(streamer.clients) < 2:
+        time.sleep(0.01)
+
+    publish_ms = []
+    for i in range(1, frames + 1):
+        img = background.copy()
+        x = (i * 3) % (width - 40)
+        img[100:140, x:x + 40] = rng.integers(0, 256, (40, 40, 3), dtype=np.uint8) # Incompressible
+        history[streamer._seq + 1] = img # Before publish: a client may decode it immediately
+        t0 = time.perf_counter()
+        streamer.publish(img)
+        publish_ms.append((time.perf_counter() - t0) * 1000.0)
+        time.sleep(0.005)
+    # Keep offering the final frame until both clients have caught up
+    deadline = time.time() + 10
+    while any(t.is_alive() for t in threads) and time.time() < deadline:
+        history[streamer._seq + 1] = history[frames]
+        streamer.publish(history[frames])
+        time.sleep(0.02)
+    stats = streamer.stats()
+    # An upgrade without Sec-WebSocket-Key must be refused, not crash the handler
+    with socket.create_connection((streamer.host, streamer.port), timeout=5) as s:
+        s.sendall(b"GET /ws HTTP/1.1\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n\r\n")
+        bad_key = s.makefile("rb").readline().decode().strip()
+    streamer.close()
+
+    report = {"frames": frames, "clients": results, "server": stats, "no_key_reply": bad_key,
+              "publish_ms_max": round(max(publish_ms), 3),
+              "publish_ms_mean": round(sum(publish_ms) / len(publish_ms), 4)}
+    ok = len(results) == 2 and all(r["exact"] for r in results.values()) and " 400 " in bad_key
+    resyncs = {c["addr"]: c["resyncs"] for c in stats["clients"]}
+    print(f"[VIEWER] Self-test {'OK' if ok else 'FAILED'}: {json.dumps(report['clients'])} | resyncs {resyncs} | "
+          f"ratio x{stats['ratio']} | publish mean {report['publish_ms_mean']} / max {report['publish_ms_max']} ms | "
+          f"no key -> {bad_key}")
+    return ok, report
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Tile-diff frame streaming server.")
+    p.add_argument("--selftest", action="store_true")
+    p.add_argument("--demo", type=int, default=0, help="Serve a synthetic animation on this port")
+    args = p.parse_args(sys.argv[1:])
+    if args.selftest:
+        sys.exit(0 if selftest()[0] else 1)
+    if args.demo:
+        s = FrameStreamer(port=args.demo)
+        yy, xx = np.mgrid[0:360, 0:640]
+        i = 0
+        while True:
+            img = np.zeros((360, 640, 3), dtype=np.uint8)
+            img[..., 1] = ((xx + i) % 256).astype(np.uint8)
+            img[150:210, (i * 4) % 580:(i * 4) % 580 + 60] = 255
+            s.publish(img)
+            i += 1
+            time.sleep(1 / 30)
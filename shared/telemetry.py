@@ -0,0 +1,352 @@
+# telemetry.py
+# In-process metrics registry shared by both simulators (standard library only).
+# Counters, gauges and fixed-bucket histograms, exported as
+#   http://127.0.0.1:<port>/metrics     Prometheus text format (scrape target)
+#   <path>.jsonl                        one snapshot line every `interval` seconds
+#
+# Recording never takes a lock. Each thread that records into a metric gets its
+# own cell (a small list) the first time it does, and only that thread ever
+# writes to it. Exporters sum the cells when they read. A reader can see a
+# sample that is one observation behind, but never a torn value or a lost update.
+#
+# Both simulators use the same metric names (sim_frames_total, sim_frame_seconds,
+# sim_steps_total, sim_copy_bytes_total, ...). The registry's constant labels
+# (sim, instance) tell the runs apart, so one dashboard can show every instance.
+#
+# Usage:
+#   reg = Registry({"sim": "gray_scott"})
+#   frame_s = reg.histogram("sim_frame_seconds", "Wall time per frame", FRAME_BUCKETS)
+#   MetricsServer(reg, 9464); JsonlExporter(reg, "metrics.jsonl", 5.0)
+#   frame_s.observe(dt)                   # hot path
+#
+# One module for both simulators: main_blackwell_02.main and mainV3.main import
+# it from ../shared.
+#
+# Self-test (threads record, both exporters read):  python shared/telemetry.py --selftest
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+from bisect import bisect_left
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds; 60 / 144 / 240 Hz budgets fall between buckets
+FRAME_BUCKETS = (0.002, 0.004, 0.00694, 0.0083, 0.0125, 0.0167, 0.025, 0.0333, 0.05, 0.1, 0.25, 1.0)
+
+def default_instance():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+# -----------------------------
+# 1. METRICS
+# -----------------------------
+class _Metric:
+    """Per-thread cells: a thread only ever writes its own cell, so no lock is needed."""
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._local = threading.local()
+        self._cells = [] # list.append is atomic; readers iterate a snapshot
+
+    def _new_cell(self):
+        raise NotImplementedError
+
+    def _cell(self):
+        cell = getattr(self._local, "cell", None)
+        if cell is None:
+            cell = self._local.cell = self._new_cell()
+            self._cells.append(cell)
+        return cell
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_cell(self):
+        return [0.0]
+
+    def inc(self, amount=1.0):
+        self._cell()[0] += amount
+
+    @property
+    def value(self):
+        return sum(c[0] for c in list(self._cells))
+
+class Gauge(_Metric):
+    """Last value wins (a single attribute store). set_function() reads a callback at export time."""
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels):
+        super().__init__(name, help_text, labels)
+        self._value = 0.0
+        self._fn = None
+
+    def set(self, value):
+        self._value = value
+
+    def set_function(self, fn):
+        self._fn = fn
+
+    @property
+    def value(self):
+        if self._fn is not None:
+            try:
+                return float(self._fn())
+            except Exception:
+                return float("nan")
+        return self._value
+
+class Histogram(_Metric):
+    """Fixed upper bounds. Cell layout: one count per bucket (+Inf last), then the running sum."""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels, buckets):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_cell(self):
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, value):
+        cell = self._cell()
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def totals(self):
+        """(per-bucket counts, count, sum), summed over threads."""
+        n = len(self.buckets) + 1
+        counts = [0] * n
+        total = 0.0
+        for cell in list(self._cells):
+            for i in range(n):
+                counts[i] += cell[i]
+            total += cell[-1]
+        return counts, sum(counts), total
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (None if empty)."""
+        counts, count, _ = self.totals()
+        if count == 0:
+            return None
+        rank = q * count
+        seen = 0
+        for i, c in enumerate(counts):
+            seen += c
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+# -----------------------------
+# 2. REGISTRY
+# -----------------------------
+def _label_text(labels):
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels.items():
+        v = str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+def _num(v):
+    if v != v:
+        return "NaN"
+    if v in (float("inf"), float("-inf")):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+class Registry:
+    """
+    Named metrics plus constant labels stamped on every sample.
+    counter() / gauge() / histogram() return the existing metric for a known name + labels.
+    """
+    def __init__(self, const_labels=None):
+        self.const_labels = dict(const_labels or {})
+        self.const_labels.setdefault("instance", default_instance())
+        self._metrics = {}
+        self._lock = threading.Lock() # Registration only, never on the recording path
+
+    def _get(self, cls, name, help_text, labels, *args):
+        key = (name, tuple(sorted((labels or {}).items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = cls(name, help_text, dict(labels or {}), *args)
+                    self._metrics[key] = metric
+        if not isinstance(metric, cls):
+            raise TypeError(f"{name} is already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name, help_text="", labels=None):
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text="", labels=None):
+        return self._get(Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text="", buckets=FRAME_BUCKETS, labels=None):
+        return self._get(Histogram, name, help_text, labels, buckets)
+
+    def metrics(self):
+        return list(self._metrics.values())
+
+    def to_prometheus(self):
+        """Text exposition format 0.0.4."""
+        lines = []
+        seen = set()
+        for m in sorted(self.metrics(), key=lambda m: m.name):
+            if m.name not in seen:
+                seen.add(m.name)
+                if m.help:
+                    lines.append(f"# HELP {m.name} {m.help}")
+                lines.append(f"# TYPE {m.name} {m.kind}")
+            labels = {**self.const_labels, **m.labels}
+            if isinstance(m, Histogram):
+                counts, count, total = m.totals()
+                running = 0
+                for bound, c in zip(list(m.buckets) + [float("inf")], counts):
+                    running += c
+                    lines.append(f"{m.name}_bucket{_label_text({**labels, 'le': _num(bound)})} {running}")
+                lines.append(f"{m.name}_sum{_label_text(labels)} {_num(total)}")
+                lines.append(f"{m.name}_count{_label_text(labels)} {count}")
+            else:
+                lines.append(f"{m.name}{_label_text(labels)} {_num(m.value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """One JSON-serializable dict: counters/gauges as values, histograms as count/sum/p50/p95/p99."""
+        out = {"timestamp": datetime.now().isoformat(), **self.const_labels, "metrics": {}}
+        for m in self.metrics():
+            key = m.name + _label_text(m.labels)
+            if isinstance(m, Histogram):
+                _, count, total = m.totals()
+                out["metrics"][key] = {"count": count, "sum": round(total, 6),
+                                       "p50": m.quantile(0.5), "p95": m.quantile(0.95),
+                                       "p99": m.quantile(0.99)}
+            else:
+                v = m.value
+                out["metrics"][key] = None if v != v else v
+        return out
+
+# -----------------------------
+# 3. EXPORTERS
+# -----------------------------
+class MetricsServer:
+    """Prometheus scrape endpoint on a daemon thread. port=0 picks a free port (see .port)."""
+    def __init__(self, registry, port=0, host="127.0.0.1"):
+        reg = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path in ("/", "/metrics"):
+                    body = reg.to_prometheus().encode()
+                    ctype = "text/plain; version=0.0.4; charset=utf-8"
+                elif path == "/metrics.json":
+                    body = json.dumps(reg.snapshot()).encode()
+                    ctype = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+        print(f"[METRICS] Prometheus endpoint on http://{host}:{self.port}/metrics")
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+class JsonlExporter:
+    """Appends registry.snapshot() to `path` every `interval` seconds, plus a final line on close()."""
+    def __init__(self, registry, path, interval=5.0):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-jsonl", daemon=True)
+        self._thread.start()
+
+    def _write(self):
+        try:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(self.registry.snapshot(), separators=(',', ':')) + "\n")
+        except OSError as e:
+            print(f"[METRICS] Could not write {self.path}: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._write()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self._write()
+
+# -----------------------------
+# 4. SELF-TEST
+# -----------------------------
+def selftest(threads=4, samples=200000):
+    """Several threads record at once; totals must be exact and both exporters must parse."""
+    import tempfile
+    import urllib.request
+    reg = Registry({"sim": "selftest"})
+    frames = reg.counter("sim_frames_total", "Frames")
+    frame_s = reg.histogram("sim_frame_seconds", "Frame time")
+    fps = reg.gauge("sim_fps", "FPS")
+
+    def work(seed):
+        for i in range(samples):
+            frames.inc()
+            frame_s.observe(((i * 7 + seed) % 100) / 1000.0)
+        fps.set(60.0)
+
+    t0 = time.perf_counter()
+    pool = [threading.Thread(target=work, args=(s,)) for s in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    per_sample_ns = 1e9 * (time.perf_counter() - t0) / (threads * samples)
+
+    server = MetricsServer(reg, 0)
+    text = urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics").read().decode()
+    server.close()
+    path = os.path.join(tempfile.mkdtemp(), "metrics.jsonl")
+    exporter = JsonlExporter(reg, path, interval=3600)
+    exporter.close()
+    with open(path) as f:
+        snap = json.loads(f.readline())
+
+    expected = threads * samples
+    ok = (frames.value == expected and frame_s.totals()[1] == expected
+          and f'sim_frame_seconds_bucket{{sim="selftest",instance="{reg.const_labels["instance"]}",le="+Inf"}} {expected}' in text
+          and snap["metrics"]["sim_frames_total"] == expected)
+    print(f"[METRICS] {threads} threads x {samples} samples: counter {frames.value:.0f}, "
+          f"histogram {frame_s.totals()[1]} (expected {expected}), {per_sample_ns:.0f} ns/sample "
+          f"-> {'OK' if ok else 'FAILED'}")
+    return ok
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Shared metrics registry.")
+    p.add_argument("--selftest", action="store_true")
+    args = p.parse_args(sys.argv[1:])
+    if args.selftest:
+        sys.exit(0 if selftest() else 1)